@@ -0,0 +1,222 @@
+"""
+Admission control for code execution
+Caps concurrent sandboxes, shares them fairly between clients and sheds
+load once the wait queue is full
+
+Waiting runs are dispatched by weighted fair queuing. Each run gets a
+virtual finish tag: its client's previous tag (or the current virtual
+time, for a client that has been quiet) plus a cost of 1 / weight of its
+priority class. A freed slot goes to the waiting run with the smallest
+tag, so a client with many runs queued takes turns with everyone else
+instead of being served in arrival order, and a lesson check costs less
+of its client's share than an ad-hoc run.
+
+A client's runs may also name a session. Sessions share out their
+client's turns in the same way, by tags of their own, but never add to
+them: a client that sends every run under a new session still gets one
+client's share and one client's room in the queue.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Weight of each priority class; a class with twice the weight is
+# dispatched twice as often when all of them are waiting
+PRIORITY_WEIGHTS = {"check": 4, "run": 2, "batch": 1}
+DEFAULT_PRIORITY = "run"
+
+# Finish tags kept before those no longer ahead of the virtual time are
+# dropped (such a tag gives the same position as having none)
+MAX_TRACKED_CLIENTS = 1024
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run cannot be admitted; the caller should answer 503"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Execution not admitted: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A run waiting for a slot"""
+
+    __slots__ = (
+        "client", "priority", "finish_tag", "start_tag", "session_tag", "admitted"
+    )
+
+    def __init__(self, client, priority, start_tag, finish_tag, session_tag):
+        self.client = client
+        self.priority = priority
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.session_tag = session_tag
+        self.admitted = False
+
+
+class AdmissionController:
+    """
+    Bounded, per-client fair admission for sandbox runs
+
+    At most max_concurrent runs execute at once. Further runs wait in a
+    queue of at most max_queue entries, and at most max_client_queue per
+    client, for up to queue_timeout seconds. A run that finds the queue
+    full is rejected immediately, so a burst fails fast instead of piling
+    up processes on a small machine. Freed slots go to waiting runs in
+    weighted fair order (see the module docstring).
+
+    Args:
+        max_concurrent (int): Sandboxes allowed to run at the same time
+        max_queue (int): Runs allowed to wait for a free slot
+        queue_timeout (float): Longest time a run may wait, in seconds
+        max_client_queue (int): Runs one client may have waiting;
+            defaults to max_queue
+
+    wait_observer, if set, is called with (priority, seconds) for each
+    admitted run, including those admitted without waiting.
+    """
+
+    def __init__(self, max_concurrent=2, max_queue=8, queue_timeout=5,
+                 max_client_queue=None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_client_queue = (
+            self.max_queue if max_client_queue is None else max(1, max_client_queue)
+        )
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.rejected = {"queue_full": 0, "client_queue_full": 0, "queue_timeout": 0}
+        self.wait_observer = None
+        # Moving average of run duration, used to estimate Retry-After
+        self._average_run_seconds = 1.0
+        self._condition = threading.Condition()
+        self._queue = []
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+        self._session_tags = {}
+
+    @property
+    def waiting(self):
+        """Runs waiting for a slot"""
+        return len(self._queue)
+
+    def waiting_by_priority(self):
+        """Runs waiting for a slot, by priority class"""
+        with self._condition:
+            counts = dict.fromkeys(PRIORITY_WEIGHTS, 0)
+            for waiter in self._queue:
+                counts[waiter.priority] += 1
+            return counts
+
+    @contextmanager
+    def admit(self, client=None, priority=DEFAULT_PRIORITY, session=None):
+        """
+        Hold an execution slot for the duration of the with block
+
+        Args:
+            client (str): Who the run is for; runs without one share a
+                single fair share
+            priority (str): A PRIORITY_WEIGHTS class
+            session (str): Which of client's sessions the run is for;
+                sessions take turns within their client's share
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Unknown priority class: {priority}")
+        wait_seconds = self._acquire(client, priority, session)
+        if self.wait_observer is not None:
+            self.wait_observer(priority, wait_seconds)
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start_time)
+
+    def retry_after(self):
+        """Seconds until a new run is likely to be admitted"""
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self._average_run_seconds))
+
+    def _acquire(self, client, priority, session):
+        """Take a slot; returns the seconds spent waiting for it"""
+        with self._condition:
+            if self.running < self.max_concurrent and not self._queue:
+                start_tag, _ = self._charge(self._finish_tags, client, priority)
+                self._charge(self._session_tags, (client, session), priority)
+                self._virtual_time = max(self._virtual_time, start_tag)
+                self.running += 1
+                return 0.0
+
+            if len(self._queue) >= self.max_queue:
+                self.rejected["queue_full"] += 1
+                raise AdmissionRejected("queue_full", self.retry_after())
+            queued = sum(waiter.client == client for waiter in self._queue)
+            if queued >= self.max_client_queue:
+                self.rejected["client_queue_full"] += 1
+                raise AdmissionRejected("client_queue_full", self.retry_after())
+
+            waiter = _Waiter(
+                client,
+                priority,
+                *self._charge(self._finish_tags, client, priority),
+                self._charge(self._session_tags, (client, session), priority)[1],
+            )
+            self._queue.append(waiter)
+            enqueued = time.monotonic()
+            admitted = self._condition.wait_for(
+                lambda: waiter.admitted, self.queue_timeout
+            )
+            if not admitted:
+                self._queue.remove(waiter)
+                self.rejected["queue_timeout"] += 1
+                raise AdmissionRejected("queue_timeout", self.retry_after())
+            return time.monotonic() - enqueued
+
+    def _charge(self, tags, key, priority):
+        """Start and finish tags of a new run of key's in tags; advances its tag"""
+        start_tag = max(self._virtual_time, tags.get(key, 0.0))
+        finish_tag = start_tag + 1 / PRIORITY_WEIGHTS[priority]
+        tags[key] = finish_tag
+        return start_tag, finish_tag
+
+    def _dispatch(self):
+        """Hand free slots to the waiting runs with the smallest finish tags"""
+        dispatched = False
+        while self._queue and self.running < self.max_concurrent:
+            # min() keeps arrival order between equal tags
+            first = min(self._queue, key=lambda queued: queued.finish_tag)
+            # The client's turn goes to its session that is furthest behind,
+            # which takes over the turn's tags so the client's stay in order
+            waiter = min(
+                (queued for queued in self._queue if queued.client == first.client),
+                key=lambda queued: queued.session_tag,
+            )
+            if waiter is not first:
+                waiter.start_tag, first.start_tag = first.start_tag, waiter.start_tag
+                waiter.finish_tag, first.finish_tag = first.finish_tag, waiter.finish_tag
+            self._queue.remove(waiter)
+            waiter.admitted = True
+            self.running += 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            dispatched = True
+
+        if len(self._finish_tags) > MAX_TRACKED_CLIENTS:
+            self._finish_tags = self._tags_ahead(self._finish_tags)
+        if len(self._session_tags) > MAX_TRACKED_CLIENTS:
+            self._session_tags = self._tags_ahead(self._session_tags)
+        if dispatched:
+            self._condition.notify_all()
+
+    def _tags_ahead(self, tags):
+        return {key: tag for key, tag in tags.items() if tag > self._virtual_time}
+
+    def _release(self, duration):
+        with self._condition:
+            self.running -= 1
+            self._average_run_seconds += 0.2 * (duration - self._average_run_seconds)
+            self._dispatch()
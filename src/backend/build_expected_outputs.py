@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Build the expected outputs of every lesson solution
+Run before deploying; the server then answers checks without running solutions
+
+Usage:
+    python src/backend/build_expected_outputs.py          # write artifacts
+    python src/backend/build_expected_outputs.py --check  # verify only
+"""
+import argparse
+import logging
+import os
+import sys
+
+from expected_outputs import ARTIFACT_FILE, build_artifact, input_vectors
+from lesson_catalog import LessonCatalog
+from runner.safe_runner import SandboxPool
+
+logger = logging.getLogger(__name__)
+
+
+def _default_lessons_base():
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(project_root, "lessons")
+
+
+def run_solution(pool, lesson, timeout):
+    """
+    Run a lesson's check solution once per input vector
+
+    Returns:
+        list: The solution's stdout per vector of input_vectors(lesson)
+
+    Raises:
+        RuntimeError: If the solution times out or fails on any input
+    """
+    stdin_texts = [
+        "\n".join(inputs) + "\n" if inputs else "" for inputs in input_vectors(lesson)
+    ]
+    result = pool.run(lesson.check_solution, "", timeout, cases=stdin_texts)
+    if result["timed_out"]:
+        raise RuntimeError(f"timed out after {timeout} seconds")
+
+    outputs = []
+    for case in result["cases"]:
+        if case["returncode"] != 0:
+            error = case["stderr"].strip() or f"exit code {case['returncode']}"
+            raise RuntimeError(error)
+        outputs.append(case["stdout"])
+    if len(outputs) != len(stdin_texts):
+        raise RuntimeError("sandbox stopped before running every input")
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute the expected output of every lesson solution"
+    )
+    parser.add_argument(
+        "--lessons", default=_default_lessons_base(), help="Lessons directory"
+    )
+    parser.add_argument(
+        "--timeout", type=int, default=10, help="Seconds per solution run"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fail if any artifact is missing or stale instead of writing it",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+
+    catalog = LessonCatalog(args.lessons).load()
+    pool = SandboxPool(size=1, max_timeout=args.timeout)
+    failures = 0
+
+    for lesson_id in catalog.lesson_ids():
+        lesson = catalog.get(lesson_id)
+        if lesson.check_solution is None:
+            logger.info(f"Lesson {lesson_id}: no solution, skipped")
+            continue
+
+        if args.check:
+            artifact = lesson.expected_outputs
+            if artifact is None or not artifact.is_current(lesson):
+                logger.error(f"Lesson {lesson_id}: {ARTIFACT_FILE} is missing or stale")
+                failures += 1
+            continue
+
+        try:
+            outputs = run_solution(pool, lesson, args.timeout)
+        except RuntimeError as e:
+            logger.error(f"Lesson {lesson_id}: solution failed: {e}")
+            failures += 1
+            continue
+
+        path = os.path.join(lesson.directory, ARTIFACT_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(build_artifact(lesson, outputs))
+        logger.info(f"Lesson {lesson_id}: wrote {len(outputs)} expected outputs")
+
+    pool.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
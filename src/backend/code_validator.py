@@ -0,0 +1,291 @@
+"""
+Security validation of student code
+Parses a submission once, checks its syntax tree and compiles it for the sandbox
+
+Checking the tree instead of the text means string contents and variable
+names never cause false alarms, while aliases like "import os as o" or
+"f = eval" are still caught. Verdicts are cached by source hash, so a
+submission that is run again costs a dictionary lookup.
+
+The same walk decides whether a program is deterministic - its output
+depends only on its source and input - so its result may be cached.
+"""
+
+import ast
+import hashlib
+import marshal
+import threading
+import warnings
+from collections import OrderedDict
+
+from runner.safe_runner import STUDENT_FILENAME
+
+# Modules that may not be imported at all, by top-level package name
+FORBIDDEN_MODULES = {
+    "subprocess": "subprocess module is not allowed",
+    "shutil": "shutil module is not allowed",
+    "socket": "socket module is not allowed",
+    "http": "HTTP modules are not allowed",
+    "urllib": "urllib module is not allowed",
+    "requests": "requests module is not allowed",
+    "importlib": "importlib module is not allowed",
+    # Reach exec, eval, __import__ and an unchecked open() by attribute
+    "builtins": "builtins module is not allowed",
+    "io": "io module is not allowed",
+}
+
+# Built-in names that may not be used, called or not
+FORBIDDEN_BUILTINS = {
+    "exec": "exec() function is not allowed",
+    "eval": "eval() function is not allowed",
+    "__import__": "__import__ function is not allowed",
+    "compile": "compile() function is not allowed",
+    "__builtins__": "Access to __builtins__ is not allowed",
+}
+
+# Functions of the os module that may not be used
+FORBIDDEN_OS_FUNCTIONS = {
+    "system": "os.system is not allowed",
+    "popen": "os.popen is not allowed",
+    "remove": "File deletion is not allowed",
+    "unlink": "File deletion is not allowed",
+}
+
+# Dunder attributes used to climb from any object to the interpreter internals
+FORBIDDEN_ATTRIBUTES = {
+    "__subclasses__",
+    "__globals__",
+    "__builtins__",
+    "__code__",
+    "__bases__",
+    "__mro__",
+}
+
+# FORBIDDEN_BUILTINS that are also rejected as attribute names and getattr()
+# strings, e.g. "builtins.exec" or getattr(module, "eval")
+FORBIDDEN_BUILTIN_ATTRIBUTES = {"exec", "eval", "__import__", "compile"}
+
+FILE_WRITE_MESSAGE = "File writing operations are not allowed"
+
+# Modules whose functions give the same results on every run
+DETERMINISTIC_MODULES = {
+    "math",
+    "string",
+    "itertools",
+    "functools",
+    "collections",
+    "re",
+    "json",
+    "textwrap",
+    "statistics",
+    "fractions",
+    "decimal",
+    "operator",
+    "dataclasses",
+    "enum",
+    "typing",
+    "copy",
+    "heapq",
+    "bisect",
+}
+
+# Built-ins whose results vary between processes: addresses, string hashes
+# (and so the iteration order of sets of strings) and the file system
+NONDETERMINISTIC_BUILTINS = {"id", "hash", "open", "set", "frozenset"}
+
+
+class _Violation(Exception):
+    """Raised inside the tree walk at the first forbidden construct"""
+
+
+class _SecurityVisitor(ast.NodeVisitor):
+    """Walks a module and raises _Violation at the first forbidden construct"""
+
+    def __init__(self):
+        # Local names bound to the os module ("import os as o")
+        self.os_aliases = set()
+        # Local names bound to the re module, whose compile() is harmless
+        self.re_aliases = set()
+        self.deterministic = True
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._check_module(alias.name)
+            self._note_module(alias.name)
+            if alias.name == "os":
+                self.os_aliases.add(alias.asname or "os")
+            elif alias.name == "re":
+                self.re_aliases.add(alias.asname or "re")
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ""
+        self._check_module(module)
+        self._note_module(module)
+        if module == "os":
+            for alias in node.names:
+                if alias.name == "*":
+                    # Would bind system, popen, remove and unlink as bare names
+                    raise _Violation("from os import * is not allowed")
+                if alias.name in FORBIDDEN_OS_FUNCTIONS:
+                    raise _Violation(FORBIDDEN_OS_FUNCTIONS[alias.name])
+        for alias in node.names:
+            if alias.name in FORBIDDEN_BUILTINS:
+                raise _Violation(FORBIDDEN_BUILTINS[alias.name])
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id in FORBIDDEN_BUILTINS:
+            raise _Violation(FORBIDDEN_BUILTINS[node.id])
+        if node.id in NONDETERMINISTIC_BUILTINS:
+            self.deterministic = False
+
+    def visit_Set(self, node):
+        self.deterministic = False
+        self.generic_visit(node)
+
+    visit_SetComp = visit_Set
+
+    def visit_Attribute(self, node):
+        if node.attr in FORBIDDEN_ATTRIBUTES:
+            raise _Violation(f"Access to {node.attr} is not allowed")
+        self._check_builtin_attribute(node.value, node.attr)
+        if (
+            node.attr in FORBIDDEN_OS_FUNCTIONS
+            and isinstance(node.value, ast.Name)
+            and node.value.id in self.os_aliases
+        ):
+            raise _Violation(FORBIDDEN_OS_FUNCTIONS[node.attr])
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == "open":
+            self._check_open_mode(node)
+        elif isinstance(node.func, ast.Attribute) and node.func.attr == "open":
+            # io.open, os.open, codecs.open and friends take the same mode
+            self._check_open_mode(node)
+        elif isinstance(node.func, ast.Name) and node.func.id == "getattr":
+            # getattr(os, "system") is os.system spelled differently
+            if len(node.args) >= 2 and isinstance(node.args[1], ast.Constant):
+                self._check_attribute_name(node.args[0], node.args[1].value)
+        self.generic_visit(node)
+
+    def _check_module(self, name):
+        root = name.split(".")[0]
+        if root in FORBIDDEN_MODULES:
+            raise _Violation(FORBIDDEN_MODULES[root])
+
+    def _note_module(self, name):
+        if name.split(".")[0] not in DETERMINISTIC_MODULES:
+            self.deterministic = False
+
+    def _check_open_mode(self, node):
+        mode = node.args[1] if len(node.args) >= 2 else None
+        for keyword in node.keywords:
+            if keyword.arg == "mode":
+                mode = keyword.value
+        if mode is None:
+            return
+        if not isinstance(mode, ast.Constant) or not isinstance(mode.value, str):
+            # A computed mode could be anything
+            raise _Violation(FILE_WRITE_MESSAGE)
+        if set(mode.value) & set("wax+"):
+            raise _Violation(FILE_WRITE_MESSAGE)
+
+    def _check_attribute_name(self, target, name):
+        if not isinstance(name, str):
+            return
+        if name in FORBIDDEN_ATTRIBUTES:
+            raise _Violation(f"Access to {name} is not allowed")
+        self._check_builtin_attribute(target, name)
+        if (
+            name in FORBIDDEN_OS_FUNCTIONS
+            and isinstance(target, ast.Name)
+            and target.id in self.os_aliases
+        ):
+            raise _Violation(FORBIDDEN_OS_FUNCTIONS[name])
+
+    def _check_builtin_attribute(self, target, name):
+        if name not in FORBIDDEN_BUILTIN_ATTRIBUTES:
+            return
+        if (
+            name == "compile"
+            and isinstance(target, ast.Name)
+            and target.id in self.re_aliases
+        ):
+            return  # re.compile() builds a pattern, not code
+        raise _Violation(FORBIDDEN_BUILTINS[name])
+
+
+def check_code(code):
+    """
+    Parse and check one submission, without caching
+
+    Returns:
+        dict: "valid", plus "message" when a forbidden construct was found,
+            or when the code may run "bytecode" (marshalled code object,
+            None on a syntax error) and "deterministic"
+    """
+    with warnings.catch_warnings():
+        # The sandbox runs with -W ignore; don't log SyntaxWarnings here
+        warnings.simplefilter("ignore")
+        try:
+            tree = ast.parse(code, STUDENT_FILENAME)
+        except (SyntaxError, ValueError):
+            # Let the sandbox report it like the interpreter would
+            return {"valid": True, "bytecode": None, "deterministic": True}
+
+        visitor = _SecurityVisitor()
+        try:
+            visitor.visit(tree)
+        except _Violation as e:
+            return {"valid": False, "message": str(e)}
+        except RecursionError:
+            return {"valid": False, "message": "Code is nested too deeply"}
+
+        try:
+            code_object = compile(tree, STUDENT_FILENAME, "exec")
+        except (SyntaxError, ValueError, RecursionError):
+            return {"valid": True, "bytecode": None, "deterministic": True}
+    return {
+        "valid": True,
+        "bytecode": marshal.dumps(code_object),
+        "deterministic": visitor.deterministic,
+    }
+
+
+class CodeValidator:
+    """
+    check_code() with an LRU cache of verdicts keyed by source hash
+
+    Args:
+        max_entries (int): Verdicts kept before the least recent is dropped
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max(1, max_entries)
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, code):
+        """Check code, reusing the verdict for a source seen before"""
+        key = hashlib.sha256(code.encode("utf-8", "surrogatepass")).digest()
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                self._verdicts.move_to_end(key)
+                self.hits += 1
+                return verdict
+            self.misses += 1
+
+        verdict = check_code(code)
+        with self._lock:
+            self._verdicts[key] = verdict
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+        return verdict
+
+    def __len__(self):
+        return len(self._verdicts)
@@ -21,15 +21,119 @@ class Config:
     EXECUTION_TIMEOUT = int(os.environ.get("EXECUTION_TIMEOUT", "10"))
     MAX_CODE_LENGTH = int(os.environ.get("MAX_CODE_LENGTH", "10000"))
     MAX_OUTPUT_LENGTH = int(os.environ.get("MAX_OUTPUT_LENGTH", "50000"))
+    # Characters of user_inputs a run may be given, all lines together
+    MAX_INPUT_LENGTH = int(os.environ.get("MAX_INPUT_LENGTH", "10000"))
+
+    # Sandbox pool - warm interpreters reused across runs
+    SANDBOX_POOL_ENABLED = (
+        os.environ.get("SANDBOX_POOL_ENABLED", "true").lower() == "true"
+    )
+    SANDBOX_POOL_SIZE = int(os.environ.get("SANDBOX_POOL_SIZE", "2"))
+    # Workers are replaced after this many runs (and on any rlimit breach)
+    SANDBOX_MAX_RUNS_PER_WORKER = int(
+        os.environ.get("SANDBOX_MAX_RUNS_PER_WORKER", "25")
+    )
+    SANDBOX_MEMORY_LIMIT_MB = int(os.environ.get("SANDBOX_MEMORY_LIMIT_MB", "128"))
+
+    # Fork server - instead of the pool, fork every run from one template
+    # interpreter that has these modules imported already
+    SANDBOX_FORKSERVER_ENABLED = (
+        os.environ.get("SANDBOX_FORKSERVER_ENABLED", "false").lower() == "true"
+    )
+    SANDBOX_PRELOAD_MODULES = [
+        name.strip()
+        for name in os.environ.get(
+            "SANDBOX_PRELOAD_MODULES",
+            "random,time,string,math,datetime,collections,itertools,functools,re",
+        ).split(",")
+        if name.strip()
+    ]
+    # User and group forked runs switch to (the server must run as root);
+    # -1 keeps the server's own
+    SANDBOX_UID = int(os.environ.get("SANDBOX_UID") or -1)
+    SANDBOX_GID = int(os.environ.get("SANDBOX_GID") or -1)
+
+    # Cgroup v2 sandboxing - a delegated cgroup directory (e.g.
+    # /sys/fs/cgroup/bhodi/sandboxes) that the server can create children
+    # in and move its own children to; each sandbox then gets a cgroup with
+    # these limits instead of the memory and process rlimits. Empty, or a
+    # directory that cannot be used, keeps the rlimits
+    SANDBOX_CGROUP_ROOT = os.environ.get("SANDBOX_CGROUP_ROOT", "")
+    SANDBOX_CGROUP_CPU_LIMIT = float(os.environ.get("SANDBOX_CGROUP_CPU_LIMIT", "1"))
+    SANDBOX_CGROUP_PIDS_LIMIT = int(os.environ.get("SANDBOX_CGROUP_PIDS_LIMIT", "10"))
+    # Limits shared by all sandboxes together; unset leaves the directory's own
+    SANDBOX_CGROUP_TOTAL_MEMORY_MB = (
+        int(os.environ["SANDBOX_CGROUP_TOTAL_MEMORY_MB"])
+        if os.environ.get("SANDBOX_CGROUP_TOTAL_MEMORY_MB")
+        else None
+    )
+    SANDBOX_CGROUP_TOTAL_CPU_LIMIT = (
+        float(os.environ["SANDBOX_CGROUP_TOTAL_CPU_LIMIT"])
+        if os.environ.get("SANDBOX_CGROUP_TOTAL_CPU_LIMIT")
+        else None
+    )
+
+    # Admission control - concurrent sandboxes, and how many runs may wait
+    # (and for how many seconds) before new ones get a 503
+    EXECUTION_MAX_CONCURRENT = int(os.environ.get("EXECUTION_MAX_CONCURRENT", "2"))
+    EXECUTION_QUEUE_SIZE = int(os.environ.get("EXECUTION_QUEUE_SIZE", "8"))
+    EXECUTION_QUEUE_TIMEOUT = float(os.environ.get("EXECUTION_QUEUE_TIMEOUT", "5"))
+    # Runs one client IP may have waiting, whatever its browser sessions
+    EXECUTION_CLIENT_QUEUE_SIZE = int(os.environ.get("EXECUTION_CLIENT_QUEUE_SIZE", "4"))
+
+    # Background jobs (/api/jobs) - executor threads, how many jobs may be
+    # queued or running, and seconds a finished result can be fetched
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+    JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", "50"))
+    JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "300"))
+    # Seconds between keepalive comments on a job's event stream
+    JOB_EVENTS_KEEPALIVE = float(os.environ.get("JOB_EVENTS_KEEPALIVE", "15"))
+
+    # Batch checks (/lesson/<id>/check-batch) - submissions per request, per
+    # client per minute, and how many of them are graded at once
+    BATCH_CHECK_MAX_SUBMISSIONS = int(
+        os.environ.get("BATCH_CHECK_MAX_SUBMISSIONS", "50")
+    )
+    BATCH_CHECK_SUBMISSIONS_PER_MINUTE = int(
+        os.environ.get("BATCH_CHECK_SUBMISSIONS_PER_MINUTE", "50")
+    )
+    BATCH_CHECK_CONCURRENCY = int(os.environ.get("BATCH_CHECK_CONCURRENCY", "2"))
+
+    # Lessons - seconds between checks for edited lesson files (0 disables)
+    LESSON_RELOAD_INTERVAL = float(os.environ.get("LESSON_RELOAD_INTERVAL", "0"))
+    # Cache-Control max-age for lesson responses (revalidated via ETag)
+    LESSON_CACHE_MAX_AGE = int(os.environ.get("LESSON_CACHE_MAX_AGE", "60"))
 
     # Security settings
     ENABLE_CODE_EXECUTION = (
         os.environ.get("ENABLE_CODE_EXECUTION", "true").lower() == "true"
     )
+    # Run lesson solutions when expected_outputs.json is missing or stale;
+    # production serves only outputs built by build_expected_outputs.py
+    SOLUTION_EXECUTION_ENABLED = (
+        os.environ.get("SOLUTION_EXECUTION_ENABLED", "true").lower() == "true"
+    )
+    # Validation verdicts (and compiled code) kept, by source hash
+    VALIDATION_CACHE_SIZE = int(os.environ.get("VALIDATION_CACHE_SIZE", "1024"))
+    # Responses of deterministic runs kept, by count and serialized bytes
+    RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "512"))
+    RESULT_CACHE_MAX_BYTES = int(
+        os.environ.get("RESULT_CACHE_MAX_BYTES", str(8 * 1024 * 1024))
+    )
+    # Feedback on wrong outputs kept, by lesson and output hashes
+    FEEDBACK_CACHE_SIZE = int(os.environ.get("FEEDBACK_CACHE_SIZE", "1024"))
+
+    # Rate limiting - hard cap on tracked (client, endpoint) pairs, and how
+    # often idle ones are swept
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", "10000"))
+    RATE_LIMIT_SWEEP_INTERVAL = int(os.environ.get("RATE_LIMIT_SWEEP_INTERVAL", "60"))
 
     # Logging
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
+    # Prometheus metrics port (0 disables the metrics server)
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -41,6 +145,8 @@ class DevelopmentConfig(Config):
         "https://bhodi-coding-plataform.netlify.app",
     ]
     LOG_LEVEL = "DEBUG"
+    LESSON_RELOAD_INTERVAL = float(os.environ.get("LESSON_RELOAD_INTERVAL", "2"))
+    LESSON_CACHE_MAX_AGE = int(os.environ.get("LESSON_CACHE_MAX_AGE", "0"))
 
 
 # Helper function to get CORS origins with smart fallback
@@ -79,6 +185,14 @@ class ProductionConfig(Config):
         os.environ.get("MAX_CODE_LENGTH", "5000")
     )  # Smaller limit in prod
 
+    # Scraped by Fly.io, see [[metrics]] in fly.toml
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", "9091"))
+
+    # Expected outputs are built before deploying; never run solutions
+    SOLUTION_EXECUTION_ENABLED = (
+        os.environ.get("SOLUTION_EXECUTION_ENABLED", "false").lower() == "true"
+    )
+
 
 class TestingConfig(Config):
     """Testing configuration"""
@@ -0,0 +1,278 @@
+"""
+Python error parsing for student-facing messages
+Turns a traceback into the error type, location and a friendly explanation
+
+Only the end of stderr is read: the exception line, the caret and source
+lines above it and the innermost frame of the student's file. The
+exception is looked up by class name in ERROR_MESSAGES; a lesson can
+replace any entry's friendly message and suggestion with an
+error_messages.json file.
+"""
+
+import json
+import re
+
+from runner.safe_runner import STUDENT_FILENAME
+
+# Lines read from the end of stderr at most, whatever came before them
+MAX_SCANNED_LINES = 200
+
+# "ValueError: message", "json.decoder.JSONDecodeError: message", "KeyboardInterrupt"
+_EXCEPTION_LINE = re.compile(r"(?:[A-Za-z_]\w*\.)*([A-Za-z_]\w*)(?::\s?(.*))?")
+# Class names that are taken for exceptions even without a traceback above them
+_EXCEPTION_NAME = re.compile(r"\w*(?:Error|Exception|Exit|Interrupt|Iteration|Expired)")
+_FRAME_LINE = re.compile(r'\s*File "([^"]*)", line (\d+)')
+_BARE_LINE_NUMBER = re.compile(r"\s*line (\d+)")
+_CARET_LINE = re.compile(r"\s*[\^~]+\s*")
+
+# Friendly explanations by exception class name. The message templates
+# may use the fields that DETAIL_PATTERNS extract from the exception text.
+ERROR_MESSAGES = {
+    "SyntaxError": {
+        "type": "syntax_error",
+        "message": "Syntax Error: There's a problem with your Python syntax",
+        "friendly_message": "🔧 Your code has a syntax error - Python can't understand what you wrote.",
+        "suggestion": "Check for missing colons (:), unmatched parentheses (), or incorrect indentation.",
+    },
+    "IndentationError": {
+        "type": "indentation_error",
+        "message": "Indentation Error: Your code indentation is incorrect",
+        "friendly_message": "📏 Python is very picky about spacing! Your indentation isn't quite right.",
+        "suggestion": "Make sure you use 4 spaces for each level of indentation, and be consistent.",
+    },
+    "NameError": {
+        "type": "name_error",
+        "message": "Name Error: The name '{name}' is not defined",
+        "friendly_message": "🔍 Python doesn't know what '{name}' is!",
+        "suggestion": "Make sure you've defined '{name}' before using it, or check for typos.",
+    },
+    "TypeError": {
+        "type": "type_error",
+        "message": "Type Error: You're trying to use a value in the wrong way",
+        "friendly_message": "🔄 You're mixing up different types of data (like numbers and text).",
+        "suggestion": "Check that you're using the right type of data for what you're trying to do.",
+    },
+    "ValueError": {
+        "type": "value_error",
+        "message": "Value Error: The value you provided isn't valid for this operation",
+        "friendly_message": "⚠️ The value you're using isn't what Python expected.",
+        "suggestion": "Check the values you're passing to functions - they might be in the wrong format.",
+    },
+    "IndexError": {
+        "type": "index_error",
+        "message": "Index Error: You're trying to access an item that doesn't exist",
+        "friendly_message": "📋 You're trying to access an item in a list that doesn't exist!",
+        "suggestion": "Check that your list has enough items, or that your index number isn't too big.",
+    },
+    "KeyError": {
+        "type": "key_error",
+        "message": "Key Error: The dictionary key you're looking for doesn't exist",
+        "friendly_message": "🗝️ That key doesn't exist in your dictionary!",
+        "suggestion": "Check the spelling of your key, or use .get() method for safer access.",
+    },
+    "ZeroDivisionError": {
+        "type": "zero_division_error",
+        "message": "Zero Division Error: You can't divide by zero",
+        "friendly_message": "🚫 Oops! You tried to divide by zero - that's mathematically impossible!",
+        "suggestion": "Check your math and make sure you're not dividing by zero.",
+    },
+    "TimeoutExpired": {
+        "type": "timeout_error",
+        "message": "Timeout Error: Your code took too long to run",
+        "friendly_message": "⏰ Your code timed out - it ran longer than it's allowed to.",
+        "suggestion": "Check for infinite loops, like a while loop whose condition never becomes False.",
+    },
+}
+ERROR_MESSAGES["TabError"] = ERROR_MESSAGES["IndentationError"]
+ERROR_MESSAGES["UnboundLocalError"] = ERROR_MESSAGES["NameError"]
+
+# Any other exception, e.g. AttributeError or ModuleNotFoundError
+RUNTIME_ERROR = {
+    "type": "runtime_error",
+    "message": "Runtime Error: Something went wrong while running your code",
+    "friendly_message": "⚡ Your code started running but hit a problem along the way.",
+    "suggestion": "Read the error message carefully - it often tells you exactly what went wrong!",
+}
+
+# Output with no recognizable exception in it
+UNKNOWN_ERROR = {
+    "type": "unknown_error",
+    "message": "Unknown error occurred",
+    "friendly_message": "❓ An unknown error occurred - we're not sure what went wrong.",
+    "suggestion": "Check your code for any obvious issues and try again.",
+}
+
+# Template fields taken from the exception text, by class name
+DETAIL_PATTERNS = {
+    "NameError": re.compile(r"name '(?P<name>\w+)' is not defined"),
+    "UnboundLocalError": re.compile(r"local variable '(?P<name>\w+)'|access local variable '(?P<local>\w+)'"),
+}
+DEFAULT_DETAILS = {"name": "variable"}
+
+# Keys a lesson's error_messages.json may set per exception
+OVERRIDABLE_FIELDS = ("friendly_message", "suggestion")
+
+
+def parse_error_messages(text):
+    """
+    Parse a lesson's error_messages.json
+
+    The file maps exception class names to a "friendly_message" and/or
+    "suggestion" that replace the default ones in that lesson.
+
+    Raises:
+        ValueError: If the file is not a mapping of such entries
+    """
+    overrides = json.loads(text)
+    if not isinstance(overrides, dict):
+        raise ValueError("error_messages.json must map exception names to messages")
+    for name, fields in overrides.items():
+        if not isinstance(fields, dict) or not all(
+            key in OVERRIDABLE_FIELDS and isinstance(value, str)
+            for key, value in fields.items()
+        ):
+            raise ValueError(
+                f"{name}: only string {' and '.join(OVERRIDABLE_FIELDS)} may be set"
+            )
+    return overrides
+
+
+def _lines_from_end(text):
+    """Yield the lines of text last to first, at most MAX_SCANNED_LINES"""
+    end = len(text)
+    while end and text[end - 1].isspace():
+        end -= 1
+    for _ in range(MAX_SCANNED_LINES):
+        if end < 0:
+            return
+        start = text.rfind("\n", 0, end) + 1
+        yield text[start:end]
+        end = start - 1
+
+
+def _locate(frame_lines):
+    """
+    Source line and caret column of a frame
+
+    Args:
+        frame_lines (list): The lines below a frame line, last first
+
+    Returns:
+        tuple: (stripped source line or None, 1-based column or None)
+    """
+    caret = None
+    for text in frame_lines:
+        if caret is None and _CARET_LINE.fullmatch(text):
+            caret = text
+        elif text.strip():
+            code = text.strip()
+            if caret is None:
+                return code, None
+            indent = len(text) - len(text.lstrip())
+            column = len(caret) - len(caret.lstrip()) - indent + 1
+            return code, column if 1 <= column <= len(code) + 1 else None
+    return None, None
+
+
+def _take_frame(found, frame, frame_lines):
+    """
+    Record a frame line met while scanning stderr upwards
+
+    Returns:
+        bool: True once it is a student frame above the exception, so the
+            scan can stop
+    """
+    in_student_file = frame.group(1).endswith(STUDENT_FILENAME)
+    if found["line"] is None or (found["exception"] and in_student_file):
+        # The innermost frame, or failing that the innermost in the
+        # student's own file
+        found["line"] = int(frame.group(2))
+        found["code"], found["column"] = _locate(frame_lines)
+    return bool(found["exception"]) and in_student_file
+
+
+def _take_exception_line(found, text):
+    """Record a line below the last frame: a bare line number or the exception"""
+    if found["line"] is None:
+        bare = _BARE_LINE_NUMBER.match(text)
+        if bare:
+            found["line"] = int(bare.group(1))
+            return
+    if text and not text[0].isspace():
+        exception = _EXCEPTION_LINE.fullmatch(text)
+        if exception:
+            found["exception"] = exception.group(1)
+            found["detail"] = exception.group(2) or ""
+
+
+def _scan(error_output):
+    """
+    Find the exception and the innermost student frame at the end of stderr
+
+    Returns:
+        dict: "exception", "detail", "line", "code", "column"; the
+            exception is None if no exception line was found
+    """
+    found = {"exception": None, "detail": "", "line": None, "code": None, "column": None}
+    frame_lines = []
+    frame_seen = False
+
+    for text in _lines_from_end(error_output):
+        frame = _FRAME_LINE.match(text)
+        if frame:
+            frame_seen = True
+            if _take_frame(found, frame, frame_lines):
+                break
+            frame_lines = []
+        elif found["exception"] is None:
+            _take_exception_line(found, text)
+        else:
+            frame_lines.append(text)
+
+    if found["exception"] is not None and not frame_seen:
+        if not _EXCEPTION_NAME.fullmatch(found["exception"]):
+            # A bare word at the end of the output, not a traceback
+            found["exception"] = None
+    return found
+
+
+def parse_python_error(error_output, lesson_messages=None):
+    """
+    Parse Python error output to provide user-friendly error information
+
+    Args:
+        error_output (str): Raw error output from Python
+        lesson_messages (dict): The lesson's overrides from
+            parse_error_messages(), by exception class name
+
+    Returns:
+        dict: "type", "message", "friendly_message", "suggestion", plus
+            "exception" (class name), "line", "column" and "code" (the
+            failing source line) where they could be found
+    """
+    found = _scan(error_output or "")
+    exception = found["exception"]
+    if exception is None:
+        entry = UNKNOWN_ERROR
+    else:
+        entry = ERROR_MESSAGES.get(exception, RUNTIME_ERROR)
+
+    details = dict(DEFAULT_DETAILS)
+    pattern = DETAIL_PATTERNS.get(exception)
+    if pattern is not None:
+        match = pattern.search(found["detail"])
+        if match:
+            details["name"] = next(value for value in match.groups() if value)
+
+    result = {
+        key: entry[key].format_map(details)
+        for key in ("message", "friendly_message", "suggestion")
+    }
+    if lesson_messages and exception in lesson_messages:
+        result.update(lesson_messages[exception])
+    result["type"] = entry["type"]
+    result["exception"] = exception
+    result["line"] = found["line"]
+    result["column"] = found["column"]
+    result["code"] = found["code"]
+    return result
@@ -0,0 +1,113 @@
+"""
+Precomputed expected outputs for lesson solutions
+Built at deploy time by build_expected_outputs.py, so answer checks need not
+run solution code
+
+Each lesson directory gets an expected_outputs.json holding the SHA-256 of
+the solution it was built from and the solution's stdout for every input
+vector the check uses. An artifact whose hash no longer matches the
+solution is ignored.
+"""
+
+import hashlib
+import json
+
+ARTIFACT_FILE = "expected_outputs.json"
+
+# Inputs fed to input() calls when the user didn't provide any
+DEFAULT_SIMULATED_INPUTS = ["quit", "test", "hello"]
+
+
+def default_inputs(code):
+    """Inputs a run of code gets without user input: the defaults, if it reads any"""
+    return list(DEFAULT_SIMULATED_INPUTS) if "input(" in code else []
+
+
+def source_hash(text):
+    """SHA-256 hex digest of a source or output text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def input_vectors(lesson):
+    """
+    Input vectors an answer check runs a lesson's solution with
+
+    Returns:
+        list: One list of input() lines per test case, or the single
+            default vector for lessons without test cases
+    """
+    if lesson.test_cases:
+        return [case["inputs"] for case in lesson.test_cases]
+    return [default_inputs(lesson.check_solution or "")]
+
+
+def build_artifact(lesson, outputs):
+    """
+    Serialize the expected outputs of a lesson
+
+    Args:
+        lesson (Lesson): Lesson whose check solution was run
+        outputs (list): Solution stdout per vector of input_vectors(lesson)
+
+    Returns:
+        str: Compact JSON for the lesson's expected_outputs.json
+    """
+    artifact = {
+        "solution_file": lesson.check_solution_file,
+        "solution_sha256": source_hash(lesson.check_solution),
+        "outputs": [
+            {"inputs": inputs, "output": output, "sha256": source_hash(output)}
+            for inputs, output in zip(input_vectors(lesson), outputs)
+        ],
+    }
+    return json.dumps(artifact, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class ExpectedOutputs:
+    """
+    A lesson's parsed expected_outputs.json
+
+    Args:
+        solution_sha256 (str): Hash of the solution the outputs came from
+        outputs (dict): Solution stdout keyed by input vector tuple
+    """
+
+    def __init__(self, solution_sha256, outputs):
+        self.solution_sha256 = solution_sha256
+        self.outputs = outputs
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse an artifact, verifying every output against its hash
+
+        Raises:
+            ValueError: If the artifact is malformed or an output is corrupt
+        """
+        artifact = json.loads(text)
+        outputs = {}
+        for entry in artifact["outputs"]:
+            if source_hash(entry["output"]) != entry["sha256"]:
+                raise ValueError(f"Output for inputs {entry['inputs']} is corrupt")
+            outputs[tuple(entry["inputs"])] = entry["output"]
+        return cls(artifact["solution_sha256"], outputs)
+
+    def lookup(self, solution_code, inputs):
+        """
+        Expected output for a solution run
+
+        Returns:
+            str: The precomputed stdout, or None if the artifact was built
+                from another solution or never ran these inputs
+        """
+        if source_hash(solution_code) != self.solution_sha256:
+            return None
+        return self.outputs.get(tuple(inputs))
+
+    def is_current(self, lesson):
+        """Whether the artifact covers the lesson's solution and inputs"""
+        solution = lesson.check_solution or ""
+        return all(
+            self.lookup(solution, inputs) is not None
+            for inputs in input_vectors(lesson)
+        )
@@ -0,0 +1,200 @@
+"""
+Feedback on answers whose output differs from the expected output
+Diffs the two outputs line by line and explains the first differences
+
+The diff runs in linear time: the common leading and trailing lines are
+skipped, and the lines left in between are matched by counting, so a
+line the student printed in the wrong place is reported once as missing
+and once as extra rather than shifting every line after it. Feedback is
+cached by lesson and output hashes, so the same wrong output is only
+diffed once.
+"""
+
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+# Missing or extra lines listed in a diff and quoted in feedback
+MAX_REPORTED_LINES = 5
+
+
+def _normalize_whitespace(lines):
+    """Lines with runs of whitespace collapsed and blank lines dropped"""
+    return [" ".join(line.split()) for line in lines if line.strip()]
+
+
+def _unmatched(lines, other_lines):
+    """Lines of lines with no counterpart left in other_lines, in order"""
+    available = Counter(other_lines)
+    unmatched = []
+    for line in lines:
+        if available[line]:
+            available[line] -= 1
+        else:
+            unmatched.append(line)
+    return unmatched
+
+
+def diff_outputs(student_output, expected_output):
+    """
+    Compare two outputs line by line
+
+    Returns:
+        dict: "first_difference" ({"line", "expected", "student"} with a
+            1-based line number and None for a line that is absent),
+            "missing_lines" and "extra_lines" (at most MAX_REPORTED_LINES
+            each, plus "missing_count" and "extra_count") and
+            "whitespace_only", True when the outputs differ only in
+            spacing or blank lines
+    """
+    student = student_output.splitlines()
+    expected = expected_output.splitlines()
+
+    shorter = min(len(student), len(expected))
+    prefix = 0
+    while prefix < shorter and student[prefix] == expected[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < shorter - prefix
+        and student[-1 - suffix] == expected[-1 - suffix]
+    ):
+        suffix += 1
+
+    student_middle = student[prefix : len(student) - suffix]
+    expected_middle = expected[prefix : len(expected) - suffix]
+    missing = _unmatched(expected_middle, student_middle)
+    extra = _unmatched(student_middle, expected_middle)
+
+    first_difference = None
+    if student_middle or expected_middle:
+        first_difference = {
+            "line": prefix + 1,
+            "expected": expected[prefix] if prefix < len(expected) else None,
+            "student": student[prefix] if prefix < len(student) else None,
+        }
+
+    return {
+        "first_difference": first_difference,
+        "missing_lines": missing[:MAX_REPORTED_LINES],
+        "missing_count": len(missing),
+        "extra_lines": extra[:MAX_REPORTED_LINES],
+        "extra_count": len(extra),
+        "whitespace_only": (
+            first_difference is not None
+            and _normalize_whitespace(student_middle)
+            == _normalize_whitespace(expected_middle)
+        ),
+    }
+
+
+def _plural(count, word):
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+
+def describe_diff(diff):
+    """
+    Turn a diff into feedback for the student
+
+    Returns:
+        tuple: (feedback lines, hints)
+    """
+    feedback_parts = []
+    hints = []
+    first = diff["first_difference"]
+    if first is None:
+        return feedback_parts, hints
+
+    if diff["whitespace_only"]:
+        feedback_parts.append(
+            "🔤 Your output has the right text, but the spacing or blank lines are different."
+        )
+        hints.append("Check for extra spaces and for print() calls that add empty lines.")
+        return feedback_parts, hints
+
+    if first["student"] is None:
+        feedback_parts.append(
+            f"✂️ Your output stops after line {first['line'] - 1}; line {first['line']} should be: {first['expected']!r}"
+        )
+        hints.append("Make sure every message of the program gets printed.")
+    elif first["expected"] is None:
+        feedback_parts.append(
+            f"➕ Your output goes on after line {first['line'] - 1}, starting with: {first['student']!r}"
+        )
+        hints.append("Remove the extra print() calls, or make sure they only run when they should.")
+    else:
+        feedback_parts.append(
+            f"🔍 Line {first['line']} is different.\n"
+            f"   Expected: {first['expected']!r}\n"
+            f"   Yours:    {first['student']!r}"
+        )
+        if first["student"].lower() == first["expected"].lower():
+            hints.append("The words are right - check the capital letters.")
+        elif first["student"].split() == first["expected"].split():
+            hints.append("The words are right - check the spaces.")
+        else:
+            hints.append("Compare your output with the expected output below.")
+
+    if diff["missing_count"]:
+        quoted = "\n".join(f"   {line!r}" for line in diff["missing_lines"])
+        feedback_parts.append(
+            f"➖ Missing {_plural(diff['missing_count'], 'line')}:\n{quoted}"
+        )
+    if diff["extra_count"]:
+        quoted = "\n".join(f"   {line!r}" for line in diff["extra_lines"])
+        feedback_parts.append(
+            f"➕ {_plural(diff['extra_count'], 'extra line')}:\n{quoted}"
+        )
+    return feedback_parts, hints
+
+
+class FeedbackCache:
+    """
+    Diffs and feedback for wrong outputs, LRU, keyed by lesson and output hashes
+
+    Args:
+        max_entries (int): Entries kept before the least recent is dropped
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(lesson_id, student_output, expected_output):
+        """Build the cache key for a pair of outputs"""
+        digest = hashlib.sha256(lesson_id.encode("utf-8"))
+        for output in (student_output, expected_output):
+            digest.update(hashlib.sha256(output.encode("utf-8", "surrogatepass")).digest())
+        return digest.digest()
+
+    def feedback(self, lesson_id, student_output, expected_output):
+        """
+        Diff two outputs and describe the differences, reusing earlier work
+
+        Returns:
+            tuple: (diff, feedback lines, hints), shared between callers
+                and not to be modified
+        """
+        key = self.make_key(lesson_id, student_output, expected_output)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        diff = diff_outputs(student_output, expected_output)
+        entry = (diff,) + describe_diff(diff)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,185 @@
+"""
+Background jobs for code execution
+Runs submitted work on a thread pool so the web worker can answer at once
+
+Jobs and their results live in the memory of the process that accepted
+them, so only that process can answer a poll for one. The job endpoints
+need the backend to run as a single worker process on a single machine
+(gunicorn --workers 1, with --threads for concurrency); with several, a
+poll that reaches another process gets a 404 for a job that exists.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are pending; the caller should answer 503"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many pending jobs")
+        self.retry_after = retry_after
+
+
+class Job:
+    """One submitted unit of work and, once finished, its response"""
+
+    def __init__(self, kind):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.payload = None
+        self.http_status = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """Job state as returned by the polling endpoint"""
+        result = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "job_status": self.status,
+            "submitted_at": self.submitted_at,
+        }
+        if self.started_at is not None:
+            result["queue_time"] = f"{self.started_at - self.submitted_at:.3f}s"
+        if self.done:
+            result["result"] = self.payload
+            result["result_status"] = self.http_status
+        return result
+
+
+class JobStore:
+    """
+    Job queue and short-lived result store
+
+    Each job runs a function returning (payload, http_status) on a small
+    thread pool. Finished jobs are kept for result_ttl seconds so clients
+    can poll for them; at most max_pending jobs may be queued or running.
+    The store is per process (see the module docstring).
+
+    Args:
+        max_workers (int): Jobs executed at the same time
+        max_pending (int): Queued plus running jobs before submit is refused
+        result_ttl (float): Seconds a finished job's result stays available
+    """
+
+    def __init__(self, max_workers=2, max_pending=50, result_ttl=300):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.result_ttl = result_ttl
+        self.pending = 0
+        self.completed = 0
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def submit(self, kind, func, *args):
+        """
+        Queue func(*args) to run in the background
+
+        Args:
+            kind (str): Job type shown to clients, e.g. "run-code"
+            func (callable): Returns (payload dict, http status)
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already waiting or running
+        """
+        job = Job(kind)
+        with self._lock:
+            self._purge(time.time())
+            if self.pending >= self.max_pending:
+                raise JobQueueFull(self._retry_after())
+            self.pending += 1
+            self._jobs[job.job_id] = job
+            executor = self._get_executor()
+
+        executor.submit(self._run, job, func, args)
+        return job
+
+    def get(self, job_id):
+        """Get a job by id, or None if it is unknown or its result expired"""
+        with self._lock:
+            self._purge(time.time())
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def _get_executor(self):
+        """Thread pool for this process (lock held)"""
+        # Threads don't survive a fork, so a gunicorn worker needs its own pool
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="job"
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, job, func, args):
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        try:
+            payload, http_status = func(*args)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} ({job.kind}) failed: {e}")
+            payload = {
+                "status": "error",
+                "message": "Internal server error",
+                "error_type": "system_error",
+            }
+            http_status = 500
+
+        job.payload = payload
+        job.http_status = http_status
+        job.finished_at = time.time()
+        job.status = JOB_DONE
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        job._done.set()
+
+    def _purge(self, now):
+        """Drop finished jobs older than result_ttl (lock held)"""
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at >= self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _retry_after(self):
+        """Rough wait for a slot, assuming a few seconds per job"""
+        return max(1, self.pending // self.max_workers)
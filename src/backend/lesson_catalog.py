@@ -0,0 +1,256 @@
+"""
+In-memory lesson catalog for the Bhodi Learning Platform
+Maps lesson ids to their directories and keeps lesson files in memory
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from error_parser import parse_error_messages
+from expected_outputs import ARTIFACT_FILE, ExpectedOutputs
+
+logger = logging.getLogger(__name__)
+
+# Files read from every lesson directory
+LESSON_FILES = (
+    "problem_statement.md",
+    "starter_code.py",
+    "solution.py",
+    "solution_check.py",
+    "test_cases.json",
+    "error_messages.json",
+    ARTIFACT_FILE,
+)
+
+
+def _normalize_lesson_id(lesson_id):
+    """Lesson ids are zero-padded to two digits, as in lesson_01_..."""
+    return str(lesson_id).zfill(2)
+
+
+def _file_signature(directory):
+    """(name, mtime, size) of each lesson file present, for change detection"""
+    signature = []
+    for name in LESSON_FILES:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _read_files(directory, signature):
+    """Contents of the lesson files listed in a _file_signature(), by name"""
+    files = {}
+    for name, _, _ in signature:
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            files[name] = f.read()
+    return files
+
+
+def _parse_test_cases(text):
+    """
+    Parse a lesson's test_cases.json
+
+    The file holds {"cases": [{"name", "inputs", "expected_output"}]};
+    expected_output may be left out to use the solution's output.
+
+    Returns:
+        list: Cases with name, inputs and expected_output (or None)
+
+    Raises:
+        ValueError: If the file is not valid test case JSON
+    """
+    cases = json.loads(text).get("cases")
+    if not isinstance(cases, list) or not cases:
+        raise ValueError("test_cases.json needs a non-empty 'cases' list")
+
+    parsed = []
+    for number, case in enumerate(cases, start=1):
+        inputs = case.get("inputs", [])
+        expected = case.get("expected_output")
+        if not isinstance(inputs, list) or not all(
+            isinstance(value, str) for value in inputs
+        ):
+            raise ValueError(f"Case {number}: 'inputs' must be a list of strings")
+        if expected is not None and not isinstance(expected, str):
+            raise ValueError(f"Case {number}: 'expected_output' must be a string")
+        parsed.append(
+            {
+                "name": str(case.get("name") or f"case {number}"),
+                "inputs": inputs,
+                "expected_output": expected,
+            }
+        )
+    return parsed
+
+
+class Lesson:
+    """The files of one lesson directory, read into memory"""
+
+    def __init__(self, lesson_id, directory):
+        self.lesson_id = lesson_id
+        self.directory = directory
+        self.signature = _file_signature(directory)
+        # Pre-rendered responses, filled in by the catalog's renderer
+        self.rendered = {}
+        self.files = _read_files(directory, self.signature)
+
+        # Input vectors the answer check runs, None for single-output lessons
+        self.test_cases = self._parse_file(
+            "test_cases.json",
+            _parse_test_cases,
+            (ValueError, AttributeError),
+            "test cases",
+        )
+        # Lesson-specific friendly messages, by exception class name
+        self.error_messages = self._parse_file(
+            "error_messages.json", parse_error_messages, ValueError, "error messages"
+        )
+        # Solution outputs built at deploy time by build_expected_outputs.py
+        self.expected_outputs = self._parse_file(
+            ARTIFACT_FILE,
+            ExpectedOutputs.parse,
+            (ValueError, KeyError, TypeError),
+            "expected outputs",
+        )
+
+    def _parse_file(self, name, parse, errors, description):
+        """
+        Parse one of the lesson's optional files
+
+        Returns:
+            The parsed file, or None if it is missing or invalid (logged)
+        """
+        if name not in self.files:
+            return None
+        try:
+            return parse(self.files[name])
+        except errors as e:
+            logger.error(f"Ignoring {description} of lesson {self.lesson_id}: {e}")
+            return None
+
+    @property
+    def problem_statement(self):
+        return self.files.get("problem_statement.md")
+
+    @property
+    def starter_code(self):
+        return self.files.get("starter_code.py")
+
+    @property
+    def solution(self):
+        return self.files.get("solution.py")
+
+    @property
+    def check_solution_file(self):
+        """Solution used for automated checking: solution_check.py first"""
+        for name in ("solution_check.py", "solution.py"):
+            if name in self.files:
+                return name
+        return None
+
+    @property
+    def check_solution(self):
+        name = self.check_solution_file
+        return self.files[name] if name else None
+
+    @property
+    def check_solution_path(self):
+        name = self.check_solution_file
+        return os.path.join(self.directory, name) if name else None
+
+
+class LessonCatalog:
+    """
+    Lesson index built once at startup
+
+    Args:
+        lessons_base (str): Directory containing lesson_XX_* directories
+        refresh_interval (float): Seconds between mtime polls for edited
+            lessons; 0 disables hot reloading
+        renderer (callable): Called with each newly loaded Lesson, e.g. to
+            pre-render its API response
+    """
+
+    def __init__(self, lessons_base, refresh_interval=0, renderer=None):
+        self.lessons_base = lessons_base
+        self.refresh_interval = refresh_interval
+        self.renderer = renderer
+        self._lessons = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    def load(self):
+        """Scan the lessons directory, reusing lessons whose files are unchanged"""
+        with self._lock:
+            previous = self._lessons
+            lessons = {}
+            for item in self._list_lesson_dirs():
+                lesson_id = item.split("_")[1]
+                if lesson_id in lessons:
+                    continue
+                directory = os.path.join(self.lessons_base, item)
+                existing = previous.get(lesson_id)
+                if (
+                    existing is not None
+                    and existing.directory == directory
+                    and existing.signature == _file_signature(directory)
+                ):
+                    lessons[lesson_id] = existing
+                    continue
+                try:
+                    lesson = Lesson(lesson_id, directory)
+                    if self.renderer is not None:
+                        self.renderer(lesson)
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.error(f"Could not load lesson {item}: {e}")
+                    continue
+                lessons[lesson_id] = lesson
+                if existing is not None:
+                    logger.info(f"Reloaded lesson {lesson_id} from {directory}")
+
+            # Swap in the new index in one assignment so readers never lock
+            self._lessons = lessons
+            self._last_refresh = time.monotonic()
+
+        logger.debug(f"Lesson catalog loaded {len(lessons)} lessons")
+        return self
+
+    def get(self, lesson_id):
+        """
+        Get a lesson by id
+
+        Args:
+            lesson_id (str): Lesson id such as "1" or "01"
+
+        Returns:
+            Lesson: The lesson, or None if there is no such lesson
+        """
+        if (
+            self.refresh_interval
+            and time.monotonic() - self._last_refresh >= self.refresh_interval
+        ):
+            self.load()
+        return self._lessons.get(_normalize_lesson_id(lesson_id))
+
+    def lesson_ids(self):
+        return sorted(self._lessons)
+
+    def __len__(self):
+        return len(self._lessons)
+
+    def _list_lesson_dirs(self):
+        if not os.path.isdir(self.lessons_base):
+            return []
+        return sorted(
+            item
+            for item in os.listdir(self.lessons_base)
+            if item.startswith("lesson_")
+            and item.count("_") >= 2
+            and os.path.isdir(os.path.join(self.lessons_base, item))
+        )
@@ -0,0 +1,354 @@
+"""
+Prometheus metrics for the Bhodi Learning Platform Backend
+Counters and histograms in the Prometheus text exposition format
+
+Recording a value never takes a lock: each thread writes to its own shard
+and shards are merged when /metrics is scraped. Values that already live
+elsewhere (pool size, cache hit counts) are read by callbacks at scrape
+time instead of being recorded on the hot path.
+"""
+
+import bisect
+import logging
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cached lesson read to a full timeout
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Memory buckets in bytes, from a bare interpreter up to the machine size
+MEMORY_BUCKETS = tuple(
+    megabytes * 1024 * 1024 for megabytes in (8, 16, 24, 32, 48, 64, 96, 128, 192, 256, 512)
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Shards kept before those of finished threads are folded outside a scrape
+MAX_LIVE_SHARDS = 64
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return f"{value:.1f}"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels[name]) for name in self.labelnames))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry._shard()
+        key = self._key(labels)
+        cell = shard.get(key)
+        if cell is None:
+            shard[key] = [amount]
+        else:
+            cell[0] += amount
+
+    def render(self, values):
+        lines = []
+        for label_values, cell in sorted(values.items()):
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(cell[0])}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames, buckets):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self.registry._shard()
+        key = self._key(labels)
+        cell = shard.get(key)
+        if cell is None:
+            # One count per bucket plus +Inf, then sum and count
+            cell = shard[key] = [0] * (len(self.buckets) + 3)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def render(self, values):
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for label_values, cell in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, cell):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, label_values, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(cell[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cell[-1])}")
+        return lines
+
+
+class _CallbackMetric:
+    """Metric whose samples are read from a function at scrape time"""
+
+    def __init__(self, name, help_text, kind, labelnames, func):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def render(self, _values):
+        samples = self.func()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        lines = []
+        for label_values, value in sorted(samples.items()):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name, help_text, func, labelnames=()):
+        """
+        Register a gauge read from func() at scrape time
+
+        Args:
+            func (callable): Returns a number, or a dict mapping label value
+                tuples to numbers
+        """
+        return self._register(
+            _CallbackMetric(name, help_text, "gauge", labelnames, func)
+        )
+
+    def counter_callback(self, name, help_text, func, labelnames=()):
+        """Register a counter read from func() at scrape time"""
+        return self._register(
+            _CallbackMetric(name, help_text, "counter", labelnames, func)
+        )
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        values = self._collect()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.render(values.get(metric.name, {})))
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            thread_ref = weakref.ref(threading.current_thread())
+            with self._lock:
+                # Servers that use a thread per request would otherwise keep
+                # one shard per finished request until the next scrape
+                if len(self._shards) >= MAX_LIVE_SHARDS:
+                    self._fold_finished_shards()
+                self._shards.append((thread_ref, values))
+            return values
+
+    def _fold_finished_shards(self):
+        """Merge shards of finished threads into _retired (lock held)"""
+        live = []
+        for thread_ref, values in self._shards:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                _merge_cells(self._retired, values)
+            else:
+                live.append((thread_ref, values))
+        self._shards = live
+
+    def _collect(self):
+        """Merge all thread shards into one {metric: {labels: cell}} mapping"""
+        merged = {}
+        with self._lock:
+            self._fold_finished_shards()
+            _merge_cells(merged, self._retired)
+            for _, values in self._shards:
+                # dict.copy() is atomic, so the owning thread can keep writing
+                _merge_cells(merged, values.copy())
+
+        by_metric = {}
+        for (name, label_values), cell in merged.items():
+            by_metric.setdefault(name, {})[label_values] = cell
+        return by_metric
+
+
+def _merge_cells(target, source):
+    """Add every cell of source into target, element by element"""
+    for key, cell in source.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = list(cell)
+        else:
+            for i, value in enumerate(cell):
+                existing[i] += value
+
+
+def start_metrics_server(registry, port, host="0.0.0.0"):
+    """
+    Serve /metrics from a background thread
+
+    Each process can only serve its own metrics; when several gunicorn
+    workers share a machine, the first to bind the port exports.
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None if the port is taken
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the logs
+
+    try:
+        httpd = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.info(f"Metrics server not started on port {port}: {e}")
+        return None
+
+    httpd.daemon_threads = True
+    threading.Thread(
+        target=httpd.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    logger.info(f"Serving metrics on port {httpd.server_address[1]}")
+    return httpd
+
+
+# Metrics exported by the backend
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "bhodi_http_request_duration_seconds",
+    "HTTP request latency by route",
+    labelnames=("route", "method", "status"),
+)
+SANDBOX_SPAWN_SECONDS = REGISTRY.histogram(
+    "bhodi_sandbox_spawn_seconds",
+    "Time to start a sandbox worker interpreter",
+)
+SANDBOX_EXECUTION_SECONDS = REGISTRY.histogram(
+    "bhodi_sandbox_execution_seconds",
+    "Time spent running student code (one-shot and stream modes include "
+    "startup)",
+    labelnames=("mode",),
+)
+SANDBOX_CPU_SECONDS = REGISTRY.histogram(
+    "bhodi_sandbox_cpu_seconds",
+    "User plus system CPU time of student code runs",
+    labelnames=("mode",),
+)
+SANDBOX_PEAK_RSS_BYTES = REGISTRY.histogram(
+    "bhodi_sandbox_peak_rss_bytes",
+    "Peak resident memory of the sandbox during a run",
+    labelnames=("mode",),
+    buckets=MEMORY_BUCKETS,
+)
+SANDBOX_OUTPUT_BYTES = REGISTRY.counter(
+    "bhodi_sandbox_output_bytes_total",
+    "Bytes student code wrote, by stream",
+    labelnames=("stream",),
+)
+EXECUTION_OUTCOMES = REGISTRY.counter(
+    "bhodi_executions_total",
+    "Code executions by outcome (success, error, timeout, memory, killed, "
+    "output_limit, security_rejected, rejected, shed, system_error)",
+    labelnames=("outcome",),
+)
+EXECUTION_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "bhodi_execution_queue_wait_seconds",
+    "Time admitted runs waited for an execution slot, by queue (check, run, "
+    "batch)",
+    labelnames=("queue",),
+)
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "bhodi_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    labelnames=("endpoint",),
+)
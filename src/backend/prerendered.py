@@ -0,0 +1,85 @@
+"""
+Pre-serialized JSON responses
+Encoded and compressed once, served with a strong ETag and 304 support
+"""
+
+import gzip
+import hashlib
+import json
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+
+class PrerenderedResponse:
+    """
+    A JSON payload rendered to bytes ahead of time
+
+    Args:
+        payload (dict): JSON-serializable response body
+        max_age (int): Cache-Control max-age in seconds
+    """
+
+    def __init__(self, payload, max_age=0):
+        self.body = json.dumps(
+            payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        ).encode("utf-8")
+        self.max_age = max_age
+
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Each encoding is a different representation, so each gets its own
+        # strong validator
+        self.variants = {"identity": (self.body, digest)}
+
+        compressed = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if len(compressed) < len(self.body):
+            self.variants["gzip"] = (compressed, f"{digest}-gzip")
+
+        if brotli is not None:
+            compressed = brotli.compress(self.body)
+            if len(compressed) < len(self.body):
+                self.variants["br"] = (compressed, f"{digest}-br")
+
+    @property
+    def etag(self):
+        return self.variants["identity"][1]
+
+    def to_response(self, request):
+        """
+        Build the response for a request
+
+        Picks the best encoding the client accepts and answers with 304 Not
+        Modified when If-None-Match already names this payload.
+
+        Args:
+            request: The current Flask request
+
+        Returns:
+            Response: 200 with the encoded body, or an empty 304
+        """
+        encoding = self._choose_encoding(request)
+        body, etag = self.variants[encoding]
+
+        etags = [variant_etag for _, variant_etag in self.variants.values()]
+        if any(request.if_none_match.contains_weak(tag) for tag in etags):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def _choose_encoding(self, request):
+        accepted = request.accept_encodings
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted[encoding] > 0:
+                return encoding
+        return "identity"
@@ -0,0 +1,171 @@
+"""
+Rate limiting for the Bhodi Learning Platform Backend
+Sliding-window counters per (client, endpoint) with bounded memory
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimitBackend:
+    """
+    Storage interface for rate limit counters
+
+    A backend owns both the counters and the check-and-increment step, so a
+    shared store (e.g. Redis with a server-side script) can make the whole
+    operation atomic across app instances.
+    """
+
+    def hit(self, key, max_requests, window_seconds, now):
+        """
+        Count one request for key if it is within the limit
+
+        Args:
+            key (tuple): (client_ip, endpoint)
+            max_requests (int): Maximum requests allowed in window
+            window_seconds (int): Time window in seconds
+            now (float): Current time in seconds
+
+        Returns:
+            tuple: (allowed, estimated_count, retry_after_seconds)
+        """
+        raise NotImplementedError
+
+    def sweep(self, now):
+        """Forget clients idle long enough that their counters no longer count"""
+
+    def reset(self):
+        """Forget all counters"""
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Per-process counters using a fixed window with interpolation
+
+    The estimate for the sliding window is the current window's count plus
+    the previous window's count weighted by how much of it still overlaps
+    the sliding window. Each key keeps just two counters, so a check is O(1).
+    Keys are kept in least-recently-used order: sweeping pops idle keys from
+    the front, and the oldest key is evicted once max_keys are tracked.
+
+    Args:
+        max_keys (int): Hard cap on tracked (client, endpoint) pairs
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        # key -> [window_index, current_count, previous_count, last_seen, window]
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, max_requests, window_seconds, now):
+        window_index = int(now // window_seconds)
+        elapsed = (now % window_seconds) / window_seconds
+
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                if len(self._counters) >= self.max_keys:
+                    self._counters.popitem(last=False)
+                entry = [window_index, 0, 0, now, window_seconds]
+                self._counters[key] = entry
+            else:
+                self._counters.move_to_end(key)
+                if entry[0] != window_index:
+                    # Roll over: the current window becomes the previous one
+                    entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+                    entry[1] = 0
+                    entry[0] = window_index
+            entry[3] = now
+            entry[4] = window_seconds
+
+            current, previous = entry[1], entry[2]
+            estimate = previous * (1 - elapsed) + current
+            if estimate >= max_requests:
+                return (
+                    False,
+                    estimate,
+                    self._retry_after(
+                        current, previous, max_requests, window_seconds, elapsed
+                    ),
+                )
+
+            entry[1] += 1
+            return True, estimate + 1, 0
+
+    def sweep(self, now):
+        with self._lock:
+            while self._counters:
+                key, entry = next(iter(self._counters.items()))
+                if now - entry[3] < entry[4] * 2:
+                    break
+                del self._counters[key]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+    def __len__(self):
+        return len(self._counters)
+
+    @staticmethod
+    def _retry_after(current, previous, max_requests, window_seconds, elapsed):
+        """Seconds until the weighted estimate drops below the limit"""
+        remaining_in_window = (1 - elapsed) * window_seconds
+        if current >= max_requests or not previous:
+            return max(1, math.ceil(remaining_in_window))
+        # previous * (1 - f) + current < max_requests once f passes this point
+        threshold = 1 - (max_requests - current) / previous
+        return max(1, math.ceil((threshold - elapsed) * window_seconds))
+
+
+class RateLimiter:
+    """
+    Rate limiter front end used by the API endpoints
+
+    Args:
+        backend (RateLimitBackend): Counter storage
+        sweep_interval (float): Seconds between sweeps of idle clients
+    """
+
+    def __init__(self, backend=None, sweep_interval=60):
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    def check(self, client_ip, endpoint, max_requests=10, window_seconds=60):
+        """
+        Check if client has exceeded rate limit, counting this request if not
+
+        Returns:
+            dict: Rate limit check result
+        """
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.backend.sweep(now)
+
+        allowed, estimate, retry_after = self.backend.hit(
+            (client_ip, endpoint), max_requests, window_seconds, now
+        )
+
+        if not allowed:
+            return {
+                "allowed": False,
+                "message": f"Rate limit exceeded. Maximum {max_requests} requests per {window_seconds} seconds.",
+                "retry_after": retry_after,
+            }
+
+        return {
+            "allowed": True,
+            "requests_remaining": max(0, int(max_requests - estimate)),
+        }
+
+    def reset(self):
+        self.backend.reset()
@@ -0,0 +1,82 @@
+"""
+Execution result cache for /api/run-code
+Answers repeated runs of the same deterministic program without a sandbox
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+class ExecutionResultCache:
+    """
+    Responses of finished runs, keyed by what determines their output
+
+    A key covers the sanitized source, the simulated input vector and the
+    timeout, so a response is only reused for the exact program, inputs and
+    limits that produced it. Callers only store runs of code the validator
+    marked deterministic. Entries are evicted least recently used first,
+    once either max_entries or max_bytes (measured on the serialized
+    response) is exceeded.
+
+    Args:
+        max_entries (int): Responses kept at most
+        max_bytes (int): Total serialized size of the kept responses
+    """
+
+    def __init__(self, max_entries=512, max_bytes=8 * 1024 * 1024):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(code, simulated_inputs, timeout):
+        """Build the cache key for a run"""
+        digest = hashlib.sha256(code.encode("utf-8", "surrogatepass"))
+        digest.update(json.dumps([list(simulated_inputs), timeout]).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Returns:
+            dict: A copy of the cached response, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, key, response):
+        """Store a response; one larger than max_bytes is not kept"""
+        size = len(json.dumps(response))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (dict(response), size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
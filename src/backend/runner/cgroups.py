@@ -0,0 +1,222 @@
+"""
+Cgroup v2 limits and accounting for sandbox processes
+
+Where the server is given a delegated cgroup v2 directory, every sandbox
+(a one-shot run, a forked run or a pooled worker) is placed in a child
+cgroup of it with memory.max, cpu.max and pids.max set. Unlike rlimits,
+these count resident memory rather than address space, cover every
+process the sandbox starts, and the limits written on the directory
+itself bound all sandboxes together. Peak memory and CPU time are read
+back from memory.peak and cpu.stat.
+
+The sandbox joins its cgroup itself, by writing its pid to the
+cgroup.procs file it is given, before it runs any student code.
+SandboxCgroups.open() returns None where no usable directory exists, and
+the runner keeps its rlimits instead.
+"""
+
+import itertools
+import logging
+import os
+import signal
+import time
+
+logger = logging.getLogger(__name__)
+
+# Controllers each sandbox cgroup is limited by
+REQUIRED_CONTROLLERS = ("cpu", "memory", "pids")
+
+# Period of cpu.max quotas, in microseconds
+CPU_PERIOD_USEC = 100000
+
+# Seconds remove() waits for a killed sandbox's processes to exit
+REMOVE_TIMEOUT = 1.0
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _write(path, value):
+    with open(path, "w") as f:
+        f.write(value)
+
+
+def _cpu_max(cpus):
+    """cpu.max value granting cpus CPUs' worth of time per period"""
+    return f"{max(1000, int(cpus * CPU_PERIOD_USEC))} {CPU_PERIOD_USEC}"
+
+
+class SandboxCgroup:
+    """
+    The cgroup of one sandbox
+
+    procs_path is the cgroup.procs file the sandbox writes its pid to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.procs_path = os.path.join(path, "cgroup.procs")
+
+    def usage(self):
+        """
+        CPU time and peak memory of everything that ran in the cgroup
+
+        Returns:
+            dict: cpu_user_seconds, cpu_system_seconds and peak_rss_bytes,
+                as in usage_from_rusage(), for those that could be read;
+                memory.peak needs Linux 5.19
+        """
+        usage = {}
+        try:
+            cpu_stat = _read(os.path.join(self.path, "cpu.stat"))
+            stat = dict(line.split() for line in cpu_stat.splitlines())
+            usage["cpu_user_seconds"] = int(stat["user_usec"]) / 1e6
+            usage["cpu_system_seconds"] = int(stat["system_usec"]) / 1e6
+        except (OSError, KeyError, ValueError):
+            pass
+        try:
+            usage["peak_rss_bytes"] = int(_read(os.path.join(self.path, "memory.peak")))
+        except (OSError, ValueError):
+            pass
+        return usage
+
+    def oom_killed(self):
+        """True if the kernel killed a process here for exceeding memory.max"""
+        try:
+            events = _read(os.path.join(self.path, "memory.events")).split()
+        except OSError:
+            return False
+        counts = dict(zip(events[::2], events[1::2]))
+        return counts.get("oom_kill", "0") != "0"
+
+    def kill(self):
+        """SIGKILL everything in the cgroup, even processes that left their group"""
+        try:
+            _write(os.path.join(self.path, "cgroup.kill"), "1")
+            return
+        except OSError:
+            pass  # cgroup.kill needs Linux 5.14
+        try:
+            pids = _read(self.procs_path).split()
+        except OSError:
+            return
+        for pid in pids:
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except (OSError, ValueError):
+                pass
+
+    def remove(self):
+        """Kill what is left in the cgroup and delete it"""
+        self.kill()
+        deadline = time.monotonic() + REMOVE_TIMEOUT
+        while True:
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError as e:
+                # Busy until the killed processes have been reaped
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Could not remove sandbox cgroup {self.path}: {e}")
+                    return
+            time.sleep(0.01)
+
+
+class SandboxCgroups:
+    """
+    Creates a cgroup per sandbox under a delegated cgroup v2 directory
+
+    The directory must be writable by the server and hold no processes
+    of its own; the cpu, memory and pids controllers are enabled for its
+    children if they are not already.
+
+    Args:
+        root (str): The delegated directory, e.g. /sys/fs/cgroup/bhodi
+        memory_limit_mb (int): memory.max of each sandbox; swap is off
+        cpu_limit (float): cpu.max of each sandbox, in CPUs
+        pids_limit (int): pids.max of each sandbox
+        total_memory_mb (int): memory.max of the directory, shared by all
+            sandboxes, or None to leave it as it is
+        total_cpu_limit (float): cpu.max of the directory, in CPUs, or
+            None to leave it as it is
+    """
+
+    def __init__(
+        self,
+        root,
+        memory_limit_mb=128,
+        cpu_limit=1.0,
+        pids_limit=10,
+        total_memory_mb=None,
+        total_cpu_limit=None,
+    ):
+        self.root = root
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit = cpu_limit
+        self.pids_limit = pids_limit
+        self.total_memory_mb = total_memory_mb
+        self.total_cpu_limit = total_cpu_limit
+        self._names = itertools.count()
+
+    @classmethod
+    def open(cls, root, **limits):
+        """
+        SandboxCgroups for root, or None if it cannot be used there
+
+        Sets up root (controllers and total limits) and logs why when it
+        cannot; limits are the constructor's keyword arguments.
+        """
+        try:
+            available = _read(os.path.join(root, "cgroup.controllers")).split()
+            missing = [name for name in REQUIRED_CONTROLLERS if name not in available]
+            if missing:
+                raise OSError(f"controllers not delegated: {', '.join(missing)}")
+            subtree_control = os.path.join(root, "cgroup.subtree_control")
+            enabled = _read(subtree_control).split()
+            if not all(name in enabled for name in REQUIRED_CONTROLLERS):
+                _write(
+                    subtree_control,
+                    " ".join(f"+{name}" for name in REQUIRED_CONTROLLERS),
+                )
+            cgroups = cls(root, **limits)
+            if cgroups.total_memory_mb is not None:
+                total_memory = cgroups.total_memory_mb * 1024 * 1024
+                _write(os.path.join(root, "memory.max"), str(total_memory))
+            if cgroups.total_cpu_limit is not None:
+                _write(os.path.join(root, "cpu.max"), _cpu_max(cgroups.total_cpu_limit))
+        except OSError as e:
+            logger.warning(
+                f"Cgroup v2 sandboxing unavailable at {root} ({e}); using rlimits"
+            )
+            return None
+        return cgroups
+
+    def create(self):
+        """
+        Create the cgroup for a new sandbox, its limits set
+
+        Returns:
+            SandboxCgroup: The new cgroup; remove() it once the sandbox is done
+
+        Raises:
+            OSError: If the cgroup could not be created or limited
+        """
+        path = os.path.join(self.root, f"sandbox-{os.getpid()}-{next(self._names)}")
+        os.mkdir(path)
+        try:
+            memory_max = self.memory_limit_mb * 1024 * 1024
+            _write(os.path.join(path, "memory.max"), str(memory_max))
+            _write(os.path.join(path, "cpu.max"), _cpu_max(self.cpu_limit))
+            _write(os.path.join(path, "pids.max"), str(self.pids_limit))
+            try:
+                _write(os.path.join(path, "memory.swap.max"), "0")
+            except OSError:
+                pass  # No swap accounting on this kernel
+        except OSError:
+            os.rmdir(path)
+            raise
+        return SandboxCgroup(path)
@@ -0,0 +1,1911 @@
+#!/usr/bin/env python3
+"""
+Sandboxed Python execution for the Bhodi Learning Platform
+Pool of pre-started, resource-limited interpreter workers
+
+The server keeps a small number of worker interpreters warm so that a run
+costs a pipe round-trip instead of a full CPython startup. Each worker
+receives code over a pipe, executes it in a fresh namespace with simulated
+stdin, and sends back its captured output, at most a fixed number of
+bytes per stream. Workers are recycled after a configurable number of
+runs, on any resource-limit breach, and whenever a run times out. They
+are also retired after any run that imports a module outside
+POOL_SAFE_MODULES or uses a name that leads to state the runs share (see
+SHARED_STATE_NAMES). After every other run, whatever it changed in the
+modules loaded at startup, and the signal handlers, timers, umask,
+environment, random seed and decimal context, are put back before it
+answers, and a run that had changed any of them retires its worker too.
+
+Instead of the pool, a ForkServer can keep one template interpreter with
+commonly used modules imported and fork a fresh sandbox from it per run.
+
+Runs whose output should reach the browser while they execute use a
+StreamingRun instead: a one-shot interpreter whose pipes are read as the
+program prints. One-shot interpreters get their code over a pipe of its
+own, next to stdin, so no run writes a file.
+
+Sandboxes run under rlimits, or, given a SandboxCgroups (see cgroups.py),
+each in a cgroup v2 of its own, which replaces the address space and
+process count rlimits and supplies CPU time and peak memory.
+
+This file is also the worker entry point: the pool launches it as a script.
+"""
+import atexit
+import base64
+import codecs
+import dis
+import io
+import itertools
+import json
+import logging
+import marshal
+import operator
+import os
+import queue
+import select
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Frames on the worker pipes are a 4-byte big-endian length followed by JSON
+_FRAME_HEADER = struct.Struct(">I")
+
+# Filename shown in student tracebacks
+STUDENT_FILENAME = "main.py"
+
+# Seconds a new worker has to report ready before it is considered broken
+WORKER_STARTUP_TIMEOUT = 10
+
+# Bytes read from a streaming run's pipes at a time
+STREAM_READ_SIZE = 4096
+
+# Seconds a streaming read waits for more output before sending a chunk;
+# "-u" turns every print() into several writes, this joins them up again
+STREAM_COALESCE_SECONDS = 0.005
+
+# Bytes of stdout and of stderr kept per run unless a limit is given
+DEFAULT_MAX_OUTPUT = 50000
+
+# Names that, used anywhere in a submission (as a variable, an import or
+# an attribute), retire the pool worker after the run: they reach state
+# the next run on the worker would share (the builtins, the module table,
+# the worker's own __main__, the garbage collector) or the worker's
+# frames, and through them the snapshot the run is checked against
+SHARED_STATE_NAMES = frozenset({
+    "__builtins__", "__main__", "builtins", "gc", "importlib", "inspect", "sys",
+    "import_module", "__import__", "globals", "locals", "vars", "__dict__",
+    "getattr", "setattr", "delattr", "__getattribute__", "attrgetter",
+    "f_back", "f_builtins", "f_globals", "f_locals", "tb_frame",
+    "gi_frame", "cr_frame", "ag_frame", "__globals__", "__self__",
+    "__subclasses__", "__closure__", "__code__",
+})
+
+# Modules a pooled run may import and keep its worker: they hold no state
+# of their own, or only state the worker resets after each run. Importing
+# any other module retires the worker after the run.
+POOL_SAFE_MODULES = frozenset({
+    "abc", "array", "bisect", "cmath", "collections", "copy", "dataclasses",
+    "datetime", "enum", "fractions", "functools", "heapq", "itertools", "json",
+    "keyword", "math", "numbers", "operator", "random", "re", "statistics",
+    "string", "textwrap", "time", "typing", "unicodedata",
+})
+
+# Modules the worker itself imports while running a request, loaded before
+# its snapshot so they are not dropped and imported again after every run;
+# random and decimal have state that is reset after each run
+_WORKER_MODULES = (
+    "builtins", "decimal", "linecache", "random", "resource", "traceback"
+)
+
+# Largest request the fork server accepts, in bytes of JSON
+FORKSERVER_MAX_REQUEST = 1024 * 1024
+
+# Added to the stderr of a run the kernel killed for exceeding its
+# cgroup's memory.max, which unlike RLIMIT_AS raises no MemoryError
+OOM_KILLED_MESSAGE = "MemoryError: the program used more memory than it is allowed\n"
+
+# Run by one-shot interpreters with "-c": joins the cgroup whose
+# cgroup.procs file is named in argv, applies the "NAME=value,..." rlimits
+# from argv, reads the student's code from the descriptor named in argv,
+# runs it as STUDENT_FILENAME in a fresh __main__ namespace and prints
+# tracebacks without this loader's own frame. Applying the limits here
+# rather than in a preexec_fn lets subprocess start the child with vfork
+# instead of fork.
+_ONE_SHOT_LOADER = """\
+import os, sys
+if sys.argv[3]:
+    with open(sys.argv[3], "w") as f:
+        f.write(str(os.getpid()))
+    del f
+if sys.argv[2]:
+    import resource
+    for item in sys.argv[2].split(","):
+        name, value = item.split("=")
+        resource.setrlimit(getattr(resource, name), (int(value), int(value)))
+    del item, name, value
+fd = int(sys.argv[1])
+chunks = []
+while True:
+    chunk = os.read(fd, 65536)
+    if not chunk:
+        break
+    chunks.append(chunk)
+os.close(fd)
+source = b"".join(chunks).decode("utf-8")
+del chunks, chunk, fd
+sys.argv[:] = [{filename!r}]
+try:
+    exec(compile(source, {filename!r}, "exec"), {{"__name__": "__main__", "__builtins__": __builtins__}})
+except SystemExit:
+    raise
+except BaseException as e:
+    import linecache, traceback
+    linecache.cache[{filename!r}] = (len(source), None, source.splitlines(True), {filename!r})
+    tb = e.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != {filename!r}:
+        tb = tb.tb_next
+    traceback.print_exception(type(e), e, tb)
+    sys.exit(1)
+""".format(filename=STUDENT_FILENAME)
+
+
+class SandboxError(Exception):
+    """Raised when the pool cannot provide a working sandbox"""
+
+
+def _write_frame(fd, payload):
+    """Write one length-prefixed JSON frame to a file descriptor"""
+    body = json.dumps(payload).encode("utf-8")
+    data = _FRAME_HEADER.pack(len(body)) + body
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _read_exact(fd, size, deadline=None):
+    """
+    Read exactly size bytes from fd
+
+    Returns:
+        bytes: The data, or None on EOF or when the deadline passes
+    """
+    chunks = []
+    remaining = size
+    while remaining:
+        if deadline is not None:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], wait)
+            if not ready:
+                return None
+        chunk = os.read(fd, remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_frame(fd, deadline=None):
+    """Read one length-prefixed JSON frame, or None on EOF/deadline"""
+    header = _read_exact(fd, _FRAME_HEADER.size, deadline)
+    if header is None:
+        return None
+    (length,) = _FRAME_HEADER.unpack(header)
+    body = _read_exact(fd, length, deadline)
+    if body is None:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
+def sandbox_env():
+    """Minimal environment variables for sandboxed interpreters"""
+    return {
+        "PYTHONPATH": "",
+        "PATH": "/usr/bin:/bin",  # Minimal PATH
+        "HOME": tempfile.gettempdir(),
+        "TMPDIR": tempfile.gettempdir(),
+        "PYTHONDONTWRITEBYTECODE": "1",  # Don't create .pyc files
+        "PYTHONIOENCODING": "utf-8",
+    }
+
+
+def usage_from_rusage(rusage):
+    """CPU time and peak RSS of a finished process, as reported by wait4()"""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "cpu_user_seconds": rusage.ru_utime,
+        "cpu_system_seconds": rusage.ru_stime,
+        "peak_rss_bytes": rusage.ru_maxrss * scale,
+    }
+
+
+class OutputBuffer:
+    """
+    Fixed-size buffer for one output stream of a run
+
+    At most limit bytes are kept; whatever comes after them is dropped and
+    sets truncated. Pipes are read straight into the buffer, and the kept
+    bytes are decoded once, by text(). written counts every byte offered to
+    the buffer, dropped ones included.
+
+    Args:
+        limit (int): Bytes kept
+    """
+
+    def __init__(self, limit):
+        self.limit = max(0, limit)
+        # One spare byte tells a buffer that is exactly full from one that
+        # overflowed
+        self._data = bytearray(self.limit + 1)
+        self._view = memoryview(self._data)
+        self.size = 0
+        self.written = 0
+        self.truncated = False
+
+    def read_from(self, fd):
+        """
+        Read what fd has into the free part of the buffer
+
+        Returns:
+            bool: False once fd reached end of file or the buffer overflowed
+        """
+        count = os.readv(fd, [self._view[self.size :]])
+        self.size += count
+        self.written += count
+        if self.size > self.limit:
+            self.size = self.limit
+            self.truncated = True
+        return count > 0 and not self.truncated
+
+    def write(self, data):
+        """
+        Append bytes, as far as they fit
+
+        Returns:
+            bool: False if the buffer overflowed
+        """
+        self.written += len(data)
+        room = self.limit - self.size
+        if len(data) > room:
+            data = memoryview(data)[:room]
+            self.truncated = True
+        self._view[self.size : self.size + len(data)] = data
+        self.size += len(data)
+        return not self.truncated
+
+    def text(self, errors="replace"):
+        """The kept bytes decoded as UTF-8"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors)
+        # A character cut in two by the limit is left out
+        return decoder.decode(self._view[: self.size], final=not self.truncated)
+
+
+class AccountedPopen(subprocess.Popen):
+    """
+    Popen that reaps its process with wait4(), keeping the child's rusage
+
+    After wait() (or communicate()) returns, usage holds the child's CPU
+    time and peak RSS, measured by the kernel for that child alone. It stays
+    None if the process was reaped by poll() or killed and abandoned.
+    """
+
+    usage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, status, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Already reaped; the base class reports it the same way
+            return self.pid, 0
+        if pid == self.pid:
+            self.usage = usage_from_rusage(rusage)
+        return pid, status
+
+
+def _rlimits(limits):
+    """
+    (resource module name, value) pairs a sandbox with limits runs under
+
+    A sandbox in a cgroup (limits["cgroup"] set) is held to memory.max and
+    pids.max instead of the address space and process count rlimits.
+    """
+    rlimits = [
+        ("RLIMIT_CPU", limits["cpu_hard_limit"]),
+        # Limit file size to 1MB
+        ("RLIMIT_FSIZE", 1024 * 1024),
+    ]
+    if not limits.get("cgroup"):
+        rlimits += [
+            ("RLIMIT_AS", limits["memory_limit_mb"] * 1024 * 1024),
+            # Limit number of processes
+            ("RLIMIT_NPROC", 10),
+        ]
+    return rlimits
+
+
+def _join_cgroup(procs_path):
+    """Move this process into the cgroup whose cgroup.procs file is given"""
+    with open(procs_path, "w") as f:
+        f.write(str(os.getpid()))
+
+
+def _create_cgroup(cgroups):
+    """A new SandboxCgroup from cgroups, or None to fall back to rlimits"""
+    if cgroups is None:
+        return None
+    try:
+        return cgroups.create()
+    except OSError as e:
+        logger.warning(f"Could not create sandbox cgroup, using rlimits: {e}")
+        return None
+
+
+def apply_cgroup_accounting(result, cgroup):
+    """
+    Fold a finished run's cgroup statistics into its result, then remove it
+
+    The cgroup's CPU time and peak memory replace the rusage figures in
+    result["usage"] (left None for runs that failed), and a run the
+    kernel killed for exceeding memory.max gets OOM_KILLED_MESSAGE on its
+    stderr.
+    """
+    try:
+        if result["usage"] is not None:
+            result["usage"].update(cgroup.usage())
+        if (
+            not result["timed_out"]
+            and result["returncode"] == -signal.SIGKILL
+            and cgroup.oom_killed()
+        ):
+            result["stderr"] += OOM_KILLED_MESSAGE
+    finally:
+        cgroup.remove()
+
+
+def start_one_shot(code, limits=None, cgroup=None, **popen_args):
+    """
+    Start a one-shot interpreter that runs code
+
+    The code goes to the child over a pipe of its own, so stdin is left
+    for simulated input and nothing is written to disk; tracebacks name
+    the code STUDENT_FILENAME, as in pooled workers. On POSIX the child
+    gets its own process group, and joins cgroup and applies limits itself
+    before it reads any code, so no preexec_fn is needed and subprocess
+    can use vfork.
+
+    Args:
+        code (str): Python source to execute
+        limits (dict): "memory_limit_mb" and "cpu_hard_limit" to apply
+        cgroup (SandboxCgroup): Cgroup to run in, replacing the memory
+            and process count rlimits
+        **popen_args: Passed on to AccountedPopen
+
+    Returns:
+        AccountedPopen: The started process
+    """
+    procs_path = cgroup.procs_path if cgroup is not None else ""
+    rlimits = ""
+    if limits is not None:
+        limits = dict(limits, cgroup=procs_path)
+        rlimits = ",".join(f"{name}={value}" for name, value in _rlimits(limits))
+    if os.name == "posix":
+        popen_args.setdefault("process_group", 0)
+
+    read_fd, write_fd = os.pipe()
+    try:
+        process = AccountedPopen(
+            [
+                sys.executable,
+                "-W",
+                "ignore",
+                "-u",
+                "-c",
+                _ONE_SHOT_LOADER,
+                str(read_fd),
+                rlimits,
+                procs_path,
+            ],
+            pass_fds=(read_fd,),
+            **popen_args,
+        )
+    except BaseException:
+        os.close(write_fd)
+        raise
+    finally:
+        os.close(read_fd)
+
+    # The loader reads everything before running any of it, so this cannot
+    # block on a pipe the child is not draining
+    try:
+        view = memoryview(code.encode("utf-8", "surrogatepass"))
+        while view:
+            view = view[os.write(write_fd, view) :]
+    except OSError:
+        pass  # Died before reading its code; its exit status tells why
+    finally:
+        os.close(write_fd)
+    return process
+
+
+def _run_request(code, stdin_text, timeout, bytecode=None, cases=None):
+    """The request a worker or forked sandbox is sent for one run"""
+    request = {"code": code, "stdin": stdin_text, "timeout": timeout}
+    if bytecode is not None:
+        request["bytecode"] = base64.b64encode(bytecode).decode("ascii")
+    if cases is not None:
+        request["cases"] = list(cases)
+    return request
+
+
+def _run_result(response):
+    """The result of a run from the response _execute_request() sent"""
+    result = {
+        "returncode": response["returncode"],
+        "stdout": response["stdout"],
+        "stderr": response["stderr"],
+        "truncated": response.get("truncated", False),
+        "timed_out": False,
+        "recycle": response.get("recycle", False),
+        "usage": response.get("usage"),
+    }
+    if "cases" in response:
+        result["cases"] = response["cases"]
+    return result
+
+
+def _failed_run(returncode, timed_out=False):
+    """The result of a run that timed out or died without a response"""
+    return {
+        "returncode": returncode,
+        "stdout": "",
+        "stderr": "",
+        "truncated": False,
+        "timed_out": timed_out,
+        "recycle": True,
+        "usage": None,
+    }
+
+
+class SandboxWorker:
+    """
+    A single pre-started interpreter that executes code on request
+
+    Given a cgroup, the worker joins it at startup and it is removed when
+    the worker is killed.
+    """
+
+    def __init__(self, limits, cgroup=None):
+        self.runs = 0
+        self.cgroup = cgroup
+        if cgroup is not None:
+            limits = dict(limits, cgroup=cgroup.procs_path)
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-W",
+                "ignore",
+                "-u",
+                os.path.abspath(__file__),
+                json.dumps(limits),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=tempfile.gettempdir(),
+            env=sandbox_env(),
+        )
+        self._request_fd = self.process.stdin.fileno()
+        self._response_fd = self.process.stdout.fileno()
+
+        ready = _read_frame(
+            self._response_fd, time.monotonic() + WORKER_STARTUP_TIMEOUT
+        )
+        if not ready or not ready.get("ready"):
+            self.kill()
+            raise SandboxError("Sandbox worker failed to start")
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, code, stdin_text, timeout, bytecode=None, cases=None):
+        """
+        Execute code in this worker
+
+        Args:
+            code (str): Python source to execute
+            stdin_text (str): Text served to input() calls
+            timeout (int): Wall-clock limit in seconds
+            bytecode (bytes): The code already compiled and marshalled
+                under STUDENT_FILENAME, so the worker need not compile it
+            cases (list): stdin texts to run the code with one after
+                another, each in a fresh namespace, instead of stdin_text;
+                timeout covers all of them
+
+        Returns:
+            dict: returncode, stdout, stderr, and the truncated, timed_out
+                and recycle flags, and usage (see _execute_request; None
+                if the worker timed out or died); with cases, "cases"
+                holds returncode, stdout, stderr and truncated per case
+                run (empty if the worker timed out or died)
+        """
+        self.runs += 1
+        request = _run_request(code, stdin_text, timeout, bytecode, cases)
+        result = self._call(request, timeout)
+        if cases is not None:
+            result.setdefault("cases", [])
+        return result
+
+    def _call(self, request, timeout):
+        try:
+            _write_frame(self._request_fd, request)
+        except OSError as e:
+            raise SandboxError(f"Sandbox worker is not accepting work: {e}")
+
+        deadline = time.monotonic() + timeout
+        response = _read_frame(self._response_fd, deadline)
+        if response is not None:
+            return _run_result(response)
+
+        if time.monotonic() >= deadline:
+            # Still running after the deadline: a timeout
+            self.kill()
+            return _failed_run(None, timed_out=True)
+
+        # The worker died mid-run, almost always from an rlimit signal
+        self.kill()
+        returncode = self.process.returncode
+        logger.warning(f"Sandbox worker exited during run (code {returncode})")
+        return _failed_run(returncode)
+
+    def kill(self):
+        """Terminate the worker and anything it started"""
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, 9)
+            except OSError:
+                self.process.kill()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        if self.cgroup is not None:
+            self.cgroup.remove()
+            self.cgroup = None
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of warm sandbox workers
+
+    Args:
+        size (int): Number of workers kept alive
+        max_runs_per_worker (int): Runs before a worker is replaced
+        memory_limit_mb (int): RLIMIT_AS applied to each worker
+        max_timeout (int): Longest per-run timeout the pool will be asked for
+        max_output (int): Bytes of stdout and of stderr kept per run; a
+            run printing more is stopped and reported as truncated
+        cgroups (SandboxCgroups): Gives each worker a cgroup of its own
+            in place of the memory and process count rlimits; run usage
+            still comes from the worker's rusage, as memory.peak would
+            cover the worker's whole lifetime
+    """
+
+    def __init__(
+        self,
+        size=2,
+        max_runs_per_worker=25,
+        memory_limit_mb=128,
+        max_timeout=10,
+        max_output=DEFAULT_MAX_OUTPUT,
+        cgroups=None,
+    ):
+        self.size = max(1, size)
+        self.max_runs_per_worker = max(1, max_runs_per_worker)
+        self.pid = os.getpid()
+        self.limits = {
+            "memory_limit_mb": memory_limit_mb,
+            # CPU time accumulates over a worker's lifetime; the worker lowers
+            # the soft limit per run, the hard limit caps its whole lifetime
+            "cpu_hard_limit": (max_timeout + 2) * self.max_runs_per_worker + 5,
+            "max_output": max_output,
+        }
+        self.cgroups = cgroups
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+        # Requests currently blocked waiting for a free worker
+        self.waiting = 0
+        # Optional callable receiving each worker's startup time in seconds
+        self.spawn_observer = None
+        atexit.register(self.close)
+
+    @property
+    def idle_workers(self):
+        return self._idle.qsize()
+
+    @property
+    def live_workers(self):
+        return self._live
+
+    def prestart(self):
+        """Start workers in the background until the pool is full"""
+        threading.Thread(
+            target=self._replenish, name="sandbox-prestart", daemon=True
+        ).start()
+
+    def run(self, code, stdin_text="", timeout=10, bytecode=None, cases=None):
+        """
+        Execute code on a pooled worker (see SandboxWorker.run)
+
+        Returns:
+            dict: returncode, stdout, stderr, truncated, timed_out, usage
+                and execution_time
+
+        Raises:
+            SandboxError: If no worker could be started
+        """
+        worker = self._acquire(timeout)
+        start_time = time.time()
+        try:
+            result = worker.run(code, stdin_text, timeout, bytecode, cases)
+        except Exception:
+            self._retire(worker)
+            raise
+        result["execution_time"] = time.time() - start_time
+
+        if result.pop("recycle") or worker.runs >= self.max_runs_per_worker:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    def close(self):
+        """Stop all idle workers; busy workers are retired when released"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.kill()
+
+    def _spawn(self):
+        start_time = time.perf_counter()
+        cgroup = _create_cgroup(self.cgroups)
+        try:
+            worker = SandboxWorker(self.limits, cgroup)
+        except BaseException:
+            if cgroup is not None:
+                cgroup.remove()
+            raise
+        if self.spawn_observer is not None:
+            self.spawn_observer(time.perf_counter() - start_time)
+        return worker
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            worker = self._next_worker(deadline)
+            if worker.alive:
+                return worker
+            self._retire(worker, replace=False)
+
+    def _next_worker(self, deadline):
+        """An idle worker, a new one while the pool has room, or the next freed"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_spawn = self._live < self.size
+            if can_spawn:
+                self._live += 1
+        if can_spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._live -= 1
+                raise
+
+        remaining = deadline - time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            return self._idle.get(timeout=max(remaining, 0))
+        except queue.Empty:
+            raise SandboxError("No sandbox worker became available")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def _retire(self, worker, replace=True):
+        worker.kill()
+        with self._lock:
+            self._live -= 1
+        if replace and not self._closed:
+            threading.Thread(
+                target=self._replenish, name="sandbox-respawn", daemon=True
+            ).start()
+
+    def _replenish(self):
+        while not self._closed:
+            with self._lock:
+                if self._live >= self.size:
+                    return
+                self._live += 1
+            try:
+                worker = self._spawn()
+            except Exception as e:
+                with self._lock:
+                    self._live -= 1
+                logger.warning(f"Could not start sandbox worker: {e}")
+                return
+            self._idle.put(worker)
+
+
+class ForkServer:
+    """
+    Template interpreter that forks a fresh sandbox for every run
+
+    The template imports the preload modules once at startup. Each run is
+    a fork of it, so student code starts from an already initialised
+    copy-on-write image, modules included, and never sees what an earlier
+    run left behind. The child puts itself in its own process group,
+    applies the rlimits and switches to uid/gid (when given) before it
+    touches the student's code; it answers over a pipe the server sends
+    along with the request, so runs proceed concurrently. Same interface
+    as SandboxPool.
+
+    Args:
+        preload (list): Module names imported by the template
+        memory_limit_mb (int): RLIMIT_AS applied to each run
+        max_timeout (int): Longest per-run timeout the server will ask for
+        max_output (int): Bytes of stdout and of stderr kept per run
+        uid (int): User the runs switch to, or None to stay as the server
+        gid (int): Group the runs switch to, or None
+        cgroups (SandboxCgroups): Gives each run a cgroup of its own in
+            place of the memory and process count rlimits, and its CPU
+            time and peak memory
+    """
+
+    def __init__(
+        self,
+        preload=(),
+        memory_limit_mb=128,
+        max_timeout=10,
+        max_output=DEFAULT_MAX_OUTPUT,
+        uid=None,
+        gid=None,
+        cgroups=None,
+    ):
+        self.pid = os.getpid()
+        self.config = {
+            "limits": {
+                "memory_limit_mb": memory_limit_mb,
+                "cpu_hard_limit": max_timeout + 2,
+            },
+            "preload": list(preload),
+            "max_output": max_output,
+            "uid": uid,
+            "gid": gid,
+        }
+        self.cgroups = cgroups
+        self.process = None
+        self._control = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._closed = False
+        # Runs never wait for a worker; kept for SandboxPool's gauges
+        self.waiting = 0
+        # Optional callable receiving the template's startup time in seconds
+        self.spawn_observer = None
+        atexit.register(self.close)
+
+    @property
+    def idle_workers(self):
+        return 0
+
+    @property
+    def live_workers(self):
+        return self._running
+
+    def prestart(self):
+        """Start the template in the background"""
+        threading.Thread(
+            target=self._start_quietly, name="forkserver-prestart", daemon=True
+        ).start()
+
+    def run(self, code, stdin_text="", timeout=10, bytecode=None, cases=None):
+        """
+        Execute code in a fork of the template (see SandboxWorker.run)
+
+        Returns:
+            dict: returncode, stdout, stderr, truncated, timed_out, usage
+                and execution_time
+
+        Raises:
+            SandboxError: If the template could not be started or reached
+        """
+        request = _run_request(code, stdin_text, timeout, bytecode, cases)
+        cgroup = _create_cgroup(self.cgroups)
+        if cgroup is not None:
+            request["cgroup"] = cgroup.procs_path
+        try:
+            result = self._dispatch(request, timeout)
+        except BaseException:
+            if cgroup is not None:
+                cgroup.remove()
+            raise
+
+        result.pop("recycle")
+        if cases is not None:
+            result.setdefault("cases", [])
+        if cgroup is not None:
+            apply_cgroup_accounting(result, cgroup)
+        return result
+
+    def close(self):
+        """Stop the template; runs already forked finish on their own"""
+        self._closed = True
+        with self._lock:
+            self._stop()
+
+    def _dispatch(self, request, timeout):
+        """Send a request to the template with its result pipe, and wait"""
+        body = json.dumps(request).encode("utf-8")
+        read_fd, write_fd = os.pipe()
+        try:
+            try:
+                with self._lock:
+                    control = self._start()
+                    socket.send_fds(control, [body], [write_fd])
+                    self._running += 1
+            except OSError as e:
+                raise SandboxError(f"Fork server is not accepting work: {e}")
+            finally:
+                os.close(write_fd)
+            start_time = time.time()
+            try:
+                result = self._collect(read_fd, timeout)
+            finally:
+                with self._lock:
+                    self._running -= 1
+        finally:
+            os.close(read_fd)
+        result["execution_time"] = time.time() - start_time
+        return result
+
+    def _collect(self, read_fd, timeout):
+        # The child announces its pid, then sends its response; if it dies
+        # first, the template sends {"exited": returncode} instead
+        deadline = time.monotonic() + timeout
+        started = _read_frame(read_fd, deadline)
+        pid = started.get("pid") if started else None
+        response = _read_frame(read_fd, deadline) if pid is not None else started
+
+        if response is not None and "exited" not in response:
+            return _run_result(response)
+        if time.monotonic() >= deadline:
+            if pid is not None:
+                try:
+                    os.killpg(pid, 9)
+                except OSError:
+                    pass  # Exited in the meantime
+            return _failed_run(None, timed_out=True)
+
+        returncode = response["exited"] if response is not None else None
+        logger.warning(f"Forked sandbox exited during run (code {returncode})")
+        return _failed_run(returncode)
+
+    def _start(self):
+        """The template's control socket, starting the template if needed"""
+        if self._closed:
+            raise SandboxError("Fork server is closed")
+        if self.process is not None and self.process.poll() is None:
+            return self._control
+        self._stop()
+
+        start_time = time.perf_counter()
+        control, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        control.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FORKSERVER_MAX_REQUEST)
+        try:
+            self.process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-W",
+                    "ignore",
+                    "-u",
+                    os.path.abspath(__file__),
+                    "--forkserver",
+                    json.dumps(self.config),
+                    str(child_end.fileno()),
+                ],
+                pass_fds=(child_end.fileno(),),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=tempfile.gettempdir(),
+                env=sandbox_env(),
+            )
+        finally:
+            child_end.close()
+        self._control = control
+
+        control.settimeout(WORKER_STARTUP_TIMEOUT)
+        try:
+            ready = control.recv(16)
+        except OSError:
+            ready = b""
+        control.settimeout(None)
+        if ready != b"ready":
+            self._stop()
+            raise SandboxError("Fork server failed to start")
+        if self.spawn_observer is not None:
+            self.spawn_observer(time.perf_counter() - start_time)
+        return control
+
+    def _start_quietly(self):
+        try:
+            with self._lock:
+                self._start()
+        except SandboxError as e:
+            logger.warning(f"Could not start fork server: {e}")
+
+    def _stop(self):
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+class StreamingRun:
+    """
+    One-shot sandboxed interpreter whose output is read while it runs
+
+    Iterating yields ("stdout" or "stderr", text) chunks as the program
+    prints them. Output is counted as it arrives and the process is killed
+    as soon as it exceeds max_output characters, so a runaway print loop
+    never gets buffered. Once iteration ends, returncode, timed_out,
+    truncated, time_to_first_byte, execution_time and usage describe the
+    run.
+
+    Args:
+        code (str): Python source to execute
+        stdin_text (str): Text served to input() calls
+        timeout (int): Wall-clock limit in seconds
+        max_output (int): Characters of stdout and stderr allowed in total
+        memory_limit_mb (int): RLIMIT_AS applied to the interpreter
+        cgroups (SandboxCgroups): Runs the interpreter in a cgroup of its
+            own in place of the memory and process count rlimits
+    """
+
+    def __init__(
+        self,
+        code,
+        stdin_text="",
+        timeout=10,
+        max_output=50000,
+        memory_limit_mb=128,
+        cgroups=None,
+    ):
+        self.code = code
+        self.stdin_text = stdin_text
+        self.timeout = timeout
+        self.max_output = max_output
+        self.limits = {
+            "memory_limit_mb": memory_limit_mb,
+            "cpu_hard_limit": timeout + 2,
+        }
+        self.cgroups = cgroups
+        self.returncode = None
+        self.timed_out = False
+        self.truncated = False
+        # Seconds from process start to its first output, None if silent
+        self.time_to_first_byte = None
+        self.execution_time = None
+        # CPU time, peak RSS and output bytes, once the process was reaped
+        self.usage = None
+        self._output_bytes = {"stdout": 0, "stderr": 0}
+        self._output_left = max_output
+
+    def __iter__(self):
+        start_time = time.monotonic()
+        cgroup = _create_cgroup(self.cgroups)
+        try:
+            process = start_one_shot(
+                self.code,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=tempfile.gettempdir(),
+                env=sandbox_env(),
+                limits=self.limits,
+                cgroup=cgroup,
+            )
+            feed = _InputFeed(process, self.stdin_text)
+            try:
+                yield from self._read_output(process, feed, start_time)
+                if (
+                    cgroup is not None
+                    and not self.timed_out
+                    and not self.truncated
+                    and process.returncode == -signal.SIGKILL
+                    and cgroup.oom_killed()
+                ):
+                    yield "stderr", OOM_KILLED_MESSAGE
+            finally:
+                feed.close()
+                _kill_process_group(process)
+                if not self.timed_out:
+                    self.returncode = process.returncode
+                if process.usage is not None:
+                    self.usage = dict(
+                        process.usage,
+                        stdout_bytes=self._output_bytes["stdout"],
+                        stderr_bytes=self._output_bytes["stderr"],
+                    )
+                    if cgroup is not None:
+                        self.usage.update(cgroup.usage())
+        finally:
+            if cgroup is not None:
+                cgroup.remove()
+            self.execution_time = time.monotonic() - start_time
+
+    def _read_output(self, process, feed, start_time):
+        streams = {
+            process.stdout.fileno(): "stdout",
+            process.stderr.fileno(): "stderr",
+        }
+        decoders = {
+            fd: codecs.getincrementaldecoder("utf-8")("replace") for fd in streams
+        }
+        deadline = start_time + self.timeout
+
+        while streams:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                self.timed_out = True
+                return
+            ready, writable, _ = select.select(list(streams), feed.fds, [], wait)
+            if writable:
+                feed.write()
+            for fd in ready:
+                data = _read_available(fd)
+                text = decoders[fd].decode(data, final=not data)
+                name = streams[fd] if data else streams.pop(fd)
+                self._output_bytes[name] += len(data)
+                text = self._clip(text, start_time) if text else ""
+                if text:
+                    yield name, text
+                if self.truncated:
+                    return
+
+        # Both pipes are closed; the process is exiting
+        try:
+            process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            self.timed_out = True
+
+    def _clip(self, text, start_time):
+        """Note the first output and cut text to what max_output has left"""
+        if self.time_to_first_byte is None:
+            self.time_to_first_byte = time.monotonic() - start_time
+        if len(text) > self._output_left:
+            text = text[: self._output_left]
+            self.truncated = True
+        self._output_left -= len(text)
+        return text
+
+
+def capture_output(process, stdin_text, timeout, max_output=DEFAULT_MAX_OUTPUT):
+    """
+    Feed a one-shot sandbox its input and collect its output
+
+    Each stream is read into an OutputBuffer of max_output bytes, and the
+    process group is killed as soon as either one overflows, so a runaway
+    print loop costs max_output bytes per stream rather than everything it
+    prints before the timeout. The process has been reaped on return.
+
+    Args:
+        process (subprocess.Popen): Started in its own process group with
+            binary stdin, stdout and stderr pipes
+        stdin_text (str): Text served to input() calls
+        timeout (float): Wall-clock limit in seconds
+        max_output (int): Bytes kept per stream
+
+    Returns:
+        dict: stdout, stderr, stdout_bytes and stderr_bytes (bytes read
+            from each pipe, past the limit too), truncated and timed_out
+    """
+    deadline = time.monotonic() + timeout
+    buffers = {
+        process.stdout.fileno(): OutputBuffer(max_output),
+        process.stderr.fileno(): OutputBuffer(max_output),
+    }
+    open_fds = list(buffers)
+    timed_out = False
+    feed = _InputFeed(process, stdin_text)
+    try:
+        while open_fds:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                timed_out = True
+                break
+            ready, writable, _ = select.select(open_fds, feed.fds, [], wait)
+            if writable:
+                feed.write()
+            for fd in ready:
+                if not buffers[fd].read_from(fd):
+                    open_fds.remove(fd)
+            if any(buffer.truncated for buffer in buffers.values()):
+                break
+        else:
+            # Both pipes are closed; the process is exiting
+            try:
+                process.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+    finally:
+        feed.close()
+        _kill_process_group(process)
+
+    stdout, stderr = buffers.values()
+    return {
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "stdout_bytes": stdout.written,
+        "stderr_bytes": stderr.written,
+        "truncated": stdout.truncated or stderr.truncated,
+        "timed_out": timed_out,
+    }
+
+
+class _InputFeed:
+    """
+    A one-shot sandbox's stdin, written as fast as the pipe takes it
+
+    write() is called from the select() loop that reads the output, so a
+    program that prints without reading its input cannot block the
+    server, and the run's deadline still applies. The pipe is closed once
+    everything is written, or when the program stops reading.
+    """
+
+    def __init__(self, process, stdin_text):
+        self.pipe = process.stdin
+        self.pending = memoryview(stdin_text.encode("utf-8"))
+        if self.pending:
+            os.set_blocking(self.pipe.fileno(), False)
+        else:
+            self.close()
+
+    @property
+    def fds(self):
+        """select() write list: the stdin pipe while input is left to write"""
+        return [] if self.pipe.closed else [self.pipe.fileno()]
+
+    def write(self):
+        try:
+            written = os.write(self.pipe.fileno(), self.pending)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close()  # Exited without reading its input
+            return
+        self.pending = self.pending[written:]
+        if not self.pending:
+            self.close()
+
+    def close(self):
+        try:
+            self.pipe.close()
+        except OSError:
+            pass
+
+
+def _read_available(fd):
+    """Read what fd has, plus whatever follows within the coalesce window"""
+    data = os.read(fd, STREAM_READ_SIZE)
+    while data and len(data) < STREAM_READ_SIZE:
+        ready, _, _ = select.select([fd], [], [], STREAM_COALESCE_SECONDS)
+        if not ready:
+            break
+        more = os.read(fd, STREAM_READ_SIZE - len(data))
+        if not more:
+            break  # EOF is picked up by the next read
+        data += more
+    return data
+
+
+def _kill_process_group(process):
+    """Kill a one-shot sandbox and anything it started, then reap it"""
+    # Not poll(): reaping happens in wait() below, which keeps the rusage
+    if process.returncode is None:
+        try:
+            os.killpg(process.pid, 9)
+        except OSError:
+            process.kill()
+    for stream in (process.stdin, process.stdout, process.stderr):
+        try:
+            stream.close()
+        except OSError:
+            pass
+    process.wait()
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+def _apply_worker_limits(limits):
+    """Apply process group, cgroup and resource limits to the worker itself"""
+    os.setpgrp()  # Own process group so the pool can kill everything we start
+    if limits.get("cgroup"):
+        _join_cgroup(limits["cgroup"])
+    try:
+        import resource
+    except ImportError:
+        return
+    for name, value in _rlimits(limits):
+        resource.setrlimit(getattr(resource, name), (value, value))
+
+
+def _set_run_cpu_limit(timeout):
+    """Lower the soft CPU limit so this run gets timeout + 2 more seconds"""
+    try:
+        import resource
+    except ImportError:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + timeout + 2
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _reset_peak_rss():
+    """
+    Reset this process's peak RSS so the next reading covers one run only
+
+    Returns:
+        bool: False where /proc/self/clear_refs is unavailable, in which
+            case the peak covers the worker's whole lifetime
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rusage_self():
+    """getrusage(RUSAGE_SELF), or None where the resource module is missing"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF)
+
+
+def _usage_since(before, stdout_bytes, stderr_bytes):
+    """The worker's CPU time since before and its peak RSS, per usage_from_rusage"""
+    now = _rusage_self()
+    if now is None:
+        return None
+    usage = usage_from_rusage(now)
+    if before is not None:
+        usage["cpu_user_seconds"] -= before.ru_utime
+        usage["cpu_system_seconds"] -= before.ru_stime
+    usage["stdout_bytes"] = stdout_bytes
+    usage["stderr_bytes"] = stderr_bytes
+    return usage
+
+
+def _print_student_traceback(stderr):
+    """Print the current exception without the worker's own frames"""
+    import traceback
+
+    etype, value, tb = sys.exc_info()
+    while tb is not None and tb.tb_frame.f_code.co_filename != STUDENT_FILENAME:
+        tb = tb.tb_next
+    traceback.print_exception(etype, value, tb, file=stderr)
+
+
+def _exit_code(exit_exc, stderr):
+    """Map SystemExit to a process return code like the interpreter does"""
+    code = exit_exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=stderr)
+    return 1
+
+
+def _is_private(name):
+    """True for _name but not for _ or __dunder__ names"""
+    return (
+        name.startswith("_")
+        and name != "_"
+        and not (name.startswith("__") and name.endswith("__"))
+    )
+
+
+def _retires_worker(code_object):
+    """
+    True if code_object, or code nested in it, imports a module outside
+    POOL_SAFE_MODULES or uses one of SHARED_STATE_NAMES or a private name
+    (such as collections._sys), as a variable or an attribute
+    """
+    for instruction in dis.get_instructions(code_object):
+        if instruction.opname == "IMPORT_NAME":
+            if instruction.argval.partition(".")[0] not in POOL_SAFE_MODULES:
+                return True
+    for name in code_object.co_names:
+        if name in SHARED_STATE_NAMES or _is_private(name):
+            return True
+    return any(
+        _retires_worker(const)
+        for const in code_object.co_consts
+        if isinstance(const, type(code_object))
+    )
+
+
+def _load_code(request):
+    """The request's code object, from its marshalled bytecode or compiled"""
+    bytecode = request.get("bytecode")
+    if bytecode is not None:
+        return marshal.loads(base64.b64decode(bytecode))
+    return compile(request["code"], STUDENT_FILENAME, "exec")
+
+
+class _OutputLimitReached(BaseException):
+    """Stops student code that printed more than the run keeps"""
+
+
+class _CappedTextOutput(io.TextIOBase):
+    """
+    sys.stdout or sys.stderr for student code, backed by an OutputBuffer
+
+    The write that overflows the buffer, and every one after it, raises
+    _OutputLimitReached, which ends the run like the pool killing a
+    one-shot process would. Once sealed, writes past the limit are
+    dropped quietly, so the run's own error report cannot fail.
+    """
+
+    def __init__(self, max_output):
+        self.output = OutputBuffer(max_output)
+        self.sealed = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(
+                f"write() argument must be str, not {type(text).__name__}"
+            )
+        # surrogatepass keeps lone surrogates, which StringIO used to accept
+        if not self.output.write(text.encode("utf-8", "surrogatepass")):
+            if not self.sealed:
+                raise _OutputLimitReached
+        return len(text)
+
+    def getvalue(self):
+        return self.output.text("surrogatepass")
+
+
+def _run_code_object(code_object, stdin_text, max_output=DEFAULT_MAX_OUTPUT):
+    """Run compiled student code once in a fresh namespace, capturing output"""
+    import builtins
+
+    stdout = _CappedTextOutput(max_output)
+    stderr = _CappedTextOutput(max_output)
+    namespace = {
+        "__name__": "__main__",
+        "__builtins__": builtins.__dict__.copy(),
+    }
+
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    cwd = os.getcwd()
+    returncode = 0
+    recycle = False
+
+    sys.stdin = io.StringIO(stdin_text)
+    sys.stdout = stdout
+    sys.stderr = stderr
+    try:
+        try:
+            exec(code_object, namespace)
+        finally:
+            stdout.sealed = stderr.sealed = True
+    except SystemExit as e:
+        returncode = _exit_code(e, stderr)
+    except _OutputLimitReached:
+        returncode = 1
+    except MemoryError:
+        returncode = 1
+        recycle = True
+        _print_student_traceback(stderr)
+    except BaseException:
+        returncode = 1
+        _print_student_traceback(stderr)
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        namespace.clear()
+        try:
+            os.chdir(cwd)
+        except OSError:
+            recycle = True
+
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "truncated": stdout.output.truncated or stderr.output.truncated,
+        "stdout_bytes": stdout.output.written,
+        "stderr_bytes": stderr.output.written,
+        "recycle": recycle,
+    }
+
+
+def _execute_request(request, max_output=DEFAULT_MAX_OUTPUT):
+    """
+    Run one submission, once or once per test case, and capture output
+
+    Each run keeps at most max_output bytes of stdout and of stderr and is
+    stopped with "truncated" set once it prints more. The response's
+    "usage" covers the whole request: CPU seconds, peak RSS and bytes written
+    to stdout and stderr.
+    """
+    import linecache
+
+    code = request["code"]
+    cases = request.get("cases")
+    stdin_texts = cases if cases is not None else [request.get("stdin", "")]
+    linecache.cache[STUDENT_FILENAME] = (
+        len(code),
+        None,
+        code.splitlines(True),
+        STUDENT_FILENAME,
+    )
+
+    _set_run_cpu_limit(request.get("timeout", 10))
+    _reset_peak_rss()
+    before = _rusage_self()
+    results = []
+    try:
+        try:
+            code_object = _load_code(request)
+            shared = _retires_worker(code_object)
+        except Exception:
+            # A syntax error fails every case the same way
+            stderr = io.StringIO()
+            _print_student_traceback(stderr)
+            failed = {
+                "returncode": 1,
+                "stdout": "",
+                "stderr": stderr.getvalue(),
+                "truncated": False,
+                "stdout_bytes": 0,
+                "stderr_bytes": len(stderr.getvalue().encode("utf-8")),
+                "recycle": False,
+            }
+            results = [failed] * len(stdin_texts)
+            shared = False
+        else:
+            for stdin_text in stdin_texts:
+                result = _run_code_object(code_object, stdin_text, max_output)
+                results.append(result)
+                if result["recycle"]:
+                    break  # The remaining cases are not run
+    finally:
+        linecache.cache.pop(STUDENT_FILENAME, None)
+
+    recycle = shared or any(result["recycle"] for result in results)
+    usage = _usage_since(
+        before,
+        sum(result["stdout_bytes"] for result in results),
+        sum(result["stderr_bytes"] for result in results),
+    )
+
+    # Threads left behind would keep running into the next student's run
+    threading_module = sys.modules.get("threading")
+    if threading_module is not None and threading_module.active_count() > 1:
+        recycle = True
+
+    case_keys = ("returncode", "stdout", "stderr", "truncated")
+    if cases is None:
+        return dict(
+            {key: results[0][key] for key in case_keys},
+            recycle=recycle,
+            usage=usage,
+        )
+    return {
+        "returncode": 0,
+        "stdout": "",
+        "stderr": "",
+        "truncated": False,
+        "cases": [{key: result[key] for key in case_keys} for result in results],
+        "recycle": recycle,
+        "usage": usage,
+    }
+
+
+_MISSING = object()
+
+# Py_TPFLAGS_IMMUTABLETYPE: set on the built-in types, whose attributes
+# cannot be changed from Python
+_IMMUTABLE_TYPE = 1 << 8
+
+
+def _views_unchanged(
+    key_views,
+    value_views,
+    keys,
+    values,
+    size,
+    sum=sum,
+    map=map,
+    len=len,
+    all=all,
+    list=list,
+    is_=operator.is_,
+    chain=itertools.chain.from_iterable,
+):
+    """True if the live views still hold exactly keys and, by identity, values"""
+    return (
+        sum(map(len, key_views + value_views)) == size
+        and list(chain(key_views)) == keys
+        and all(map(is_, chain(value_views), values))
+    )
+
+
+def _put_back_attributes(
+    cls,
+    saved,
+    missing=_MISSING,
+    vars=vars,
+    setattr=setattr,
+    delattr=delattr,
+    Exception=Exception,
+):
+    """Give cls the attributes in saved again, as far as it allows"""
+    current = vars(cls)
+    for name in [name for name in current if name not in saved]:
+        try:
+            delattr(cls, name)
+        except Exception:
+            pass  # The worker is retired all the same
+    for name, value in saved.items():
+        if current.get(name, missing) is not value:
+            try:
+                setattr(cls, name, value)
+            except Exception:
+                pass
+
+
+class _InterpreterSnapshot:
+    """
+    The state a pool worker's runs share, as it was before the first run
+
+    Keeps sys.modules, the namespace of every loaded module (builtins and
+    the worker's own __main__ among them), the attributes of the classes
+    those namespaces hold and the import system's lists. Values are
+    compared by identity, which also keeps a replaced value's __eq__ from
+    running, and the snapshot holds on to the originals, so their ids
+    cannot be reused. restore() binds everything it calls when this module
+    is loaded, so a run that replaced a builtin or a function here cannot
+    change it.
+    """
+
+    def __init__(self):
+        self.modules = sys.modules
+        self.saved_modules = dict(sys.modules)
+        # (namespace dict or class, copy of its items)
+        self.saved = []
+        seen = set()
+        for module in self.saved_modules.values():
+            namespace = getattr(module, "__dict__", None)
+            if type(namespace) is not dict or id(namespace) in seen:
+                continue
+            seen.add(id(namespace))
+            self.saved.append((namespace, dict(namespace)))
+            for value in namespace.values():
+                if (
+                    isinstance(value, type)
+                    and not value.__flags__ & _IMMUTABLE_TYPE
+                    and id(value) not in seen
+                ):
+                    seen.add(id(value))
+                    self.saved.append((value, dict(vars(value))))
+        self.lists = [
+            (items, list(items)) for items in (sys.path, sys.meta_path, sys.path_hooks)
+        ]
+
+        # Live views of everything above, so that checking an unchanged
+        # interpreter is a pass over flat lists rather than a loop in Python
+        mappings = [self.modules] + [
+            owner if type(owner) is dict else vars(owner) for owner, _ in self.saved
+        ]
+        self._key_views = [mapping.keys() for mapping in mappings]
+        self._value_views = [mapping.values() for mapping in mappings]
+        self._value_views += [items for items, _ in self.lists]
+        chain = itertools.chain.from_iterable
+        self._keys = list(chain(self._key_views))
+        self._values = list(chain(self._value_views))
+        self._size = sum(map(len, self._key_views + self._value_views))
+
+    def restore(
+        self,
+        unchanged=_views_unchanged,
+        put_back_attributes=_put_back_attributes,
+        type=type,
+        list=list,
+    ):
+        """
+        Put back what the last run changed
+
+        Modules the run imported are dropped, so the next run imports them
+        afresh; that alone does not count as a change.
+
+        Returns:
+            bool: True if the run changed any of the saved state
+        """
+        for name in list(self.modules):
+            if name not in self.saved_modules:
+                del self.modules[name]
+        if unchanged(self._key_views, self._value_views, self._keys, self._values,
+                     self._size):
+            return False
+
+        self.modules.update(self.saved_modules)
+        for owner, saved in self.saved:
+            if type(owner) is dict:
+                owner.clear()
+                owner.update(saved)
+            else:
+                put_back_attributes(owner, saved)
+        for items, saved in self.lists:
+            items[:] = saved
+        return True
+
+
+class _ProcessSnapshot:
+    """
+    The process state a pool worker's runs share that no module holds:
+    signal handlers and timers, the umask and the environment, and the
+    random seed and decimal context each run would otherwise inherit
+
+    restore() runs after _InterpreterSnapshot.restore(), once the modules
+    it calls are back as they were.
+    """
+
+    def __init__(self):
+        import decimal
+        import random
+
+        self.decimal = decimal
+        self.random = random
+        self.handlers = {}
+        for signum in signal.valid_signals():
+            if signum in (signal.SIGKILL, signal.SIGSTOP):
+                continue
+            handler = signal.getsignal(signum)
+            if handler is not None:  # None: not set from Python, cannot be set back
+                self.handlers[signum] = handler
+        self.umask = os.umask(0o022)
+        os.umask(self.umask)
+        self.environ = dict(os.environ)
+
+    def restore(self):
+        """
+        Put the process state back
+
+        Returns:
+            bool: True if the run had changed its handlers, timers, umask
+                or environment
+        """
+        changed = signal.alarm(0) != 0
+        for timer in (signal.ITIMER_REAL, signal.ITIMER_VIRTUAL, signal.ITIMER_PROF):
+            if signal.setitimer(timer, 0) != (0.0, 0.0):
+                changed = True
+        for signum, handler in self.handlers.items():
+            if signal.getsignal(signum) is not handler:
+                signal.signal(signum, handler)
+                changed = True
+        if os.umask(self.umask) != self.umask:
+            changed = True
+        if dict(os.environ) != self.environ:
+            os.environ.clear()
+            os.environ.update(self.environ)
+            changed = True
+        # Unseeded for the next run whatever this one seeded
+        self.random.seed()
+        self.decimal.setcontext(self.decimal.Context())
+        return changed
+
+
+def _worker_main(limits):
+    """Serve execution requests from the pool until the pipe closes"""
+    # Move the protocol off fds 0-2 so student output cannot corrupt it
+    request_fd = os.dup(0)
+    response_fd = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    # Behave like a script in the temp directory, not in the runner package
+    sys.path[0] = os.getcwd()
+
+    _apply_worker_limits(limits)
+    for name in _WORKER_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # Bound once, so a run cannot replace what checks it
+    restore_interpreter = _InterpreterSnapshot().restore
+    restore_process = _ProcessSnapshot().restore
+    _write_frame(response_fd, {"ready": True})
+
+    while True:
+        request = _read_frame(request_fd)
+        if request is None:
+            break
+        response = _execute_request(request, limits["max_output"])
+        # Before anything of this module runs again, the answer included
+        changed = restore_interpreter()
+        if restore_process() or changed:
+            response["recycle"] = True
+        _write_frame(response_fd, response)
+        if response["recycle"]:
+            break
+
+
+def _drop_privileges(uid, gid):
+    """Switch to gid and uid for good, where given; needs root"""
+    if gid is not None:
+        os.setgroups([])
+        os.setgid(gid)
+    if uid is not None:
+        os.setuid(uid)
+
+
+def _forkserver_child(config, request, result_fd, inherited_fds):
+    """Run one request in a fork of the template, then exit"""
+    status = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+        for fd in inherited_fds:
+            os.close(fd)
+        limits = dict(config["limits"], cgroup=request.pop("cgroup", None))
+        _apply_worker_limits(limits)
+        _write_frame(result_fd, {"pid": os.getpid()})
+        # Reset before switching user: /proc/self is not writable after
+        _reset_peak_rss()
+        _drop_privileges(config["uid"], config["gid"])
+        _write_frame(result_fd, _execute_request(request, config["max_output"]))
+        status = 0
+    finally:
+        os._exit(status)
+
+
+def _preload_modules(names):
+    """Import the template's modules and freeze them out of the collector"""
+    for name in names:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+
+    # Keep the preloaded objects out of the children's garbage collections,
+    # which would otherwise copy every page they touch
+    import gc
+
+    gc.freeze()
+
+
+def _report_exits(result_fds):
+    """
+    SIGCHLD handler body: reap exited children and send each one's exit
+    status down its result pipe
+
+    Args:
+        result_fds (dict): Result pipe per running child's pid
+    """
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        fd = result_fds.pop(pid, None)
+        if fd is None:
+            continue
+        try:
+            _write_frame(fd, {"exited": os.waitstatus_to_exitcode(status)})
+        except OSError:
+            pass  # The server already has its response
+        os.close(fd)
+
+
+def _forkserver_requests(control):
+    """Yield (request, result fd) pairs until the server closes its end"""
+    while True:
+        try:
+            body, fds, flags, _ = socket.recv_fds(control, FORKSERVER_MAX_REQUEST, 1)
+        except ConnectionError:
+            return
+        if not body:
+            return
+        if len(fds) != 1 or flags & socket.MSG_TRUNC:
+            for fd in fds:
+                os.close(fd)  # The server sees the pipe close and gives up
+            continue
+        yield json.loads(body), fds[0]
+
+
+def _forkserver_main(config, control_fd):
+    """Import the preload modules, then fork a sandbox per request"""
+    control = socket.socket(fileno=control_fd)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    # Behave like a script in the temp directory, not in the runner package
+    sys.path[0] = os.getcwd()
+    _preload_modules(config["preload"])
+
+    # Result pipes of running children, so their exit can be reported
+    result_fds = {}
+    signal.signal(signal.SIGCHLD, lambda signum, frame: _report_exits(result_fds))
+    control.send(b"ready")
+
+    for request, result_fd in _forkserver_requests(control):
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+        pid = os.fork()
+        if pid == 0:
+            _forkserver_child(
+                config, request, result_fd, [control.fileno(), *result_fds.values()]
+            )
+        result_fds[pid] = result_fd
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--forkserver":
+        _forkserver_main(json.loads(sys.argv[2]), int(sys.argv[3]))
+    else:
+        _worker_main(json.loads(sys.argv[1]))
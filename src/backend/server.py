@@ -4,17 +4,54 @@ Bhodi Learning Platform Backend Server
 Secure Python code execution with Flask
 """
 import os
-import sys
 import logging
 import tempfile
 import subprocess
 import time
 import re
-import re
-from collections import defaultdict, deque
-from flask import Flask, request, jsonify
+import threading
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, closing
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from config import get_config
+from runner.cgroups import SandboxCgroups
+from runner.safe_runner import (
+    ForkServer,
+    SandboxError,
+    SandboxPool,
+    StreamingRun,
+    apply_cgroup_accounting,
+    capture_output,
+    sandbox_env,
+    start_one_shot,
+)
+from solution_cache import SolutionOutputCache
+from lesson_catalog import LessonCatalog
+from prerendered import PrerenderedResponse
+from rate_limiter import InMemoryBackend, RateLimiter
+from admission import DEFAULT_PRIORITY, AdmissionController, AdmissionRejected
+from code_validator import CodeValidator
+from result_cache import ExecutionResultCache
+from expected_outputs import DEFAULT_SIMULATED_INPUTS
+from feedback import FeedbackCache
+from error_parser import parse_python_error
+from jobs import JobQueueFull, JobStore
+from metrics import (
+    EXECUTION_OUTCOMES,
+    EXECUTION_QUEUE_WAIT_SECONDS,
+    RATE_LIMIT_REJECTIONS,
+    REGISTRY,
+    REQUEST_LATENCY,
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_EXECUTION_SECONDS,
+    SANDBOX_OUTPUT_BYTES,
+    SANDBOX_PEAK_RSS_BYTES,
+    SANDBOX_SPAWN_SECONDS,
+    start_metrics_server,
+)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -41,7 +78,7 @@ if cors_origins == ["*"]:
         app,
         origins="*",
         methods=["GET", "POST", "OPTIONS"],
-        allow_headers=["Content-Type"],
+        allow_headers=["Content-Type", "X-Session-Id"],
     )
 else:
     logger.info(f"Configuring CORS for specific origins: {cors_origins}")
@@ -49,7 +86,7 @@ else:
         app,
         origins=cors_origins,
         methods=["GET", "POST", "OPTIONS"],
-        allow_headers=["Content-Type"],
+        allow_headers=["Content-Type", "X-Session-Id"],
     )
 
 logger.info(f"Starting Bhodi Learning Platform Backend")
@@ -57,21 +94,195 @@ logger.info(f"Environment: {os.environ.get('FLASK_ENV', 'development')}")
 logger.info(f"CORS Origins: {app.config['CORS_ORIGINS']}")
 logger.info(f"Code execution enabled: {app.config['ENABLE_CODE_EXECUTION']}")
 
-# Rate limiting storage
-# Format: {client_ip: deque([(timestamp, endpoint), ...])}
-rate_limit_storage = defaultdict(lambda: deque())
+# Rate limiting - sliding-window counters per (client IP, endpoint)
+rate_limiter = RateLimiter(
+    InMemoryBackend(max_keys=app.config["RATE_LIMIT_MAX_CLIENTS"]),
+    sweep_interval=app.config["RATE_LIMIT_SWEEP_INTERVAL"],
+)
+
+# Per-sandbox cgroup v2 limits, or None where sandboxes rely on rlimits
+sandbox_cgroups = (
+    SandboxCgroups.open(
+        app.config["SANDBOX_CGROUP_ROOT"],
+        memory_limit_mb=app.config["SANDBOX_MEMORY_LIMIT_MB"],
+        cpu_limit=app.config["SANDBOX_CGROUP_CPU_LIMIT"],
+        pids_limit=app.config["SANDBOX_CGROUP_PIDS_LIMIT"],
+        total_memory_mb=app.config["SANDBOX_CGROUP_TOTAL_MEMORY_MB"],
+        total_cpu_limit=app.config["SANDBOX_CGROUP_TOTAL_CPU_LIMIT"],
+    )
+    if app.config["SANDBOX_CGROUP_ROOT"]
+    else None
+)
+
+# Warm sandbox pool (or fork server), created lazily per process by
+# _get_sandbox_pool()
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+# Caps concurrent sandboxes; excess runs queue briefly, then get a 503
+admission_controller = AdmissionController(
+    max_concurrent=app.config["EXECUTION_MAX_CONCURRENT"],
+    max_queue=app.config["EXECUTION_QUEUE_SIZE"],
+    queue_timeout=app.config["EXECUTION_QUEUE_TIMEOUT"],
+    max_client_queue=app.config["EXECUTION_CLIENT_QUEUE_SIZE"],
+)
+admission_controller.wait_observer = (
+    lambda priority, seconds: EXECUTION_QUEUE_WAIT_SECONDS.observe(seconds, queue=priority)
+)
+
+# Who the current request's runs are admitted for, as (client, priority,
+# session); set per request and inherited by the job and batch threads it
+# starts
+_run_scheduling = contextvars.ContextVar(
+    "run_scheduling", default=(None, DEFAULT_PRIORITY, None)
+)
 
+# Priority class of the runs each endpoint starts; all others are "run"
+_ENDPOINT_PRIORITIES = {
+    "check_lesson_answer": "check",
+    "submit_check_job": "check",
+    "check_lesson_batch": "batch",
+}
+
+# Browser session ids the frontend sends in X-Session-Id
+_SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9-]{8,64}")
+
+# Background executor for the /api/jobs endpoints; finished results are
+# kept for JOB_RESULT_TTL seconds
+job_store = JobStore(
+    max_workers=app.config["JOB_WORKERS"],
+    max_pending=app.config["JOB_MAX_PENDING"],
+    result_ttl=app.config["JOB_RESULT_TTL"],
+)
 
-def _clean_old_requests(client_ip, window_seconds=60):
-    """Remove requests older than window_seconds"""
-    current_time = time.time()
-    cutoff_time = current_time - window_seconds
+# Expected solution results, so a check runs the student's code only
+solution_cache = SolutionOutputCache()
 
-    while (
-        rate_limit_storage[client_ip]
-        and rate_limit_storage[client_ip][0][0] < cutoff_time
-    ):
-        rate_limit_storage[client_ip].popleft()
+# Security verdicts and compiled code, one parse per unique submission
+code_validator = CodeValidator(max_entries=app.config["VALIDATION_CACHE_SIZE"])
+
+# Responses of deterministic programs, so an unchanged re-run needs no sandbox
+result_cache = ExecutionResultCache(
+    max_entries=app.config["RESULT_CACHE_SIZE"],
+    max_bytes=app.config["RESULT_CACHE_MAX_BYTES"],
+)
+
+# Default object reprs contain a memory address, which differs between runs
+_OBJECT_ADDRESS_PATTERN = re.compile(r" at 0x[0-9a-fA-F]+>")
+
+# Diffs and feedback for wrong outputs, by lesson and output hashes
+feedback_cache = FeedbackCache(max_entries=app.config["FEEDBACK_CACHE_SIZE"])
+
+# Constructs _get_code_hint() looks for, found in one pass over the code
+_CODE_FEATURES = re.compile(r"quit|input\(|\bif\b")
+
+# Values that already live elsewhere are read when /metrics is scraped
+REGISTRY.gauge_callback(
+    "bhodi_sandbox_queue_depth",
+    "Requests waiting for a free sandbox worker",
+    lambda: _sandbox_pool.waiting if _sandbox_pool else 0,
+)
+REGISTRY.gauge_callback(
+    "bhodi_execution_admission",
+    "Runs holding or waiting for an execution slot",
+    lambda: {
+        ("running",): admission_controller.running,
+        ("waiting",): admission_controller.waiting,
+    },
+    labelnames=("state",),
+)
+REGISTRY.gauge_callback(
+    "bhodi_execution_queue_depth",
+    "Runs waiting for an execution slot, by queue",
+    lambda: {
+        (priority,): n
+        for priority, n in admission_controller.waiting_by_priority().items()
+    },
+    labelnames=("queue",),
+)
+REGISTRY.counter_callback(
+    "bhodi_execution_shed_total",
+    "Runs rejected by admission control",
+    lambda: {(reason,): n for reason, n in admission_controller.rejected.items()},
+    labelnames=("reason",),
+)
+REGISTRY.gauge_callback(
+    "bhodi_sandbox_workers",
+    "Live sandbox workers by state",
+    lambda: (
+        {
+            ("idle",): _sandbox_pool.idle_workers,
+            ("busy",): _sandbox_pool.live_workers - _sandbox_pool.idle_workers,
+        }
+        if _sandbox_pool
+        else {}
+    ),
+    labelnames=("state",),
+)
+REGISTRY.counter_callback(
+    "bhodi_cache_requests_total",
+    "Cache lookups by cache and result",
+    lambda: {
+        ("solution", "hit"): solution_cache.hits,
+        ("solution", "miss"): solution_cache.misses,
+        ("validation", "hit"): code_validator.hits,
+        ("validation", "miss"): code_validator.misses,
+        ("result", "hit"): result_cache.hits,
+        ("result", "miss"): result_cache.misses,
+        ("feedback", "hit"): feedback_cache.hits,
+        ("feedback", "miss"): feedback_cache.misses,
+    },
+    labelnames=("cache", "result"),
+)
+REGISTRY.gauge_callback(
+    "bhodi_result_cache_bytes",
+    "Serialized size of the cached run responses",
+    lambda: result_cache.bytes,
+)
+REGISTRY.gauge_callback(
+    "bhodi_jobs",
+    "Background jobs by state",
+    lambda: {("pending",): job_store.pending, ("stored",): len(job_store)},
+    labelnames=("state",),
+)
+REGISTRY.gauge_callback(
+    "bhodi_rate_limit_tracked_clients",
+    "(client, endpoint) pairs tracked by the rate limiter",
+    lambda: len(rate_limiter.backend),
+)
+
+if app.config["METRICS_PORT"]:
+    start_metrics_server(REGISTRY, app.config["METRICS_PORT"])
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_start_time = time.perf_counter()
+
+
+@app.before_request
+def _set_run_scheduling():
+    _run_scheduling.set(
+        (
+            _get_client_ip(),
+            _ENDPOINT_PRIORITIES.get(request.endpoint, DEFAULT_PRIORITY),
+            _get_session_id(),
+        )
+    )
+
+
+@app.after_request
+def _record_request_metrics(response):
+    """Record request latency per route (route templates keep labels bounded)"""
+    start_time = g.get("request_start_time")
+    if start_time is not None:
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start_time,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
 
 
 def _check_rate_limit(client_ip, endpoint, max_requests=10, window_seconds=60):
@@ -87,27 +298,31 @@ def _check_rate_limit(client_ip, endpoint, max_requests=10, window_seconds=60):
     Returns:
         dict: Rate limit check result
     """
-    current_time = time.time()
-
-    # Clean old requests
-    _clean_old_requests(client_ip, window_seconds)
+    result = rate_limiter.check(client_ip, endpoint, max_requests, window_seconds)
+    if not result["allowed"]:
+        RATE_LIMIT_REJECTIONS.inc(endpoint=endpoint)
+    return result
 
-    # Count requests for this endpoint in current window
-    endpoint_requests = sum(
-        1 for _, ep in rate_limit_storage[client_ip] if ep == endpoint
-    )
 
-    if endpoint_requests >= max_requests:
-        return {
-            "allowed": False,
-            "message": f"Rate limit exceeded. Maximum {max_requests} requests per {window_seconds} seconds.",
-            "retry_after": window_seconds,
-        }
+def _json_response(payload, status=200):
+    """JSON response; a run shed by admission control also gets Retry-After"""
+    if status == 503 and "retry_after" in payload:
+        return (
+            jsonify(payload),
+            status,
+            {"Retry-After": str(payload["retry_after"])},
+        )
+    return jsonify(payload), status
 
-    # Add current request
-    rate_limit_storage[client_ip].append((current_time, endpoint))
 
-    return {"allowed": True, "requests_remaining": max_requests - endpoint_requests - 1}
+def _server_busy(retry_after):
+    """Payload for a run shed by admission control or a full job queue"""
+    return {
+        "status": "error",
+        "message": "The server is busy running other programs. Please try again in a moment.",
+        "error_type": "server_busy",
+        "retry_after": retry_after,
+    }
 
 
 def _get_client_ip():
@@ -121,6 +336,18 @@ def _get_client_ip():
         return request.remote_addr or "127.0.0.1"
 
 
+def _get_session_id():
+    """
+    Browser session the frontend sent, or None; runs are shared out per IP
+    address first and then between its sessions, so students behind one
+    school NAT take turns without a client gaining share by inventing ids
+    """
+    session_id = request.headers.get("X-Session-Id", "")
+    if _SESSION_ID_PATTERN.fullmatch(session_id):
+        return session_id
+    return None
+
+
 @app.route("/", methods=["GET"])
 def hello():
     """
@@ -155,37 +382,70 @@ def health_check():
     )
 
 
-def find_lesson_directory(lesson_id):
-    """Find the lesson directory for a given lesson ID"""
-    # Determine base lessons path
+def _get_lessons_base():
+    """Get the directory that contains the lesson_XX_* directories"""
     if os.path.exists("lessons"):
         # Production: lessons directory is in current working directory
-        lessons_base = "lessons"
-    else:
-        # Development: go up two levels from src/backend to project root
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        lessons_base = os.path.join(project_root, "lessons")
+        return "lessons"
 
-    # Look for lesson directory that starts with lesson_XX_
-    lesson_prefix = f"lesson_{lesson_id.zfill(2)}_"
+    # Development: go up two levels from src/backend to project root
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(project_root, "lessons")
 
-    if os.path.exists(lessons_base):
-        for item in os.listdir(lessons_base):
-            if item.startswith(lesson_prefix) and os.path.isdir(
-                os.path.join(lessons_base, item)
-            ):
-                return os.path.join(lessons_base, item)
 
-    return None
+def _render_lesson(lesson, lesson_id):
+    """
+    Pre-render the /lesson/<id> response for a lesson
+
+    Args:
+        lesson (Lesson): Lesson from the catalog
+        lesson_id (str): Lesson id as requested ("1" and "01" both work)
+
+    Returns:
+        PrerenderedResponse: Serialized payload, also stored on the lesson
+    """
+    lesson_data = {
+        "problem_statement": lesson.problem_statement or "Problem statement not found.",
+        "starter_code": lesson.starter_code or "# Starter code not found",
+    }
+
+    # Read solution (but don't expose it to frontend for now)
+    if lesson.solution is not None:
+        # Prefixed with _ to indicate internal use
+        lesson_data["_solution"] = lesson.solution
+
+    lesson_data["lesson_id"] = lesson_id
+    lesson_data["status"] = "success"
+
+    rendered = PrerenderedResponse(
+        lesson_data, max_age=app.config["LESSON_CACHE_MAX_AGE"]
+    )
+    lesson.rendered[lesson_id] = rendered
+    return rendered
+
+
+# Lesson files are indexed, read and rendered once; edits are picked up by
+# mtime polling when LESSON_RELOAD_INTERVAL is set
+lesson_catalog = LessonCatalog(
+    _get_lessons_base(),
+    refresh_interval=app.config["LESSON_RELOAD_INTERVAL"],
+    renderer=lambda lesson: _render_lesson(lesson, lesson.lesson_id),
+).load()
+
+
+def find_lesson_directory(lesson_id):
+    """Find the lesson directory for a given lesson ID"""
+    lesson = lesson_catalog.get(lesson_id)
+    return lesson.directory if lesson else None
 
 
 @app.route("/lesson/<lesson_id>", methods=["GET"])
 def get_lesson(lesson_id):
     """Get lesson content including problem statement, starter code, and solution"""
     try:
-        lesson_dir = find_lesson_directory(lesson_id)
+        lesson = lesson_catalog.get(lesson_id)
 
-        if not lesson_dir:
+        if not lesson:
             logger.error(f"Lesson {lesson_id} directory not found")
             return (
                 jsonify(
@@ -202,39 +462,10 @@ def get_lesson(lesson_id):
                 404,
             )
 
-        logger.info(f"Found lesson directory: {lesson_dir}")
-
-        lesson_data = {}
-
-        # Read problem statement
-        problem_path = os.path.join(lesson_dir, "problem_statement.md")
-        if os.path.exists(problem_path):
-            with open(problem_path, "r", encoding="utf-8") as f:
-                lesson_data["problem_statement"] = f.read()
-        else:
-            lesson_data["problem_statement"] = "Problem statement not found."
-
-        # Read starter code
-        starter_path = os.path.join(lesson_dir, "starter_code.py")
-        if os.path.exists(starter_path):
-            with open(starter_path, "r", encoding="utf-8") as f:
-                lesson_data["starter_code"] = f.read()
-        else:
-            lesson_data["starter_code"] = "# Starter code not found"
-
-        # Read solution (but don't expose it to frontend for now)
-        solution_path = os.path.join(lesson_dir, "solution.py")
-        if os.path.exists(solution_path):
-            with open(solution_path, "r", encoding="utf-8") as f:
-                lesson_data["_solution"] = (
-                    f.read()
-                )  # Prefixed with _ to indicate internal use
-
-        lesson_data["lesson_id"] = lesson_id
-        lesson_data["status"] = "success"
+        rendered = lesson.rendered.get(lesson_id) or _render_lesson(lesson, lesson_id)
 
-        logger.info(f"Serving lesson {lesson_id} from {lesson_dir}")
-        return jsonify(lesson_data)
+        logger.info(f"Serving lesson {lesson_id} from {lesson.directory}")
+        return rendered.to_response(request)
 
     except Exception as e:
         logger.error(f"Error loading lesson {lesson_id}: {str(e)}")
@@ -272,106 +503,245 @@ def check_lesson_answer(lesson_id):
 
         # Get student code from request
         data = request.get_json()
-        if not data or "code" not in data:
+        return _json_response(*_check_answer(lesson_id, data))
+
+    except Exception as e:
+        logger.error(f"❌ Error checking lesson {lesson_id}: {str(e)}")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Error checking answer: {str(e)}",
+                    "error_type": "server_error",
+                }
+            ),
+            500,
+        )
+
+
+def _check_answer(lesson_id, data):
+    """
+    Check a student's code for a lesson
+
+    Args:
+        lesson_id (str): Lesson being checked
+        data (dict): Request data with 'code'
+
+    Returns:
+        tuple: (response payload, HTTP status)
+    """
+    if not data or "code" not in data:
+        return {
+            "status": "error",
+            "message": "No code provided",
+            "error_type": "input_error",
+        }, 400
+
+    student_code = data["code"].strip()
+    if not student_code:
+        return {
+            "status": "error",
+            "message": "Empty code provided",
+            "error_type": "input_error",
+        }, 400
+
+    logger.info(f"📝 Checking answer for lesson {lesson_id}")
+    logger.info(f"📄 Student code length: {len(student_code)} characters")
+
+    # Load lesson solution
+    lesson_data = _load_lesson_data(lesson_id)
+    if not lesson_data:
+        return {
+            "status": "error",
+            "message": f"Lesson {lesson_id} not found",
+            "error_type": "lesson_not_found",
+        }, 404
+
+    return _grade_submission(lesson_id, student_code, lesson_data)
+
+
+def _grade_submission(lesson_id, student_code, lesson_data, solution_result=None):
+    """
+    Run a student's code and compare its output with the solution's
+
+    Args:
+        lesson_id (str): Lesson being checked
+        student_code (str): Stripped, non-empty student code
+        lesson_data (dict): Lesson data from _load_lesson_data()
+        solution_result (dict): Expected result, fetched when not given
+
+    Returns:
+        tuple: (response payload, HTTP status)
+    """
+    if lesson_data.get("_test_cases"):
+        return _grade_test_cases(
+            lesson_id, student_code, lesson_data, solution_result
+        )
+
+    # Execute student code and get output
+    student_result = _execute_code_safely(student_code)
+    logger.info(f"🏃 Student code execution result: {student_result['status']}")
+
+    if student_result.get("error_type") == "server_busy":
+        return student_result, 503
+
+    if student_result["status"] == "error":
+        return {
+            "status": "error",
+            "message": "Your code has errors that need to be fixed first",
+            "feedback": f"Please fix these errors before checking your answer:\n\n{student_result.get('error_output', 'Unknown error')}",
+            "error_type": "execution_error",
+            "student_output": "",
+            "expected_output": "",
+        }, 200
+
+    # Get expected output (cached per solution source and inputs)
+    if solution_result is None:
+        solution_result = _get_solution_result(lesson_id, lesson_data)
+    logger.info(f"✅ Solution code execution result: {solution_result['status']}")
+
+    if solution_result.get("error_type") == "server_busy":
+        return solution_result, 503
+
+    if solution_result["status"] == "error":
+        logger.error(
+            f"❌ Solution code has errors: {solution_result.get('error_output')}"
+        )
+        return {
+            "status": "error",
+            "message": "Internal error: solution code has problems",
+            "error_type": "solution_error",
+        }, 500
+
+    # Compare outputs and generate feedback
+    student_output = student_result.get("output", "").strip()
+    expected_output = solution_result.get("output", "").strip()
+
+    feedback_result = _generate_lesson_feedback(
+        lesson_id=lesson_id,
+        student_code=student_code,
+        student_output=student_output,
+        expected_output=expected_output,
+        lesson_data=lesson_data,
+    )
+
+    logger.info(f"📊 Feedback generated: {feedback_result['status']}")
+
+    return feedback_result, 200
+
+
+@app.route("/lesson/<lesson_id>/check-batch", methods=["POST"])
+def check_lesson_batch(lesson_id):
+    """
+    Check many saved submissions for a lesson in one request
+    Accepts {"submissions": [{"id": ..., "code": ...}, ...]} and streams one
+    NDJSON line per submission as it is graded, then a summary line
+    """
+    try:
+        client_ip = _get_client_ip()
+        rate_check = _check_rate_limit(
+            client_ip, "lesson-check-batch", max_requests=5, window_seconds=60
+        )
+
+        if not rate_check["allowed"]:
+            logger.warning(
+                f"Rate limit exceeded for IP {client_ip} on /lesson/{lesson_id}/check-batch"
+            )
             return (
                 jsonify(
                     {
                         "status": "error",
-                        "message": "No code provided",
-                        "error_type": "input_error",
+                        "message": rate_check["message"],
+                        "error_type": "rate_limit_error",
+                        "retry_after": rate_check["retry_after"],
                     }
                 ),
-                400,
+                429,
             )
 
-        student_code = data["code"].strip()
-        if not student_code:
-            return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": "Empty code provided",
-                        "error_type": "input_error",
-                    }
-                ),
+        data = request.get_json()
+        submissions = data.get("submissions") if isinstance(data, dict) else None
+        if not isinstance(submissions, list) or not submissions:
+            return _json_response(
+                {
+                    "status": "error",
+                    "message": "No submissions provided",
+                    "error_type": "input_error",
+                },
                 400,
             )
 
-        logger.info(f"📝 Checking answer for lesson {lesson_id}")
-        logger.info(f"📄 Student code length: {len(student_code)} characters")
+        max_submissions = app.config["BATCH_CHECK_MAX_SUBMISSIONS"]
+        if len(submissions) > max_submissions:
+            return _json_response(
+                {
+                    "status": "error",
+                    "message": f"Too many submissions. Maximum {max_submissions} per batch.",
+                    "error_type": "input_error",
+                },
+                400,
+            )
 
-        # Load lesson solution
         lesson_data = _load_lesson_data(lesson_id)
         if not lesson_data:
-            return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": f"Lesson {lesson_id} not found",
-                        "error_type": "lesson_not_found",
-                    }
-                ),
-                404,
-            )
-
-        # Execute student code and get output
-        student_result = _execute_code_safely(student_code)
-        logger.info(f"🏃 Student code execution result: {student_result['status']}")
-
-        if student_result["status"] == "error":
-            return jsonify(
+            return _json_response(
                 {
                     "status": "error",
-                    "message": "Your code has errors that need to be fixed first",
-                    "feedback": f"Please fix these errors before checking your answer:\n\n{student_result.get('error_output', 'Unknown error')}",
-                    "error_type": "execution_error",
-                    "student_output": "",
-                    "expected_output": "",
-                }
+                    "message": f"Lesson {lesson_id} not found",
+                    "error_type": "lesson_not_found",
+                },
+                404,
             )
 
-        # Execute solution code and get expected output
-        solution_result = _execute_code_safely(lesson_data.get("_solution", ""))
-        logger.info(f"✅ Solution code execution result: {solution_result['status']}")
-
+        # One expected output for the whole batch
+        solution_result = _get_solution_result(lesson_id, lesson_data)
+        if solution_result.get("error_type") == "server_busy":
+            return _json_response(solution_result, 503)
         if solution_result["status"] == "error":
             logger.error(
                 f"❌ Solution code has errors: {solution_result.get('error_output')}"
             )
-            return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": "Internal error: solution code has problems",
-                        "error_type": "solution_error",
-                    }
-                ),
+            return _json_response(
+                {
+                    "status": "error",
+                    "message": "Internal error: solution code has problems",
+                    "error_type": "solution_error",
+                },
                 500,
             )
 
-        # Compare outputs and generate feedback
-        student_output = student_result.get("output", "").strip()
-        expected_output = solution_result.get("output", "").strip()
+        # Every submission is a run, so each one is charged; those past the
+        # client's budget are answered with a rate limit error, not run
+        allowed, rate_check = _charge_batch_submissions(client_ip, len(submissions))
+        if not allowed:
+            return _json_response(
+                {
+                    "status": "error",
+                    "message": rate_check["message"],
+                    "error_type": "rate_limit_error",
+                    "retry_after": rate_check["retry_after"],
+                },
+                429,
+            )
 
-        feedback_result = _generate_lesson_feedback(
-            lesson_id=lesson_id,
-            student_code=student_code,
-            student_output=student_output,
-            expected_output=expected_output,
-            lesson_data=lesson_data,
+        logger.info(
+            f"📝 Batch checking {allowed} of {len(submissions)} submissions for lesson {lesson_id}"
+        )
+        return Response(
+            _grade_batch(
+                lesson_id, submissions, lesson_data, solution_result, allowed, rate_check
+            ),
+            mimetype="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-
-        logger.info(f"📊 Feedback generated: {feedback_result['status']}")
-
-        return jsonify(feedback_result)
 
     except Exception as e:
-        logger.error(f"❌ Error checking lesson {lesson_id}: {str(e)}")
+        logger.error(f"❌ Error batch checking lesson {lesson_id}: {str(e)}")
         return (
             jsonify(
                 {
                     "status": "error",
-                    "message": f"Error checking answer: {str(e)}",
+                    "message": f"Error checking answers: {str(e)}",
                     "error_type": "server_error",
                 }
             ),
@@ -379,42 +749,138 @@ def check_lesson_answer(lesson_id):
         )
 
 
+def _charge_batch_submissions(client_ip, count):
+    """
+    Count a batch's submissions against BATCH_CHECK_SUBMISSIONS_PER_MINUTE
+
+    Returns:
+        tuple: (how many submissions may run, the rate limit result of the
+            first one that may not, or None if all may)
+    """
+    for charged in range(count):
+        rate_check = _check_rate_limit(
+            client_ip,
+            "lesson-check-batch-submission",
+            max_requests=app.config["BATCH_CHECK_SUBMISSIONS_PER_MINUTE"],
+            window_seconds=60,
+        )
+        if not rate_check["allowed"]:
+            return charged, rate_check
+    return count, None
+
+
+def _grade_batch(
+    lesson_id, submissions, lesson_data, solution_result, allowed, rate_check
+):
+    """
+    Grade submissions on BATCH_CHECK_CONCURRENCY threads, yielding NDJSON
+
+    Lines come in completion order; "index" ties each one to its submission.
+    Every run still goes through admission control. Only the first allowed
+    submissions are run; the rest get rate_check's error, after the others.
+    """
+    workers = max(1, min(app.config["BATCH_CHECK_CONCURRENCY"], allowed))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    futures = {
+        executor.submit(
+            contextvars.copy_context().run,
+            _grade_batch_item,
+            lesson_id,
+            submission,
+            lesson_data,
+            solution_result,
+        ): index
+        for index, submission in enumerate(submissions[:allowed])
+    }
+    correct = 0
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                payload, status = future.result()
+            except Exception as e:
+                logger.error(f"❌ Error grading batch submission {index}: {str(e)}")
+                payload, status = {
+                    "status": "error",
+                    "message": f"Error checking answer: {str(e)}",
+                    "error_type": "server_error",
+                }, 500
+            if payload.get("correct"):
+                correct += 1
+            yield _batch_line(index, submissions[index], payload, status)
+        for index in range(allowed, len(submissions)):
+            payload = {
+                "status": "error",
+                "message": rate_check["message"],
+                "error_type": "rate_limit_error",
+                "retry_after": rate_check["retry_after"],
+            }
+            yield _batch_line(index, submissions[index], payload, 429)
+        yield json.dumps(
+            {"summary": True, "total": len(submissions), "correct": correct}
+        ) + "\n"
+    finally:
+        # A client that disconnects mid-batch cancels the runs not yet started
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _batch_line(index, submission, payload, status):
+    """The NDJSON line reporting one batch submission's result"""
+    line = {
+        "index": index,
+        "id": submission.get("id") if isinstance(submission, dict) else None,
+        "result_status": status,
+        "result": payload,
+    }
+    return json.dumps(line) + "\n"
+
+
+def _grade_batch_item(lesson_id, submission, lesson_data, solution_result):
+    """Grade one batch submission; returns (response payload, HTTP status)"""
+    code = submission.get("code") if isinstance(submission, dict) else None
+    if not isinstance(code, str) or not code.strip():
+        return {
+            "status": "error",
+            "message": "Empty code provided",
+            "error_type": "input_error",
+        }, 400
+    return _grade_submission(lesson_id, code.strip(), lesson_data, solution_result)
+
+
 def _load_lesson_data(lesson_id):
     """Load lesson data (reusable from get_lesson)"""
-    try:
-        lesson_dir = find_lesson_directory(lesson_id)
+    lesson = lesson_catalog.get(lesson_id)
 
-        if not lesson_dir:
-            return None
+    if not lesson:
+        return None
 
-        lesson_data = {"lesson_id": lesson_id}
+    lesson_data = {"lesson_id": lesson_id}
 
-        # Load solution - prefer solution_check.py for automated checking
-        solution_check_path = os.path.join(lesson_dir, "solution_check.py")
-        solution_path = os.path.join(lesson_dir, "solution.py")
+    # Load solution - prefer solution_check.py for automated checking
+    if lesson.check_solution is not None:
+        lesson_data["_solution"] = lesson.check_solution
+        lesson_data["_solution_path"] = lesson.check_solution_path
+        logger.info(f"Using {lesson.check_solution_file} for lesson {lesson_id}")
+    else:
+        logger.warning(f"No solution file found for lesson {lesson_id}")
 
-        if os.path.exists(solution_check_path):
-            with open(solution_check_path, "r", encoding="utf-8") as f:
-                lesson_data["_solution"] = f.read()
-                logger.info(f"Using solution_check.py for lesson {lesson_id}")
-        elif os.path.exists(solution_path):
-            with open(solution_path, "r", encoding="utf-8") as f:
-                lesson_data["_solution"] = f.read()
-                logger.info(f"Using solution.py for lesson {lesson_id}")
-        else:
-            logger.warning(f"No solution file found for lesson {lesson_id}")
+    # Input vectors (and optional expected outputs) graded case by case
+    if lesson.test_cases:
+        lesson_data["_test_cases"] = lesson.test_cases
 
-        # Load problem statement for context
-        problem_path = os.path.join(lesson_dir, "problem_statement.md")
-        if os.path.exists(problem_path):
-            with open(problem_path, "r", encoding="utf-8") as f:
-                lesson_data["problem_statement"] = f.read()
+    # Friendlier error explanations specific to the lesson
+    if lesson.error_messages:
+        lesson_data["_error_messages"] = lesson.error_messages
 
-        return lesson_data
+    # Solution outputs precomputed at deploy time
+    if lesson.expected_outputs is not None:
+        lesson_data["_expected_outputs"] = lesson.expected_outputs
 
-    except Exception as e:
-        logger.error(f"Error loading lesson data for {lesson_id}: {str(e)}")
-        return None
+    # Load problem statement for context
+    if lesson.problem_statement is not None:
+        lesson_data["problem_statement"] = lesson.problem_statement
+
+    return lesson_data
 
 
 def _execute_code_safely(code):
@@ -424,19 +890,260 @@ def _execute_code_safely(code):
     )  # Use existing execute_python_code function
 
 
-def _generate_lesson_feedback(
-    lesson_id, student_code, student_output, expected_output, lesson_data
-):
-    """Generate educational feedback for lesson answers"""
-
-    # Check if outputs match exactly
-    outputs_match = student_output == expected_output
+def _get_solution_result(lesson_id, lesson_data):
+    """
+    Get the execution result of a lesson's solution
 
-    if outputs_match:
+    The solution is deterministic for a given source and input vector, so
+    its output is read from the lesson's expected_outputs.json when that was
+    built from the current solution. Otherwise it is executed once and then
+    served from solution_cache, unless SOLUTION_EXECUTION_ENABLED is off.
+    """
+    solution_code = lesson_data.get("_solution", "")
+    solution_path = lesson_data.get("_solution_path")
+    test_cases = lesson_data.get("_test_cases")
+    if test_cases:
+        if all(case["expected_output"] is not None for case in test_cases):
+            # Every expected output is declared; nothing to run
+            return {"status": "success", "cases": [None] * len(test_cases)}
+        inputs = [tuple(case["inputs"]) for case in test_cases]
+    else:
+        inputs = _get_simulated_inputs(solution_code)
+    precomputed = _get_precomputed_result(lesson_data, solution_code, inputs)
+    if precomputed is not None:
+        return precomputed
+
+    key = solution_cache.make_key(lesson_id, solution_code, inputs)
+
+    cached = solution_cache.get(key, solution_path)
+    if cached is not None:
+        logger.info(f"Using cached solution output for lesson {lesson_id}")
+        return cached
+
+    if not app.config["SOLUTION_EXECUTION_ENABLED"]:
+        logger.error(
+            f"No current expected outputs for lesson {lesson_id}; "
+            "run build_expected_outputs.py before deploying"
+        )
         return {
-            "status": "success",
-            "correct": True,
-            "message": "🎉 Excellent work! Your solution is correct!",
+            "status": "error",
+            "message": "Expected output is not available",
+            "error_output": "expected_outputs.json is missing or stale and solution execution is disabled",
+        }
+
+    if test_cases:
+        result = _execute_test_cases(
+            solution_code, [case["inputs"] for case in test_cases], timeout=5
+        )
+        failed = [case for case in result.get("cases", []) if case["returncode"]]
+        if result["status"] == "success" and failed:
+            result = {
+                "status": "error",
+                "message": "Solution failed a test case",
+                "error_output": failed[0]["stderr"],
+            }
+    else:
+        result = _execute_code_safely(solution_code)
+    if result["status"] == "success":
+        solution_cache.put(key, result, solution_path)
+    return result
+
+
+def _get_precomputed_result(lesson_data, solution_code, inputs):
+    """
+    Solution result from the lesson's expected_outputs.json
+
+    Args:
+        lesson_data (dict): Lesson data from _load_lesson_data()
+        solution_code (str): Current check solution source
+        inputs (list): The input vector, or one tuple per test case
+
+    Returns:
+        dict: A result shaped like an execution result, or None when the
+            artifact is missing, stale or lacks these inputs
+    """
+    expected_outputs = lesson_data.get("_expected_outputs")
+    if expected_outputs is None:
+        return None
+
+    if not lesson_data.get("_test_cases"):
+        output = expected_outputs.lookup(solution_code, inputs)
+        if output is None:
+            return None
+        return {"status": "success", "output": output}
+
+    cases = []
+    for case_inputs in inputs:
+        output = expected_outputs.lookup(solution_code, case_inputs)
+        if output is None:
+            return None
+        cases.append({"returncode": 0, "stdout": output, "stderr": ""})
+    return {"status": "success", "cases": cases}
+
+
+def _grade_test_cases(lesson_id, student_code, lesson_data, solution_result=None):
+    """
+    Grade a student's code against every test case of a lesson
+
+    All cases run in one sandboxed process, each in a fresh namespace. A
+    case's expected output comes from test_cases.json, or else from the
+    solution run with the same inputs.
+
+    Returns:
+        tuple: (response payload, HTTP status)
+    """
+    test_cases = lesson_data["_test_cases"]
+    student_result = _execute_test_cases(
+        student_code, [case["inputs"] for case in test_cases], timeout=5
+    )
+    logger.info(f"🏃 Student test case run result: {student_result['status']}")
+
+    if student_result.get("error_type") == "server_busy":
+        return student_result, 503
+
+    if student_result["status"] == "error":
+        return {
+            "status": "error",
+            "message": "Your code has errors that need to be fixed first",
+            "feedback": f"Please fix these errors before checking your answer:\n\n{student_result.get('error_output', student_result['message'])}",
+            "error_type": "execution_error",
+            "student_output": "",
+            "expected_output": "",
+        }, 200
+
+    student_cases = student_result["cases"]
+    if student_cases and all(case["returncode"] for case in student_cases):
+        # Failing on every input is an error in the code, not in one branch
+        return {
+            "status": "error",
+            "message": "Your code has errors that need to be fixed first",
+            "feedback": f"Please fix these errors before checking your answer:\n\n{student_cases[0]['stderr']}",
+            "error_type": "execution_error",
+            "student_output": "",
+            "expected_output": "",
+        }, 200
+
+    if solution_result is None:
+        solution_result = _get_solution_result(lesson_id, lesson_data)
+
+    if solution_result.get("error_type") == "server_busy":
+        return solution_result, 503
+
+    if solution_result["status"] == "error":
+        logger.error(
+            f"❌ Solution code has errors: {solution_result.get('error_output')}"
+        )
+        return {
+            "status": "error",
+            "message": "Internal error: solution code has problems",
+            "error_type": "solution_error",
+        }, 500
+
+    lesson_messages = lesson_data.get("_error_messages")
+    reports = [
+        _case_report(case, index, student_cases, solution_result, lesson_messages)
+        for index, case in enumerate(test_cases)
+    ]
+    passed = sum(report["passed"] for report in reports)
+    failures = [report for report in reports if not report["passed"]]
+    logger.info(f"📊 Passed {passed} of {len(reports)} test cases")
+
+    if failures:
+        feedback_result = _failed_case_feedback(
+            lesson_id, student_code, lesson_data, failures[0], passed, len(reports)
+        )
+    else:
+        feedback_result = _generate_lesson_feedback(
+            lesson_id=lesson_id,
+            student_code=student_code,
+            student_output=reports[0]["student_output"],
+            expected_output=reports[0]["expected_output"],
+            lesson_data=lesson_data,
+        )
+
+    feedback_result["test_cases"] = reports
+    feedback_result["passed_cases"] = passed
+    feedback_result["total_cases"] = len(reports)
+    return feedback_result, 200
+
+
+def _case_report(case, index, student_cases, solution_result, lesson_messages):
+    """
+    Compare the student's run of one test case with its expected output
+
+    Returns:
+        dict: name, inputs, expected_output, student_output and passed, plus
+            error (and error_output) when the case crashed or was not run
+    """
+    expected_output = case["expected_output"]
+    if expected_output is None:
+        expected_output = solution_result["cases"][index]["stdout"]
+    expected_output = expected_output.strip()
+
+    report = {
+        "name": case["name"],
+        "inputs": case["inputs"],
+        "expected_output": expected_output,
+    }
+    if index >= len(student_cases):
+        # The run stopped early, e.g. on a MemoryError
+        report.update(passed=False, student_output="", error="Not run")
+        return report
+
+    student_case = student_cases[index]
+    student_output = student_case["stdout"].strip()
+    report.update(
+        passed=student_case["returncode"] == 0 and student_output == expected_output,
+        student_output=student_output,
+    )
+    if student_case["returncode"]:
+        report["error"] = _parse_python_error(
+            student_case["stderr"], lesson_messages
+        )["friendly_message"]
+        report["error_output"] = student_case["stderr"]
+    return report
+
+
+def _failed_case_feedback(lesson_id, student_code, lesson_data, first, passed, total):
+    """Feedback about the first failing test case, headed by a summary"""
+    feedback_result = _generate_lesson_feedback(
+        lesson_id=lesson_id,
+        student_code=student_code,
+        student_output=first["student_output"],
+        expected_output=first["expected_output"],
+        lesson_data=lesson_data,
+    )
+    if feedback_result["correct"]:
+        # Right output, but the case ended with an error
+        feedback_result.update(
+            correct=False,
+            message="📚 Not quite right, but you're learning!",
+            feedback="❌ Your output is right, but your code stopped with an error.",
+            hints=[],
+            diff=None,
+        )
+
+    inputs = ", ".join(repr(value) for value in first["inputs"]) or "none"
+    summary = f"🧪 Passed {passed} of {total} test cases. First failing case: {first['name']} (inputs: {inputs})"
+    if "error" in first:
+        summary += f"\n💥 {first['error']}"
+    feedback_result["feedback"] = f"{summary}\n{feedback_result['feedback']}"
+    return feedback_result
+
+
+def _generate_lesson_feedback(
+    lesson_id, student_code, student_output, expected_output, lesson_data
+):
+    """Generate educational feedback for lesson answers"""
+
+    # Check if outputs match exactly
+    outputs_match = student_output == expected_output
+
+    if outputs_match:
+        return {
+            "status": "success",
+            "correct": True,
+            "message": "🎉 Excellent work! Your solution is correct!",
             "feedback": _get_success_feedback(lesson_id, student_code),
             "student_output": student_output,
             "expected_output": expected_output,
@@ -444,33 +1151,19 @@ def _generate_lesson_feedback(
         }
 
     # Generate specific feedback for incorrect solutions
-    feedback_parts = []
-    hints = []
-
-    # Analyze what went wrong
     if not student_output:
-        feedback_parts.append("❌ Your code didn't produce any output.")
-        hints.append("Make sure you're using print() statements to display messages.")
-    elif "quit" not in student_code.lower():
-        feedback_parts.append("🔍 I don't see any code that handles the 'quit' input.")
-        hints.append(
-            "Remember to use input() to get the user's choice and check if they typed 'quit'."
-        )
-    elif "input(" not in student_code:
-        feedback_parts.append(
-            "📝 Your code is missing the input() function to get user input."
-        )
-        hints.append("You need to ask the user what they want to do using input().")
-    elif "if" not in student_code:
-        feedback_parts.append(
-            "🤔 You need to use an if statement to check what the user typed."
-        )
-        hints.append("Use 'if choice == \"quit\":' to check if they want to quit.")
+        feedback_parts = ["❌ Your code didn't produce any output."]
+        hints = ["Make sure you're using print() statements to display messages."]
+        diff = None
     else:
-        feedback_parts.append(
-            "🎯 Your code structure looks good, but the output doesn't match exactly."
+        diff, feedback_parts, hints = feedback_cache.feedback(
+            lesson_id, student_output, expected_output
         )
-        hints.append("Compare your output with the expected output below.")
+        feedback_parts = list(feedback_parts)
+        hints = list(hints)
+        code_hint = _get_code_hint(student_code)
+        if code_hint:
+            hints.append(code_hint)
 
     feedback_message = "\n".join(feedback_parts)
 
@@ -482,9 +1175,22 @@ def _generate_lesson_feedback(
         "student_output": student_output,
         "expected_output": expected_output,
         "hints": hints,
+        "diff": diff,
     }
 
 
+def _get_code_hint(student_code):
+    """Hint about a construct the lesson programs need but the code lacks"""
+    found = {match.group() for match in _CODE_FEATURES.finditer(student_code.lower())}
+    if "quit" not in found:
+        return "Remember to use input() to get the user's choice and check if they typed 'quit'."
+    if "input(" not in found:
+        return "You need to ask the user what they want to do using input()."
+    if "if" not in found:
+        return "Use 'if choice == \"quit\":' to check if they want to quit."
+    return None
+
+
 def _get_success_feedback(lesson_id, student_code):
     """Get encouraging feedback for correct solutions"""
     if lesson_id == "01":
@@ -540,125 +1246,18 @@ def test_connection():
         )
 
 
-def _parse_python_error(error_output):
+def _parse_python_error(error_output, lesson_messages=None):
     """
     Parse Python error output to provide user-friendly error information
 
     Args:
         error_output (str): Raw error output from Python
+        lesson_messages (dict): The lesson's error_messages.json overrides
 
     Returns:
         dict: Parsed error information with type, message, line, and suggestions
     """
-    if not error_output:
-        return {
-            "type": "unknown_error",
-            "message": "Unknown error occurred",
-            "friendly_message": "Something went wrong, but we're not sure what.",
-            "suggestion": "Check your code for any obvious issues and try again.",
-        }
-
-    error_lower = error_output.lower()
-    lines = error_output.strip().split("\n")
-
-    # Extract line number if present
-    line_number = None
-    for line in lines:
-        if "line" in line.lower() and any(char.isdigit() for char in line):
-            # Try to extract line number
-            import re
-
-            match = re.search(r"line (\d+)", line.lower())
-            if match:
-                line_number = int(match.group(1))
-                break
-
-    # Determine error type and provide friendly messages
-    if "syntaxerror" in error_lower:
-        return {
-            "type": "syntax_error",
-            "message": "Syntax Error: There's a problem with your Python syntax",
-            "line": line_number,
-            "friendly_message": "🔧 Your code has a syntax error - Python can't understand what you wrote.",
-            "suggestion": "Check for missing colons (:), unmatched parentheses (), or incorrect indentation.",
-        }
-
-    elif "indentationerror" in error_lower:
-        return {
-            "type": "indentation_error",
-            "message": "Indentation Error: Your code indentation is incorrect",
-            "line": line_number,
-            "friendly_message": "📏 Python is very picky about spacing! Your indentation isn't quite right.",
-            "suggestion": "Make sure you use 4 spaces for each level of indentation, and be consistent.",
-        }
-
-    elif "nameerror" in error_lower:
-        # Extract variable name if possible
-        var_match = re.search(r"name '(\w+)' is not defined", error_output)
-        var_name = var_match.group(1) if var_match else "variable"
-
-        return {
-            "type": "name_error",
-            "message": f"Name Error: The {var_name} '{var_name}' is not defined",
-            "line": line_number,
-            "friendly_message": f"🔍 Python doesn't know what '{var_name}' is!",
-            "suggestion": f"Make sure you've defined '{var_name}' before using it, or check for typos.",
-        }
-
-    elif "typeerror" in error_lower:
-        return {
-            "type": "type_error",
-            "message": "Type Error: You're trying to use a value in the wrong way",
-            "line": line_number,
-            "friendly_message": "🔄 You're mixing up different types of data (like numbers and text).",
-            "suggestion": "Check that you're using the right type of data for what you're trying to do.",
-        }
-
-    elif "valueerror" in error_lower:
-        return {
-            "type": "value_error",
-            "message": "Value Error: The value you provided isn't valid for this operation",
-            "line": line_number,
-            "friendly_message": "⚠️ The value you're using isn't what Python expected.",
-            "suggestion": "Check the values you're passing to functions - they might be in the wrong format.",
-        }
-
-    elif "indexerror" in error_lower:
-        return {
-            "type": "index_error",
-            "message": "Index Error: You're trying to access an item that doesn't exist",
-            "line": line_number,
-            "friendly_message": "📋 You're trying to access an item in a list that doesn't exist!",
-            "suggestion": "Check that your list has enough items, or that your index number isn't too big.",
-        }
-
-    elif "keyerror" in error_lower:
-        return {
-            "type": "key_error",
-            "message": "Key Error: The dictionary key you're looking for doesn't exist",
-            "line": line_number,
-            "friendly_message": "🗝️ That key doesn't exist in your dictionary!",
-            "suggestion": "Check the spelling of your key, or use .get() method for safer access.",
-        }
-
-    elif "zerodivisionerror" in error_lower:
-        return {
-            "type": "zero_division_error",
-            "message": "Zero Division Error: You can't divide by zero",
-            "line": line_number,
-            "friendly_message": "🚫 Oops! You tried to divide by zero - that's mathematically impossible!",
-            "suggestion": "Check your math and make sure you're not dividing by zero.",
-        }
-
-    else:
-        # Generic runtime error
-        return {
-            "type": "runtime_error",
-            "message": "Runtime Error: Something went wrong while running your code",
-            "line": line_number,
-            "friendly_message": "⚡ Your code started running but hit a problem along the way.",
-            "suggestion": "Read the error message carefully - it often tells you exactly what went wrong!",
-        }
+    return parse_python_error(error_output, lesson_messages)
 
 
 def _validate_and_sanitize_code(code):
@@ -693,31 +1292,14 @@ def _validate_and_sanitize_code(code):
             "error_type": "input_error",
         }
 
-    # Security checks - block dangerous operations
-    dangerous_patterns = [
-        (r'\bopen\s*\(.*,\s*["\']w', "File writing operations are not allowed"),
-        (r"\bexec\s*\(", "exec() function is not allowed"),
-        (r"\beval\s*\(", "eval() function is not allowed"),
-        (r"\b__import__\s*\(", "__import__ function is not allowed"),
-        (r"\bsubprocess\b", "subprocess module is not allowed"),
-        (r"\bos\.system", "os.system is not allowed"),
-        (r"\bos\.popen", "os.popen is not allowed"),
-        (r"\bos\.remove", "File deletion is not allowed"),
-        (r"\bos\.unlink", "File deletion is not allowed"),
-        (r"\bshutil\b", "shutil module is not allowed"),
-        (r"\bsocket\b", "socket module is not allowed"),
-        (r"\bhttp\b", "HTTP modules are not allowed"),
-        (r"\burllib\b", "urllib module is not allowed"),
-        (r"\brequests\b", "requests module is not allowed"),
-    ]
-
-    for pattern, message in dangerous_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            return {
-                "valid": False,
-                "message": f"Security violation: {message}",
-                "error_type": "security_error",
-            }
+    # Security checks - block dangerous operations (one cached AST pass)
+    verdict = code_validator.validate(code)
+    if not verdict["valid"]:
+        return {
+            "valid": False,
+            "message": f"Security violation: {verdict['message']}",
+            "error_type": "security_error",
+        }
 
     # Check for excessive complexity
     line_count = len(code.split("\n"))
@@ -728,7 +1310,12 @@ def _validate_and_sanitize_code(code):
             "error_type": "complexity_error",
         }
 
-    return {"valid": True, "sanitized_code": code}
+    return {
+        "valid": True,
+        "sanitized_code": code,
+        "bytecode": verdict["bytecode"],
+        "deterministic": verdict["deterministic"],
+    }
 
 
 def execute_python_code(code, timeout=None, data=None):
@@ -753,187 +1340,160 @@ def execute_python_code(code, timeout=None, data=None):
         timeout = app.config["EXECUTION_TIMEOUT"]
 
     # Validate and sanitize input
-    validation_result = _validate_and_sanitize_code(code)
+    validation_result = _validate_for_execution(code)
     if not validation_result["valid"]:
-        return {
-            "status": "error",
-            "message": validation_result["message"],
-            "error_type": validation_result["error_type"],
-        }
+        return validation_result["response"]
 
     # Use sanitized code
     code = validation_result["sanitized_code"]
+    bytecode = validation_result["bytecode"]
 
     # Initialize variables for input simulation (available in entire function scope)
     simulated_input = ""
     simulated_input_lines = []
 
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".py", delete=False
-        ) as temp_file:
-            temp_file.write(code)
-            temp_file_path = temp_file.name
-
-        start_time = time.time()
-
         # Handle user-provided inputs or use defaults for input() calls
-        user_inputs = data.get("user_inputs", []) if isinstance(data, dict) else []
-
-        if "input(" in code:
-            if user_inputs:
-                # Use user-provided inputs
-                simulated_input_lines = user_inputs
-                simulated_input = "\n".join(simulated_input_lines) + "\n"
-                logger.info(f"Using user-provided inputs: {simulated_input_lines}")
-            else:
-                # Fall back to default simulated inputs
-                simulated_input_lines = ["quit", "test", "hello"]  # Default inputs
-                simulated_input = "\n".join(simulated_input_lines) + "\n"
-                logger.info(f"Using default simulated inputs: {simulated_input_lines}")
-
-        # Execute code with enhanced sandboxing
+        simulated_input_lines = _get_simulated_inputs(code, data)
+        simulated_input = "".join(line + "\n" for line in simulated_input_lines)
+        logger.info(f"Using simulated inputs: {simulated_input_lines}")
+
+        # Deterministic programs are answered from earlier identical runs
+        cache_key = None
+        if validation_result["deterministic"]:
+            cache_key = result_cache.make_key(code, simulated_input_lines, timeout)
+        cached = result_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            logger.info("Serving cached execution result")
+            cached["cached"] = True
+            return cached
+
+        logger.info(f"Executing code in sandboxed environment (timeout: {timeout}s)")
         try:
-            # Create safe environment variables
-            safe_env = {
-                "PYTHONPATH": "",
-                "PATH": "/usr/bin:/bin",  # Minimal PATH
-                "HOME": tempfile.gettempdir(),
-                "TMPDIR": tempfile.gettempdir(),
-                "PYTHONDONTWRITEBYTECODE": "1",  # Don't create .pyc files
-                "PYTHONIOENCODING": "utf-8",
-            }
+            with admission_controller.admit(*_run_scheduling.get()):
+                result = _run_sandboxed(code, simulated_input, timeout, bytecode)
+        except AdmissionRejected as e:
+            logger.warning(f"Execution shed ({e.reason}), retry after {e.retry_after}s")
+            EXECUTION_OUTCOMES.inc(outcome="shed")
+            return _server_busy(e.retry_after)
 
-            # Prepare subprocess arguments with security options
-            subprocess_args = {
-                "args": [
-                    sys.executable,
-                    "-W",
-                    "ignore",
-                    "-u",
-                    temp_file_path,
-                ],  # -u for unbuffered output
-                "input": simulated_input,
-                "capture_output": True,
-                "text": True,
-                "timeout": timeout,
-                "cwd": tempfile.gettempdir(),
-                "env": safe_env,
-            }
+        response = _run_response(result, timeout, simulated_input_lines)
+        _cache_response(cache_key, result, response)
+        return response
 
-            # Add platform-specific security measures
-            if hasattr(subprocess, "STARTUPINFO") and os.name == "nt":
-                # Windows: Create new console
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-                subprocess_args["startupinfo"] = startupinfo
-            elif os.name == "posix":
-                # Unix/Linux: Additional security with resource limits
-                def preexec_fn():
-                    os.setpgrp()  # Create new process group
-                    try:
-                        import resource
-
-                        # Limit memory to 128MB
-                        resource.setrlimit(
-                            resource.RLIMIT_AS, (128 * 1024 * 1024, 128 * 1024 * 1024)
-                        )
-                        # Limit CPU time to timeout + 2 seconds
-                        resource.setrlimit(
-                            resource.RLIMIT_CPU, (timeout + 2, timeout + 2)
-                        )
-                        # Limit file size to 1MB
-                        resource.setrlimit(
-                            resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024)
-                        )
-                        # Limit number of processes
-                        resource.setrlimit(resource.RLIMIT_NPROC, (10, 10))
-                    except ImportError:
-                        logger.warning(
-                            "Resource module not available - basic sandboxing only"
-                        )
-                    except Exception as e:
-                        logger.warning(f"Could not set resource limits: {e}")
-
-                subprocess_args["preexec_fn"] = preexec_fn
-
-            logger.info(
-                f"Executing code in sandboxed environment (timeout: {timeout}s)"
-            )
-            result = subprocess.run(**subprocess_args)
+    except Exception as e:
+        logger.error(f"System error during code execution: {e}")
+        EXECUTION_OUTCOMES.inc(outcome="system_error")
+        return {
+            "status": "error",
+            "message": f"System error: {str(e)}",
+            "error_type": "system_error",
+            "error_details": str(e),
+        }
 
-            execution_time = time.time() - start_time
 
-            # Clean up temp file
-            try:
-                os.unlink(temp_file_path)
-            except OSError:
-                pass
-
-            # Process results
-            stdout = result.stdout
-            stderr = result.stderr
-
-            # Limit output length
-            if len(stdout) > app.config["MAX_OUTPUT_LENGTH"]:
-                stdout = (
-                    stdout[: app.config["MAX_OUTPUT_LENGTH"]]
-                    + "\n... (output truncated)"
-                )
+def _run_response(result, timeout, simulated_input_lines):
+    """Shape a sandboxed run into the execute_python_code payload"""
+    execution_time = result["execution_time"]
 
-            if result.returncode == 0:
-                response = {
-                    "status": "success",
-                    "message": "Code executed successfully",
-                    "output": stdout,
-                    "execution_time": f"{execution_time:.3f}s",
-                    "step": "Step 11: UI Layout Modernization",
-                }
+    if result["timed_out"]:
+        EXECUTION_OUTCOMES.inc(outcome="timeout")
+        return {
+            "status": "error",
+            "message": f"Code execution timed out after {timeout} seconds",
+            "timeout": timeout,
+            "execution_time": f"{execution_time:.3f}s",
+            "resources": _resources(result["usage"], execution_time),
+            "error_type": "timeout_error",
+        }
 
-                # Add input simulation info if applicable
-                if simulated_input_lines:
-                    response["simulated_input"] = simulated_input_lines
-                    response["input_note"] = (
-                        f"📝 Simulated user input: {', '.join(repr(inp) for inp in simulated_input_lines)}"
-                    )
+    stdout = result["stdout"]
+    EXECUTION_OUTCOMES.inc(outcome=_classify_outcome(result))
 
-                return response
-            else:
-                # Parse different types of errors for better user experience
-                error_info = _parse_python_error(stderr)
+    if result["truncated"]:
+        # Stopped once it printed MAX_OUTPUT_LENGTH bytes
+        response = _output_limit_response(app.config["MAX_OUTPUT_LENGTH"])
+        response["output"] = stdout + "\n... (output truncated)"
+    elif result["returncode"] == 0:
+        response = {
+            "status": "success",
+            "message": "Code executed successfully",
+            "output": stdout,
+            "step": "Step 11: UI Layout Modernization",
+        }
+        _add_input_note(response, simulated_input_lines)
+    else:
+        response = _error_response(result["stderr"])
+        response["output"] = stdout if stdout else None
+    response["execution_time"] = f"{execution_time:.3f}s"
+    response["resources"] = _resources(result["usage"], execution_time)
+    return response
+
+
+def _cache_response(cache_key, result, response):
+    """Keep a deterministic run's response for identical later runs"""
+    if cache_key is None:
+        return
+    # Timeouts, truncation and resource-limit failures depend on machine
+    # load, not on the program
+    if result["timed_out"] or _classify_outcome(result) not in ("success", "error"):
+        return
+    if _OBJECT_ADDRESS_PATTERN.search(result["stdout"]) or (
+        _OBJECT_ADDRESS_PATTERN.search(result["stderr"])
+    ):
+        return
+    result_cache.put(cache_key, response)
 
-                return {
-                    "status": "error",
-                    "message": error_info["message"],
-                    "error_output": stderr,
-                    "output": stdout if stdout else None,
-                    "execution_time": f"{execution_time:.3f}s",
-                    "error_type": error_info["type"],
-                    "error_line": error_info.get("line"),
-                    "friendly_message": error_info["friendly_message"],
-                    "suggestion": error_info["suggestion"],
-                }
 
-        except subprocess.TimeoutExpired:
-            # Clean up temp file
-            try:
-                os.unlink(temp_file_path)
-            except OSError:
-                pass
+def _execute_test_cases(code, input_vectors, timeout=None):
+    """
+    Execute code once per input vector, all in one sandboxed process
 
-            execution_time = time.time() - start_time
-            return {
-                "status": "error",
-                "message": f"Code execution timed out after {timeout} seconds",
-                "timeout": timeout,
-                "execution_time": f"{execution_time:.3f}s",
-                "error_type": "timeout_error",
-            }
+    Args:
+        code (str): Python code to execute
+        input_vectors (list): One list of input() lines per case
+        timeout (int): Timeout in seconds for all cases together
+
+    Returns:
+        dict: "status" success with "cases" (returncode, stdout, stderr per
+            case run) and "execution_time", or an execute_python_code-style
+            error payload
+    """
+    if not app.config["ENABLE_CODE_EXECUTION"]:
+        return {
+            "status": "error",
+            "message": "Code execution is disabled",
+            "error_type": "system_error",
+        }
+
+    if timeout is None:
+        timeout = app.config["EXECUTION_TIMEOUT"]
+
+    validation_result = _validate_for_execution(code)
+    if not validation_result["valid"]:
+        return validation_result["response"]
+    code = validation_result["sanitized_code"]
+
+    stdin_texts = [
+        "\n".join(inputs) + "\n" if inputs else "" for inputs in input_vectors
+    ]
+
+    try:
+        try:
+            with admission_controller.admit(*_run_scheduling.get()):
+                result = _run_sandboxed_cases(
+                    code, stdin_texts, timeout, validation_result["bytecode"]
+                )
+        except AdmissionRejected as e:
+            logger.warning(f"Execution shed ({e.reason}), retry after {e.retry_after}s")
+            EXECUTION_OUTCOMES.inc(outcome="shed")
+            return _server_busy(e.retry_after)
+
+        return _test_cases_result(result, timeout)
 
     except Exception as e:
-        logger.error(f"System error during code execution: {e}")
+        logger.error(f"System error during test case execution: {e}")
+        EXECUTION_OUTCOMES.inc(outcome="system_error")
         return {
             "status": "error",
             "message": f"System error: {str(e)}",
@@ -942,6 +1502,413 @@ def execute_python_code(code, timeout=None, data=None):
         }
 
 
+def _test_cases_result(result, timeout):
+    """Shape a sandboxed test case run into the _execute_test_cases payload"""
+    if result["timed_out"]:
+        EXECUTION_OUTCOMES.inc(outcome="timeout")
+        return {
+            "status": "error",
+            "message": f"Code execution timed out after {timeout} seconds",
+            "timeout": timeout,
+            "execution_time": f"{result['execution_time']:.3f}s",
+            "resources": _resources(result["usage"], result["execution_time"]),
+            "error_type": "timeout_error",
+        }
+
+    for case in result["cases"]:
+        EXECUTION_OUTCOMES.inc(outcome=_classify_outcome(case))
+        if case.pop("truncated"):
+            case["stdout"] += "\n... (output truncated)"
+
+    return {
+        "status": "success",
+        "cases": result["cases"],
+        "execution_time": f"{result['execution_time']:.3f}s",
+        "resources": _resources(result["usage"], result["execution_time"]),
+    }
+
+
+def _validate_for_execution(code):
+    """
+    Validate code before a run, counting rejections in the metrics
+
+    Returns:
+        dict: The validation result; when not valid, "response" holds the
+            error payload for the client
+    """
+    validation_result = _validate_and_sanitize_code(code)
+    if not validation_result["valid"]:
+        EXECUTION_OUTCOMES.inc(
+            outcome=(
+                "security_rejected"
+                if validation_result["error_type"] == "security_error"
+                else "rejected"
+            )
+        )
+        validation_result["response"] = {
+            "status": "error",
+            "message": validation_result["message"],
+            "error_type": validation_result["error_type"],
+        }
+    return validation_result
+
+
+def _add_input_note(response, simulated_input_lines):
+    """Add input simulation info to a successful run's response"""
+    if simulated_input_lines:
+        response["simulated_input"] = simulated_input_lines
+        response["input_note"] = (
+            f"📝 Simulated user input: {', '.join(repr(inp) for inp in simulated_input_lines)}"
+        )
+
+
+def _error_response(stderr):
+    """Response for a run that exited with an error, from its stderr"""
+    # Parse different types of errors for better user experience
+    error_info = _parse_python_error(stderr)
+
+    return {
+        "status": "error",
+        "message": error_info["message"],
+        "error_output": stderr,
+        "error_type": error_info["type"],
+        "error_line": error_info.get("line"),
+        "error_column": error_info.get("column"),
+        "friendly_message": error_info["friendly_message"],
+        "suggestion": error_info["suggestion"],
+    }
+
+
+def _output_limit_response(max_output):
+    """Error payload for a run stopped for printing more than max_output"""
+    return {
+        "status": "error",
+        "message": f"Output limit exceeded: your program was stopped after printing {max_output} characters",
+        "error_type": "output_limit_error",
+        "friendly_message": "📜 Your program printed too much, so it was stopped early.",
+        "suggestion": "Check for loops that never end or print more than you meant to.",
+    }
+
+
+def _classify_outcome(result):
+    """Outcome label for a finished (not timed out) run, for metrics"""
+    if result.get("truncated"):
+        return "output_limit"
+    if result["returncode"] == 0:
+        return "success"
+    if "MemoryError" in result["stderr"]:
+        return "memory"
+    if result["returncode"] is not None and result["returncode"] < 0:
+        # Killed by a signal, e.g. SIGXCPU from RLIMIT_CPU
+        return "killed"
+    return "error"
+
+
+def _resources(usage, execution_time):
+    """
+    Numeric resource use of a run, for API responses
+
+    Returns:
+        dict: wall_seconds, plus cpu_user_seconds, cpu_system_seconds,
+            peak_rss_bytes, stdout_bytes and stderr_bytes when measured
+    """
+    resources = {
+        key: round(value, 6) if isinstance(value, float) else value
+        for key, value in (usage or {}).items()
+    }
+    resources["wall_seconds"] = round(execution_time, 6)
+    return resources
+
+
+def _record_usage(usage, mode):
+    """Add a run's measured resource use to the metrics"""
+    if not usage:
+        return
+    SANDBOX_CPU_SECONDS.observe(
+        usage["cpu_user_seconds"] + usage["cpu_system_seconds"], mode=mode
+    )
+    SANDBOX_PEAK_RSS_BYTES.observe(usage["peak_rss_bytes"], mode=mode)
+    SANDBOX_OUTPUT_BYTES.inc(usage["stdout_bytes"], stream="stdout")
+    SANDBOX_OUTPUT_BYTES.inc(usage["stderr_bytes"], stream="stderr")
+
+
+def _combine_usage(usages):
+    """Usage of several one-shot runs together, or None if any is unknown"""
+    if not usages or any(usage is None for usage in usages):
+        return None
+    combined = {
+        key: sum(usage[key] for usage in usages)
+        for key in ("cpu_user_seconds", "cpu_system_seconds", "stdout_bytes", "stderr_bytes")
+    }
+    combined["peak_rss_bytes"] = max(usage["peak_rss_bytes"] for usage in usages)
+    return combined
+
+
+def _validate_user_inputs(data):
+    """
+    Check a request's user_inputs: a list of strings, MAX_INPUT_LENGTH
+    characters at most in total
+
+    Returns:
+        dict: The error payload for the client, or None if they are fine
+    """
+    user_inputs = data.get("user_inputs", [])
+    if not isinstance(user_inputs, list) or not all(
+        isinstance(line, str) for line in user_inputs
+    ):
+        return {
+            "status": "error",
+            "message": "user_inputs must be a list of strings",
+            "error_type": "input_error",
+        }
+    max_length = app.config["MAX_INPUT_LENGTH"]
+    if sum(len(line) + 1 for line in user_inputs) > max_length:
+        return {
+            "status": "error",
+            "message": f"Input too long. Maximum {max_length} characters allowed.",
+            "error_type": "input_error",
+        }
+    return None
+
+
+def _get_simulated_inputs(code, data=None):
+    """
+    Get the lines fed to input() calls for a run
+
+    Args:
+        code (str): Python code to execute
+        data (dict): Request data, optionally with 'user_inputs'
+
+    Returns:
+        list: User-provided inputs, the defaults, or [] if code reads no input
+    """
+    if "input(" not in code:
+        return []
+
+    user_inputs = data.get("user_inputs", []) if isinstance(data, dict) else []
+    return user_inputs or DEFAULT_SIMULATED_INPUTS
+
+
+def _get_sandbox_pool():
+    """
+    Get this process's warm sandbox pool, or None when pooling is off
+
+    With SANDBOX_FORKSERVER_ENABLED this is a ForkServer, which runs the
+    same way but forks a fresh sandbox per run.
+    """
+    global _sandbox_pool
+
+    if not app.config["SANDBOX_POOL_ENABLED"] or os.name != "posix":
+        return None
+
+    with _sandbox_pool_lock:
+        # A forked gunicorn worker must not share its parent's worker pipes
+        if _sandbox_pool is not None and _sandbox_pool.pid == os.getpid():
+            return _sandbox_pool
+        if app.config["SANDBOX_FORKSERVER_ENABLED"]:
+            uid, gid = app.config["SANDBOX_UID"], app.config["SANDBOX_GID"]
+            _sandbox_pool = ForkServer(
+                preload=app.config["SANDBOX_PRELOAD_MODULES"],
+                memory_limit_mb=app.config["SANDBOX_MEMORY_LIMIT_MB"],
+                max_timeout=app.config["EXECUTION_TIMEOUT"],
+                max_output=app.config["MAX_OUTPUT_LENGTH"],
+                uid=uid if uid >= 0 else None,
+                gid=gid if gid >= 0 else None,
+                cgroups=sandbox_cgroups,
+            )
+            description = "sandbox fork server"
+        else:
+            _sandbox_pool = SandboxPool(
+                size=app.config["SANDBOX_POOL_SIZE"],
+                max_runs_per_worker=app.config["SANDBOX_MAX_RUNS_PER_WORKER"],
+                memory_limit_mb=app.config["SANDBOX_MEMORY_LIMIT_MB"],
+                max_timeout=app.config["EXECUTION_TIMEOUT"],
+                max_output=app.config["MAX_OUTPUT_LENGTH"],
+                cgroups=sandbox_cgroups,
+            )
+            description = f"sandbox pool (size: {app.config['SANDBOX_POOL_SIZE']})"
+        _sandbox_pool.spawn_observer = SANDBOX_SPAWN_SECONDS.observe
+        _sandbox_pool.prestart()
+        logger.info(f"Started {description}")
+        return _sandbox_pool
+
+
+def _run_sandboxed(code, simulated_input, timeout, bytecode=None):
+    """
+    Run code in a warm pooled sandbox, falling back to a one-shot process
+
+    bytecode is the validator's compiled code; pooled workers run it
+    instead of compiling the source again.
+
+    Returns:
+        dict: returncode, stdout, stderr, truncated, timed_out, usage and
+            execution_time
+    """
+    pool = _get_sandbox_pool()
+    if pool is not None:
+        try:
+            result = pool.run(code, simulated_input, timeout, bytecode)
+            SANDBOX_EXECUTION_SECONDS.observe(result["execution_time"], mode="pool")
+            _record_usage(result["usage"], "pool")
+            return result
+        except SandboxError as e:
+            logger.warning(f"Sandbox pool unavailable, using one-shot process: {e}")
+
+    result = _run_in_subprocess(code, simulated_input, timeout)
+    SANDBOX_EXECUTION_SECONDS.observe(result["execution_time"], mode="subprocess")
+    _record_usage(result["usage"], "subprocess")
+    return result
+
+
+def _run_sandboxed_cases(code, stdin_texts, timeout, bytecode=None):
+    """
+    Run code once per stdin text in one pooled sandbox, falling back to a
+    one-shot process per case
+
+    Returns:
+        dict: cases (returncode, stdout, stderr, truncated per case run),
+            timed_out, usage and execution_time
+    """
+    pool = _get_sandbox_pool()
+    if pool is not None:
+        try:
+            result = pool.run(code, "", timeout, bytecode, cases=stdin_texts)
+            SANDBOX_EXECUTION_SECONDS.observe(result["execution_time"], mode="pool")
+            _record_usage(result["usage"], "pool")
+            return result
+        except SandboxError as e:
+            logger.warning(f"Sandbox pool unavailable, using one-shot process: {e}")
+
+    start_time = time.time()
+    cases = []
+    usages = []
+    for stdin_text in stdin_texts:
+        remaining = max(1, int(timeout - (time.time() - start_time)))
+        result = _run_in_subprocess(code, stdin_text, remaining)
+        SANDBOX_EXECUTION_SECONDS.observe(result["execution_time"], mode="subprocess")
+        _record_usage(result["usage"], "subprocess")
+        usages.append(result["usage"])
+        if result["timed_out"]:
+            return {
+                "cases": [],
+                "timed_out": True,
+                "usage": None,
+                "execution_time": time.time() - start_time,
+            }
+        cases.append(
+            {
+                "returncode": result["returncode"],
+                "stdout": result["stdout"],
+                "stderr": result["stderr"],
+                "truncated": result["truncated"],
+            }
+        )
+    return {
+        "cases": cases,
+        "timed_out": False,
+        "usage": _combine_usage(usages),
+        "execution_time": time.time() - start_time,
+    }
+
+
+def _run_in_subprocess(code, simulated_input, timeout):
+    """
+    Run code in a freshly started interpreter (one process per run)
+
+    Output is read into fixed-size buffers and the process is killed once
+    it prints more than MAX_OUTPUT_LENGTH bytes to either stream. With
+    sandbox_cgroups the process runs in a cgroup of its own, which also
+    supplies its CPU time and peak memory.
+    """
+    start_time = time.time()
+    subprocess_args, cgroup = _one_shot_options(timeout)
+
+    # The code goes over a pipe; wait4() reports the child's own CPU time
+    # and peak RSS
+    try:
+        with start_one_shot(code, **subprocess_args) as process:
+            output = capture_output(
+                process, simulated_input, timeout, app.config["MAX_OUTPUT_LENGTH"]
+            )
+    except BaseException:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+    result = _one_shot_result(process, output)
+    result["execution_time"] = time.time() - start_time
+    if cgroup is not None:
+        apply_cgroup_accounting(result, cgroup)
+    return result
+
+
+def _one_shot_options(timeout):
+    """
+    start_one_shot() arguments for a run, with the platform's security options
+
+    Returns:
+        tuple: (keyword arguments, the run's cgroup or None)
+    """
+    cgroup = None
+    subprocess_args = {
+        "stdin": subprocess.PIPE,
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "cwd": tempfile.gettempdir(),
+        "env": sandbox_env(),
+    }
+
+    # Add platform-specific security measures
+    if hasattr(subprocess, "STARTUPINFO") and os.name == "nt":
+        # Windows: Create new console
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        startupinfo.wShowWindow = subprocess.SW_HIDE
+        subprocess_args["startupinfo"] = startupinfo
+    elif os.name == "posix":
+        # Unix/Linux: own process group and resource limits, applied by the
+        # child itself so that no preexec_fn forces a full fork
+        subprocess_args["limits"] = {
+            "memory_limit_mb": app.config["SANDBOX_MEMORY_LIMIT_MB"],
+            # Limit CPU time to timeout + 2 seconds
+            "cpu_hard_limit": timeout + 2,
+        }
+        if sandbox_cgroups is not None:
+            try:
+                cgroup = sandbox_cgroups.create()
+            except OSError as e:
+                logger.warning(f"Could not create sandbox cgroup, using rlimits: {e}")
+            subprocess_args["cgroup"] = cgroup
+    return subprocess_args, cgroup
+
+
+def _one_shot_result(process, output):
+    """The run result for a reaped one-shot process and its captured output"""
+    if output["timed_out"]:
+        return {
+            "returncode": None,
+            "stdout": "",
+            "stderr": "",
+            "truncated": False,
+            "timed_out": True,
+            "usage": None,
+        }
+    usage = process.usage
+    if usage is not None:
+        usage = dict(
+            usage,
+            stdout_bytes=output["stdout_bytes"],
+            stderr_bytes=output["stderr_bytes"],
+        )
+    return {
+        "returncode": process.returncode,
+        "stdout": output["stdout"],
+        "stderr": output["stderr"],
+        "truncated": output["truncated"],
+        "timed_out": False,
+        "usage": usage,
+    }
+
+
 @app.route("/api/run-code", methods=["POST"])
 def run_code():
     """
@@ -975,38 +1942,312 @@ def run_code():
 
         # Get JSON data
         data = request.get_json()
-        if not data:
+        return _json_response(*_run_code(data))
+
+    except Exception as e:
+        logger.error(f"Unexpected error in run_code endpoint: {e}")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": "Internal server error",
+                    "error_type": "system_error",
+                }
+            ),
+            500,
+        )
+
+
+def _run_code(data):
+    """
+    Execute the code in a /api/run-code request
+
+    Args:
+        data (dict): Request data with 'code' and optional 'user_inputs'
+
+    Returns:
+        tuple: (response payload, HTTP status)
+    """
+    if not data:
+        return {
+            "status": "error",
+            "message": "No JSON data provided",
+            "error_type": "input_error",
+        }, 400
+
+    input_error = _validate_user_inputs(data)
+    if input_error is not None:
+        return input_error, 400
+
+    code = data.get("code", "")
+
+    # Log code execution attempt (truncated for security)
+    code_preview = code[:100] + "..." if len(code) > 100 else code
+    logger.info(f"Executing code: {code_preview}")
+
+    # Execute the code with user inputs if provided
+    result = execute_python_code(code, data=data)
+
+    # Log result
+    logger.info(f"Code execution result: {result['status']}")
+
+    # Return appropriate HTTP status
+    if result["status"] == "success":
+        return result, 200
+    elif result.get("error_type") == "server_busy":
+        return result, 503
+    else:
+        return result, 400
+
+
+@app.route("/api/run-code/stream", methods=["POST"])
+def stream_run_code():
+    """
+    Execute Python code and stream its output as server-sent events
+    "stdout" and "stderr" events carry output as it is printed, then a
+    "result" event carries the run-code response (without the output
+    already sent) and time_to_first_byte. Shares the run-code rate limit.
+    """
+    try:
+        client_ip = _get_client_ip()
+        rate_check = _check_rate_limit(
+            client_ip, "run-code", max_requests=20, window_seconds=60
+        )
+
+        if not rate_check["allowed"]:
+            logger.warning(
+                f"Rate limit exceeded for IP {client_ip} on /api/run-code/stream"
+            )
             return (
                 jsonify(
                     {
                         "status": "error",
-                        "message": "No JSON data provided",
-                        "error_type": "input_error",
+                        "message": rate_check["message"],
+                        "error_type": "rate_limit_error",
+                        "retry_after": rate_check["retry_after"],
                     }
                 ),
-                400,
+                429,
             )
 
-        code = data.get("code", "")
+        data = request.get_json()
+        # Requests that cannot run are answered with plain JSON
+        if not data or not app.config["ENABLE_CODE_EXECUTION"]:
+            return _json_response(*_run_code(data))
+        if os.name != "posix":
+            return _json_response(
+                {
+                    "status": "error",
+                    "message": "Streaming runs are not supported on this server",
+                    "error_type": "system_error",
+                },
+                501,
+            )
+
+        input_error = _validate_user_inputs(data)
+        if input_error is not None:
+            return _json_response(input_error, 400)
+        validation_result = _validate_for_execution(data.get("code", ""))
+        if not validation_result["valid"]:
+            return _json_response(validation_result["response"], 400)
+        code = validation_result["sanitized_code"]
+
+        # The execution slot is taken before answering, so a busy server
+        # still gets a 503, and released when the stream ends or is dropped
+        slot = ExitStack()
+        try:
+            slot.enter_context(admission_controller.admit(*_run_scheduling.get()))
+        except AdmissionRejected as e:
+            logger.warning(f"Execution shed ({e.reason}), retry after {e.retry_after}s")
+            EXECUTION_OUTCOMES.inc(outcome="shed")
+            return _json_response(_server_busy(e.retry_after), 503)
+
+        logger.info(f"Streaming code execution from {client_ip}")
+        response = Response(
+            _stream_run_events(code, _get_simulated_inputs(code, data), slot),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        response.call_on_close(slot.close)
+        return response
+
+    except Exception as e:
+        logger.error(f"Unexpected error in stream_run_code endpoint: {e}")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": "Internal server error",
+                    "error_type": "system_error",
+                }
+            ),
+            500,
+        )
+
+
+def _stream_run_events(code, simulated_input_lines, slot):
+    """
+    Run code in a StreamingRun and yield its output as server-sent events
+
+    Only stderr is kept, for the error report; stdout goes straight to the
+    client and the run is killed once MAX_OUTPUT_LENGTH is exceeded.
+    """
+    simulated_input = ""
+    if simulated_input_lines:
+        simulated_input = "\n".join(simulated_input_lines) + "\n"
+
+    timeout = app.config["EXECUTION_TIMEOUT"]
+    run = StreamingRun(
+        code,
+        simulated_input,
+        timeout=timeout,
+        max_output=app.config["MAX_OUTPUT_LENGTH"],
+        memory_limit_mb=app.config["SANDBOX_MEMORY_LIMIT_MB"],
+        cgroups=sandbox_cgroups,
+    )
+    stderr_parts = []
+
+    try:
+        with slot, closing(iter(run)) as chunks:
+            for stream, text in chunks:
+                if stream == "stderr":
+                    stderr_parts.append(text)
+                yield _sse_event(stream, {"text": text})
+    except Exception as e:
+        logger.error(f"System error during streaming execution: {e}")
+        EXECUTION_OUTCOMES.inc(outcome="system_error")
+        yield _sse_event(
+            "result",
+            {
+                "status": "error",
+                "message": f"System error: {str(e)}",
+                "error_type": "system_error",
+            },
+        )
+        return
+
+    SANDBOX_EXECUTION_SECONDS.observe(run.execution_time, mode="stream")
+    _record_usage(run.usage, "stream")
+    yield _sse_event(
+        "result",
+        _streaming_result(run, "".join(stderr_parts), simulated_input_lines),
+    )
 
-        # Log code execution attempt (truncated for security)
-        code_preview = code[:100] + "..." if len(code) > 100 else code
-        logger.info(f"Executing code: {code_preview}")
 
-        # Execute the code with user inputs if provided
-        result = execute_python_code(code, data=data)
+def _streaming_result(run, stderr, simulated_input_lines):
+    """Final response of a streaming run, once its output has been sent"""
+    timing = {
+        "execution_time": f"{run.execution_time:.3f}s",
+        "time_to_first_byte": (
+            f"{run.time_to_first_byte:.3f}s"
+            if run.time_to_first_byte is not None
+            else None
+        ),
+        "resources": _resources(run.usage, run.execution_time),
+    }
+
+    if run.timed_out:
+        EXECUTION_OUTCOMES.inc(outcome="timeout")
+        return {
+            "status": "error",
+            "message": f"Code execution timed out after {run.timeout} seconds",
+            "timeout": run.timeout,
+            "error_type": "timeout_error",
+            **timing,
+        }
 
-        # Log result
-        logger.info(f"Code execution result: {result['status']}")
+    if run.truncated:
+        EXECUTION_OUTCOMES.inc(outcome="output_limit")
+        return dict(_output_limit_response(run.max_output), **timing)
 
-        # Return appropriate HTTP status
-        if result["status"] == "success":
-            return jsonify(result)
-        else:
-            return jsonify(result), 400
+    EXECUTION_OUTCOMES.inc(
+        outcome=_classify_outcome({"returncode": run.returncode, "stderr": stderr})
+    )
+    if run.returncode == 0:
+        response = {
+            "status": "success",
+            "message": "Code executed successfully",
+            **timing,
+        }
+        _add_input_note(response, simulated_input_lines)
+        return response
+
+    response = _error_response(stderr)
+    response.update(timing)
+    return response
+
+
+def _submit_job(kind, func, *args):
+    """Queue a job and answer 202 with the URLs to follow it"""
+    try:
+        # The job is admitted for the client and priority of this request
+        job = job_store.submit(kind, contextvars.copy_context().run, func, *args)
+    except JobQueueFull as e:
+        logger.warning(f"Job queue full, retry after {e.retry_after}s")
+        EXECUTION_OUTCOMES.inc(outcome="shed")
+        return _json_response(_server_busy(e.retry_after), 503)
+
+    logger.info(f"Queued {kind} job {job.job_id}")
+    return _json_response(
+        {
+            "status": "success",
+            "job_id": job.job_id,
+            "job_status": job.status,
+            "poll_url": f"/api/jobs/{job.job_id}",
+            "events_url": f"/api/jobs/{job.job_id}/events",
+        },
+        202,
+    )
+
+
+def _job_not_found(job_id):
+    return (
+        jsonify(
+            {
+                "status": "error",
+                "message": f"Job {job_id} not found or expired",
+                "error_type": "job_not_found",
+            }
+        ),
+        404,
+    )
+
+
+@app.route("/api/jobs/run-code", methods=["POST"])
+def submit_run_code_job():
+    """
+    Queue a /api/run-code execution and return a job id immediately
+    Shares the run-code rate limit with the synchronous endpoint
+    """
+    try:
+        client_ip = _get_client_ip()
+        rate_check = _check_rate_limit(
+            client_ip, "run-code", max_requests=20, window_seconds=60
+        )
+
+        if not rate_check["allowed"]:
+            logger.warning(
+                f"Rate limit exceeded for IP {client_ip} on /api/jobs/run-code"
+            )
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": rate_check["message"],
+                        "error_type": "rate_limit_error",
+                        "retry_after": rate_check["retry_after"],
+                    }
+                ),
+                429,
+            )
+
+        data = request.get_json()
+        if not data:
+            return _json_response(*_run_code(data))
+        return _submit_job("run-code", _run_code, data)
 
     except Exception as e:
-        logger.error(f"Unexpected error in run_code endpoint: {e}")
+        logger.error(f"Unexpected error submitting run-code job: {e}")
         return (
             jsonify(
                 {
@@ -1019,6 +2260,94 @@ def run_code():
         )
 
 
+@app.route("/api/jobs/lesson/<lesson_id>/check", methods=["POST"])
+def submit_check_job(lesson_id):
+    """
+    Queue a /lesson/<id>/check and return a job id immediately
+    Shares the lesson-check rate limit with the synchronous endpoint
+    """
+    try:
+        client_ip = _get_client_ip()
+        rate_check = _check_rate_limit(
+            client_ip, "lesson-check", max_requests=15, window_seconds=60
+        )
+
+        if not rate_check["allowed"]:
+            logger.warning(
+                f"Rate limit exceeded for IP {client_ip} on /api/jobs/lesson/{lesson_id}/check"
+            )
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": rate_check["message"],
+                        "error_type": "rate_limit_error",
+                        "retry_after": rate_check["retry_after"],
+                    }
+                ),
+                429,
+            )
+
+        data = request.get_json()
+        # Bad input and unknown lessons are answered without queueing
+        if not data or "code" not in data or lesson_catalog.get(lesson_id) is None:
+            return _json_response(*_check_answer(lesson_id, data))
+        return _submit_job("lesson-check", _check_answer, lesson_id, data)
+
+    except Exception as e:
+        logger.error(f"❌ Error submitting check job for lesson {lesson_id}: {str(e)}")
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": f"Error checking answer: {str(e)}",
+                    "error_type": "server_error",
+                }
+            ),
+            500,
+        )
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Poll a job; once job_status is "done", result holds the response"""
+    job = job_store.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+
+    return jsonify({"status": "success", **job.to_dict()})
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    """
+    Server-sent events for a job: a "status" event, then one "result"
+    event when it finishes. Keeps a web worker busy while the job runs,
+    so polling is preferred with synchronous gunicorn workers.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+
+    def generate():
+        yield _sse_event("status", {"job_id": job.job_id, "job_status": job.status})
+        while not job.wait(app.config["JOB_EVENTS_KEEPALIVE"]):
+            # Comment line keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+        yield _sse_event("result", job.to_dict())
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event, payload):
+    """Format one server-sent event with a JSON data line"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -0,0 +1,86 @@
+"""
+Expected-output cache for lesson solutions
+Avoids re-running a lesson's solution on every answer check
+"""
+
+import hashlib
+import os
+import threading
+
+
+class SolutionOutputCache:
+    """
+    Execution results of lesson solutions
+
+    Entries are keyed by lesson id, a hash of the solution source and the
+    simulated input vector, so a result is only reused for the exact program
+    and inputs that produced it. When a solution file's mtime changes, every
+    entry for that lesson is dropped.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(lesson_id, solution_code, simulated_inputs):
+        """Build the cache key for a solution run"""
+        code_hash = hashlib.sha256(solution_code.encode("utf-8")).hexdigest()
+        return (lesson_id, code_hash, tuple(simulated_inputs))
+
+    def get(self, key, solution_path=None):
+        """
+        Look up a cached result
+
+        Args:
+            key (tuple): Key from make_key()
+            solution_path (str): Solution file, checked for mtime changes
+
+        Returns:
+            dict: The cached execution result, or None on a miss
+        """
+        with self._lock:
+            self._check_mtime(key[0], solution_path)
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key, result, solution_path=None):
+        """Store a successful solution result"""
+        with self._lock:
+            self._check_mtime(key[0], solution_path)
+            self._entries[key] = dict(result)
+
+    def invalidate(self, lesson_id=None):
+        """Drop cached results for one lesson, or for all lessons"""
+        with self._lock:
+            if lesson_id is None:
+                self._entries.clear()
+                self._mtimes.clear()
+            else:
+                self._drop_lesson(lesson_id)
+                self._mtimes.pop(lesson_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_mtime(self, lesson_id, solution_path):
+        if not solution_path:
+            return
+        try:
+            mtime = os.stat(solution_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._mtimes.get(lesson_id) != mtime:
+            self._drop_lesson(lesson_id)
+            self._mtimes[lesson_id] = mtime
+
+    def _drop_lesson(self, lesson_id):
+        for key in [key for key in self._entries if key[0] == lesson_id]:
+            del self._entries[key]
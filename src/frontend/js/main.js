@@ -6,6 +6,7 @@
 // Use modular API and Progress systems
 const API_BASE_URL = window.BhodiAPI ? window.BhodiAPI.API_BASE_URL : 'http://localhost:5000';
 const ENVIRONMENT = window.BhodiAPI ? window.BhodiAPI.ENVIRONMENT : { isDevelopment: true };
+const getSessionHeaders = window.BhodiAPI ? window.BhodiAPI.getSessionHeaders : () => ({});
 
 // Progress shortcuts - use functions from modules when available
 const getUserProgress = () => window.BhodiProgress ? window.BhodiProgress.userProgress : userProgress;
@@ -722,6 +723,7 @@ print(f"🗣️ Button Response: {result}")
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                ...getSessionHeaders(),
             },
             body: JSON.stringify({ code: buttonCode })
         });
@@ -1569,6 +1571,7 @@ async function handleRunCode() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                ...getSessionHeaders(),
             },
             body: JSON.stringify(requestBody)
         });
@@ -1819,6 +1822,7 @@ async function handleCheckAnswer() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                ...getSessionHeaders(),
             },
             body: JSON.stringify({
                 code: studentCode
@@ -2101,6 +2105,7 @@ async function executeCodeWithInputs(code, userInputs) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                ...getSessionHeaders(),
             },
             body: JSON.stringify(requestBody)
         });
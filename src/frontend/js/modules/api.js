@@ -49,6 +49,27 @@ window.BhodiAPI = (function() {
     console.log(`🔗 API URL: ${API_BASE_URL}`);
     console.log(`🏠 Hostname: ${ENVIRONMENT.hostname}`);
 
+    /**
+     * Headers identifying this browser tab's session, so the backend can
+     * share execution fairly between students behind the same IP address
+     */
+    const SESSION_STORAGE_KEY = 'bhodi_session_id';
+
+    function getSessionHeaders() {
+        let sessionId = null;
+        try {
+            sessionId = sessionStorage.getItem(SESSION_STORAGE_KEY);
+            if (!sessionId) {
+                sessionId = crypto.randomUUID();
+                sessionStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+            }
+        } catch (error) {
+            // Storage or crypto unavailable: the backend falls back to the IP
+            return {};
+        }
+        return { 'X-Session-Id': sessionId };
+    }
+
     /**
      * Test backend connection
      */
@@ -84,6 +105,7 @@ window.BhodiAPI = (function() {
         ENVIRONMENT,
         API_BASE_URL,
         getApiBaseUrl,
+        getSessionHeaders,
         testBackendConnection
     };
 })();
\ No newline at end of file
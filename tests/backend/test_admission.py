@@ -0,0 +1,360 @@
+"""
+Admission control tests for the Bhodi Learning Platform backend.
+
+Tests the concurrency cap, the bounded wait queue, fair dispatch between
+clients and 503 load shedding.
+"""
+import pytest
+import json
+import sys
+import os
+import threading
+import time
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from admission import PRIORITY_WEIGHTS, AdmissionController, AdmissionRejected
+from flask_testing import TestCase
+
+
+def _hold_slot(controller, release):
+    """Occupy an execution slot until release is set."""
+    with controller.admit():
+        release.wait(5)
+
+
+def _start_holder(controller):
+    """Occupy a slot on a thread; returns the thread and its release event."""
+    release = threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(controller, release))
+    holder.start()
+    while controller.running == 0:
+        time.sleep(0.001)
+    return holder, release
+
+
+def _queue_run(controller, order, client, priority='run', session=None):
+    """Queue a run on a thread that records client (or session) when admitted."""
+    waiting = controller.waiting
+
+    def run():
+        with controller.admit(client, priority, session):
+            order.append(client if session is None else session)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    while controller.waiting == waiting:
+        time.sleep(0.001)
+    return thread
+
+
+class TestAdmissionController:
+    """Test the admission controller on its own."""
+
+    def test_admits_up_to_max_concurrent(self):
+        """Test that runs under the cap are admitted immediately."""
+        controller = AdmissionController(max_concurrent=2, max_queue=0)
+
+        with controller.admit():
+            with controller.admit():
+                assert controller.running == 2
+
+        assert controller.running == 0
+
+    def test_rejects_immediately_when_queue_full(self):
+        """Test fast shedding once the queue has no room."""
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        release = threading.Event()
+        holder = threading.Thread(target=_hold_slot, args=(controller, release))
+        holder.start()
+        while controller.running == 0:
+            time.sleep(0.001)
+
+        start = time.monotonic()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit():
+                pass
+        release.set()
+        holder.join()
+
+        assert excinfo.value.reason == 'queue_full'
+        assert excinfo.value.retry_after >= 1
+        assert time.monotonic() - start < 0.5
+
+    def test_queued_run_admitted_when_slot_frees(self):
+        """Test that a waiting run proceeds once a slot is released."""
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        release = threading.Event()
+        holder = threading.Thread(target=_hold_slot, args=(controller, release))
+        holder.start()
+        while controller.running == 0:
+            time.sleep(0.001)
+
+        threading.Timer(0.05, release.set).start()
+        with controller.admit():
+            admitted = True
+        holder.join()
+
+        assert admitted
+        assert controller.rejected == {'queue_full': 0, 'client_queue_full': 0,
+                                       'queue_timeout': 0}
+
+    def test_queue_deadline(self):
+        """Test that a run waiting past queue_timeout is rejected."""
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        release = threading.Event()
+        holder = threading.Thread(target=_hold_slot, args=(controller, release))
+        holder.start()
+        while controller.running == 0:
+            time.sleep(0.001)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit():
+                pass
+        release.set()
+        holder.join()
+
+        assert excinfo.value.reason == 'queue_timeout'
+        assert controller.waiting == 0
+
+    def test_clients_take_turns(self):
+        """Test that a client with many queued runs alternates with others."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [_queue_run(controller, order, 'noisy') for _ in range(3)]
+        threads.append(_queue_run(controller, order, 'quiet'))
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert order == ['noisy', 'quiet', 'noisy', 'noisy']
+
+    def test_new_sessions_do_not_add_to_client_share(self):
+        """Test that a client sending each run as a new session still takes turns."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [_queue_run(controller, order, 'noisy', session=f'noisy-{n}')
+                   for n in range(3)]
+        threads.append(_queue_run(controller, order, 'quiet', session='quiet'))
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert order == ['noisy-0', 'quiet', 'noisy-1', 'noisy-2']
+
+    def test_sessions_take_turns_within_client(self):
+        """Test that sessions of one client share out its turns."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [_queue_run(controller, order, 'school', session='busy') for _ in range(3)]
+        threads.append(_queue_run(controller, order, 'school', session='calm'))
+        threads.append(_queue_run(controller, order, 'other'))
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert order == ['busy', 'other', 'calm', 'busy', 'busy']
+
+    def test_client_queue_cap_covers_all_sessions(self):
+        """Test that new session ids do not get a client more room in the queue."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5,
+                                         max_client_queue=2)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [_queue_run(controller, order, 'noisy', session=f'noisy-{n}')
+                   for n in range(2)]
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit('noisy', session='noisy-2'):
+                pass
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert excinfo.value.reason == 'client_queue_full'
+
+    def test_check_dispatched_before_run(self):
+        """Test that a later lesson check overtakes a waiting ad-hoc run."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [
+            _queue_run(controller, order, 'runner', 'run'),
+            _queue_run(controller, order, 'checker', 'check'),
+        ]
+        assert controller.waiting_by_priority() == {'check': 1, 'run': 1, 'batch': 0}
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert order == ['checker', 'runner']
+
+    def test_client_queue_limit(self):
+        """Test that one client cannot fill the whole wait queue."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8,
+                                         queue_timeout=5, max_client_queue=1)
+        holder, release = _start_holder(controller)
+
+        order = []
+        threads = [_queue_run(controller, order, 'noisy')]
+        with pytest.raises(AdmissionRejected) as excinfo:
+            with controller.admit('noisy'):
+                pass
+        threads.append(_queue_run(controller, order, 'quiet'))
+        release.set()
+        for thread in [holder] + threads:
+            thread.join()
+
+        assert excinfo.value.reason == 'client_queue_full'
+        assert controller.rejected['client_queue_full'] == 1
+        assert sorted(order) == ['noisy', 'quiet']
+
+    def test_wait_observer(self):
+        """Test that wait time is reported per priority class."""
+        controller = AdmissionController(max_concurrent=1, max_queue=8, queue_timeout=5)
+        waits = []
+        controller.wait_observer = lambda priority, seconds: waits.append((priority, seconds))
+        holder, release = _start_holder(controller)
+
+        thread = _queue_run(controller, [], 'student', 'check')
+        time.sleep(0.05)
+        release.set()
+        holder.join()
+        thread.join()
+
+        assert waits[0] == ('run', 0.0)
+        assert waits[1][0] == 'check'
+        assert waits[1][1] >= 0.05
+
+    def test_unknown_priority(self):
+        """Test that only the known priority classes are accepted."""
+        controller = AdmissionController()
+
+        with pytest.raises(ValueError):
+            with controller.admit('student', 'urgent'):
+                pass
+        assert set(PRIORITY_WEIGHTS) == {'check', 'run', 'batch'}
+        assert controller.running == 0
+
+
+class AdmissionEndpointTestCase(TestCase):
+    """Test 503 responses from the execution endpoints."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        self.original_controller = server.admission_controller
+        server.admission_controller = AdmissionController(max_concurrent=1, max_queue=0)
+        self.release = threading.Event()
+        self.holder = threading.Thread(target=_hold_slot,
+                                       args=(server.admission_controller, self.release))
+        self.holder.start()
+        while server.admission_controller.running == 0:
+            time.sleep(0.001)
+
+    def tearDown(self):
+        self.release.set()
+        self.holder.join()
+        server.admission_controller = self.original_controller
+
+    def test_run_code_returns_503_with_retry_after(self):
+        """Test that a shed run gets 503 and a Retry-After header."""
+        response = self.client.post('/api/run-code',
+                                  data=json.dumps({'code': 'print(1)'}),
+                                  content_type='application/json',
+                                  headers={'X-Forwarded-For': '10.7.0.1'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        data = json.loads(response.data)
+        self.assertEqual(data['error_type'], 'server_busy')
+
+    def test_lesson_check_returns_503(self):
+        """Test that checks are shed the same way."""
+        response = self.client.post('/lesson/01/check',
+                                  data=json.dumps({'code': 'print(1)'}),
+                                  content_type='application/json',
+                                  headers={'X-Forwarded-For': '10.7.0.2'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+class RecordingController(AdmissionController):
+    """Admission controller that records who each run was admitted for."""
+
+    def __init__(self):
+        super().__init__(max_concurrent=2, max_queue=8)
+        self.admitted = []
+
+    def admit(self, client=None, priority='run', session=None):
+        self.admitted.append((client, priority, session))
+        return super().admit(client, priority, session)
+
+
+class SchedulingEndpointTestCase(TestCase):
+    """Test the client and priority runs are admitted for."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        self.original_controller = server.admission_controller
+        server.admission_controller = RecordingController()
+        server.result_cache.clear()
+
+    def tearDown(self):
+        server.admission_controller = self.original_controller
+
+    def test_run_code_scheduled_per_ip_and_session(self):
+        """Test that runs are admitted for their IP, split by session."""
+        for session_id in ('tab-one-1234', 'tab-two-5678'):
+            self.client.post('/api/run-code',
+                             data=json.dumps({'code': f'print("{session_id}")'}),
+                             content_type='application/json',
+                             headers={'X-Forwarded-For': '10.7.1.1',
+                                      'X-Session-Id': session_id})
+
+        self.assertEqual(server.admission_controller.admitted, [
+            ('10.7.1.1', 'run', 'tab-one-1234'),
+            ('10.7.1.1', 'run', 'tab-two-5678'),
+        ])
+
+    def test_invalid_session_id_falls_back_to_ip(self):
+        """Test that a malformed session header is ignored."""
+        self.client.post('/api/run-code',
+                         data=json.dumps({'code': 'print("fair")'}),
+                         content_type='application/json',
+                         headers={'X-Forwarded-For': '10.7.1.2',
+                                  'X-Session-Id': 'x' * 100})
+
+        self.assertEqual(server.admission_controller.admitted, [('10.7.1.2', 'run', None)])
+
+    def test_lesson_check_scheduled_as_check(self):
+        """Test that the student's run in a check gets the check priority."""
+        response = self.client.post('/lesson/01/check',
+                                    data=json.dumps({'code': 'print("fair check")'}),
+                                    content_type='application/json',
+                                    headers={'X-Forwarded-For': '10.7.1.3'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(('10.7.1.3', 'check', None), server.admission_controller.admitted)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -155,6 +155,40 @@ print("🔄 Game continues whether you like it or not!")
         self.assertIn('friendly_message', data)
         self.assertIn('suggestion', data)
     
+    def test_code_execution_output_limit(self):
+        """Test that a runaway print loop is stopped at MAX_OUTPUT_LENGTH."""
+        response = self.client.post('/api/run-code',
+                                  data=json.dumps({'code': 'while True: print("spam")'}),
+                                  content_type='application/json',
+                                  headers={'X-Forwarded-For': '10.0.20.1'})
+
+        data = json.loads(response.data)
+        self.assertEqual(data['error_type'], 'output_limit_error')
+        self.assertTrue(data['output'].endswith('... (output truncated)'))
+        self.assertGreater(data['resources']['stdout_bytes'], app.config['MAX_OUTPUT_LENGTH'])
+        self.assertLess(data['resources']['wall_seconds'], app.config['EXECUTION_TIMEOUT'])
+    
+    def test_code_execution_input_too_long(self):
+        """Test that user_inputs beyond MAX_INPUT_LENGTH are rejected."""
+        line = 'x' * app.config['MAX_INPUT_LENGTH']
+        response = self.client.post('/api/run-code',
+                                  data=json.dumps({'code': 'print(input())',
+                                                   'user_inputs': [line]}),
+                                  content_type='application/json',
+                                  headers={'X-Forwarded-For': '10.0.20.2'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error_type'], 'input_error')
+
+        response = self.client.post('/api/run-code',
+                                  data=json.dumps({'code': 'print(input())',
+                                                   'user_inputs': 'Alice'}),
+                                  content_type='application/json',
+                                  headers={'X-Forwarded-For': '10.0.20.3'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error_type'], 'input_error')
+    
     def test_cors_preflight(self):
         """Test CORS preflight requests."""
         response = self.client.options('/api/run-code')
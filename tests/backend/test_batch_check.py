@@ -0,0 +1,104 @@
+"""
+Batch check tests for the Bhodi Learning Platform backend.
+
+Tests grading many submissions for a lesson in one streamed request.
+"""
+import pytest
+import json
+import sys
+import os
+from unittest import mock
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from rate_limiter import RateLimiter
+from flask_testing import TestCase
+
+
+class BatchCheckTestCase(TestCase):
+    """Test the /lesson/<id>/check-batch endpoint."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def _batch(self, submissions, lesson_id='01', client='10.0.12.1'):
+        return self.client.post(f'/lesson/{lesson_id}/check-batch',
+                              data=json.dumps({'submissions': submissions}),
+                              content_type='application/json',
+                              headers={'X-Forwarded-For': client})
+
+    def _lines(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_grades_every_submission(self):
+        """Test one NDJSON line per submission plus a summary line."""
+        solution = server._load_lesson_data('01')['_solution']
+        response = self._batch([
+            {'id': 'ada', 'code': solution},
+            {'id': 'bob', 'code': 'print("wrong")'},
+            {'id': 'cy', 'code': ''},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = self._lines(response)
+        results = {line['id']: line for line in lines[:-1]}
+
+        self.assertTrue(results['ada']['result']['correct'])
+        self.assertFalse(results['bob']['result']['correct'])
+        self.assertEqual(results['cy']['result_status'], 400)
+        self.assertEqual(lines[-1], {'summary': True, 'total': 3, 'correct': 1})
+
+    def test_solution_runs_once_per_batch(self):
+        """Test that the expected output is fetched once, not per submission."""
+        with mock.patch.object(server, '_get_solution_result',
+                               wraps=server._get_solution_result) as get_solution:
+            response = self._batch([{'code': 'print(1)'}, {'code': 'print(2)'}],
+                                   client='10.0.12.2')
+            self._lines(response)
+
+        self.assertEqual(get_solution.call_count, 1)
+
+    def test_rejects_bad_batches(self):
+        """Test empty, oversized and unknown-lesson batches."""
+        response = self._batch([], client='10.0.12.3')
+        self.assertEqual(response.status_code, 400)
+
+        too_many = [{'code': 'print(1)'}] * (app.config['BATCH_CHECK_MAX_SUBMISSIONS'] + 1)
+        response = self._batch(too_many, client='10.0.12.3')
+        self.assertEqual(response.status_code, 400)
+
+        response = self._batch([{'code': 'print(1)'}], lesson_id='99', client='10.0.12.3')
+        self.assertEqual(response.status_code, 404)
+
+
+    def test_each_submission_is_charged(self):
+        """Test that submissions past the per-minute budget are not run."""
+        original = server.rate_limiter, app.config['BATCH_CHECK_SUBMISSIONS_PER_MINUTE']
+        server.rate_limiter = RateLimiter()
+        app.config['BATCH_CHECK_SUBMISSIONS_PER_MINUTE'] = 2
+        try:
+            with mock.patch.object(server, '_grade_submission',
+                                   wraps=server._grade_submission) as grade:
+                response = self._batch([{'id': n, 'code': 'print(1)'} for n in range(3)],
+                                       client='10.0.12.4')
+                lines = self._lines(response)
+                rejected = self._batch([{'code': 'print(1)'}], client='10.0.12.4')
+        finally:
+            server.rate_limiter, app.config['BATCH_CHECK_SUBMISSIONS_PER_MINUTE'] = original
+
+        self.assertEqual(grade.call_count, 2)
+        statuses = {line['id']: line['result_status'] for line in lines[:-1]}
+        self.assertEqual(statuses, {0: 200, 1: 200, 2: 429})
+        self.assertEqual(lines[2]['result']['error_type'], 'rate_limit_error')
+        self.assertEqual(lines[-1]['total'], 3)
+        self.assertEqual(rejected.status_code, 429)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,89 @@
+"""
+Test case grading tests for the Bhodi Learning Platform backend.
+
+Tests lessons that are checked against several input vectors.
+"""
+import pytest
+import json
+import sys
+import os
+from unittest import mock
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from flask_testing import TestCase
+
+
+class TestCaseGradingTestCase(TestCase):
+    """Test /lesson/<id>/check for a lesson with test_cases.json."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def _check(self, code, client):
+        response = self.client.post('/lesson/02/check',
+                                    data=json.dumps({'code': code}),
+                                    content_type='application/json',
+                                    headers={'X-Forwarded-For': client})
+        return json.loads(response.data)
+
+    def _solution(self):
+        return server._load_lesson_data('02')['_solution']
+
+    def test_solution_passes_every_case(self):
+        """Test that the reference solution passes all branches."""
+        data = self._check(self._solution(), '10.0.13.1')
+
+        self.assertTrue(data['correct'])
+        self.assertEqual(data['passed_cases'], data['total_cases'])
+        self.assertGreater(data['total_cases'], 1)
+
+    def test_missing_branch_fails_its_case(self):
+        """Test that a branch the default inputs never reach is still graded."""
+        code = self._solution().replace('elif choice == "exit":', 'elif choice == "leave":')
+        data = self._check(code, '10.0.13.2')
+
+        self.assertFalse(data['correct'])
+        failed = [case['name'] for case in data['test_cases'] if not case['passed']]
+        self.assertEqual(failed, ['types exit'])
+        self.assertIn('types exit', data['feedback'])
+
+    def test_all_cases_run_in_one_sandbox_call(self):
+        """Test that the student's cases are run by one sandbox request."""
+        self._check(self._solution(), '10.0.13.3')  # Warm the solution cache
+        with mock.patch.object(server, '_run_sandboxed_cases',
+                               wraps=server._run_sandboxed_cases) as run:
+            self._check(self._solution() + '\n# edited', '10.0.13.3')
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(len(run.call_args[0][1]), 5)
+
+    def test_crash_on_every_case_is_an_execution_error(self):
+        """Test that code failing on all inputs gets the usual error response."""
+        data = self._check('print(1 / 0)', '10.0.13.4')
+
+        self.assertEqual(data['error_type'], 'execution_error')
+        self.assertIn('ZeroDivisionError', data['feedback'])
+
+
+    def test_crash_after_right_output_fails(self):
+        """Test that a case with the expected output but a nonzero exit fails."""
+        code = self._solution() + '\nif choice == "play":\n    raise ValueError("boom")'
+        data = self._check(code, '10.0.13.5')
+
+        self.assertFalse(data['correct'])
+        self.assertNotIn('Excellent', data['message'])
+        failed = [case for case in data['test_cases'] if not case['passed']]
+        self.assertEqual([case['name'] for case in failed], ['keeps playing'])
+        self.assertEqual(failed[0]['student_output'], failed[0]['expected_output'])
+        self.assertIn('keeps playing', data['feedback'])
+        self.assertIn('stopped with an error', data['feedback'])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,224 @@
+"""
+Cgroup v2 sandboxing tests for the Bhodi Learning Platform backend.
+
+Tests per-sandbox cgroups against a directory laid out like a delegated
+cgroup v2 subtree, so they run without cgroup v2; the real kernel limits
+are tested only when BHODI_TEST_CGROUP_ROOT names a usable directory.
+"""
+import pytest
+import subprocess
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from runner import cgroups
+from runner.cgroups import SandboxCgroup, SandboxCgroups
+from runner.safe_runner import (
+    OOM_KILLED_MESSAGE, ForkServer, SandboxPool, StreamingRun, apply_cgroup_accounting,
+    sandbox_env, start_one_shot,
+)
+
+LIMITS = {'memory_limit_mb': 128, 'cpu_hard_limit': 7}
+
+RLIMITS_CODE = (
+    'import resource\n'
+    'print(resource.getrlimit(resource.RLIMIT_AS)[0], resource.getrlimit(resource.RLIMIT_CPU)[0])'
+)
+
+
+@pytest.fixture
+def cgroup_root(tmp_path, monkeypatch):
+    """A directory with the files of a delegated cgroup v2 subtree."""
+    (tmp_path / 'cgroup.controllers').write_text('cpuset cpu io memory pids\n')
+    (tmp_path / 'cgroup.subtree_control').write_text('\n')
+    # Files in the fake cgroups keep rmdir from ever succeeding
+    monkeypatch.setattr(cgroups, 'REMOVE_TIMEOUT', 0)
+    return tmp_path
+
+
+def _procs(cgroup_root):
+    """Pids written to the cgroup.procs files of the sandbox cgroups."""
+    return [
+        int(path.read_text())
+        for path in cgroup_root.glob('sandbox-*/cgroup.procs')
+    ]
+
+
+class TestSandboxCgroups:
+    """Test creating and reading sandbox cgroups."""
+
+    def test_open_enables_controllers_and_total_limits(self, cgroup_root):
+        """Test that open() prepares the directory for sandbox cgroups."""
+        sandbox_cgroups = SandboxCgroups.open(str(cgroup_root), total_memory_mb=512,
+                                              total_cpu_limit=0.5)
+
+        assert sandbox_cgroups is not None
+        assert (cgroup_root / 'cgroup.subtree_control').read_text() == '+cpu +memory +pids'
+        assert (cgroup_root / 'memory.max').read_text() == str(512 * 1024 * 1024)
+        assert (cgroup_root / 'cpu.max').read_text() == '50000 100000'
+
+    def test_open_falls_back_without_controllers(self, cgroup_root):
+        """Test that a directory missing a controller is not used."""
+        (cgroup_root / 'cgroup.controllers').write_text('cpu memory\n')
+
+        assert SandboxCgroups.open(str(cgroup_root)) is None
+        assert SandboxCgroups.open(str(cgroup_root / 'missing')) is None
+
+    def test_create_sets_limits(self, cgroup_root):
+        """Test the per-sandbox memory.max, cpu.max and pids.max."""
+        sandbox_cgroups = SandboxCgroups(str(cgroup_root), memory_limit_mb=64,
+                                         cpu_limit=1.5, pids_limit=4)
+
+        first = sandbox_cgroups.create()
+        second = sandbox_cgroups.create()
+
+        assert first.path != second.path
+        assert open(os.path.join(first.path, 'memory.max')).read() == str(64 * 1024 * 1024)
+        assert open(os.path.join(first.path, 'cpu.max')).read() == '150000 100000'
+        assert open(os.path.join(first.path, 'pids.max')).read() == '4'
+        assert open(os.path.join(first.path, 'memory.swap.max')).read() == '0'
+
+    def test_usage_from_cpu_stat_and_memory_peak(self, tmp_path):
+        """Test that CPU time and peak memory are read back."""
+        (tmp_path / 'cpu.stat').write_text(
+            'usage_usec 350000\nuser_usec 250000\nsystem_usec 100000\n')
+        (tmp_path / 'memory.peak').write_text('31457280\n')
+        (tmp_path / 'memory.events').write_text('low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n')
+        cgroup = SandboxCgroup(str(tmp_path))
+
+        assert cgroup.usage() == {
+            'cpu_user_seconds': 0.25,
+            'cpu_system_seconds': 0.1,
+            'peak_rss_bytes': 31457280,
+        }
+        assert cgroup.oom_killed() is True
+
+    def test_usage_without_statistics(self, tmp_path):
+        """Test that missing files (older kernels) leave usage alone."""
+        cgroup = SandboxCgroup(str(tmp_path))
+
+        assert cgroup.usage() == {}
+        assert cgroup.oom_killed() is False
+
+    def test_accounting_reports_oom_kill(self, tmp_path):
+        """Test that a run killed for memory.max gets a MemoryError."""
+        cgroup_dir = tmp_path / 'sandbox'
+        cgroup_dir.mkdir()
+        (cgroup_dir / 'memory.peak').write_text('134217728\n')
+        (cgroup_dir / 'memory.events').write_text('oom 1\noom_kill 1\n')
+        result = {'returncode': -9, 'stderr': '', 'timed_out': False,
+                  'usage': {'peak_rss_bytes': 1, 'stdout_bytes': 0}}
+
+        apply_cgroup_accounting(result, SandboxCgroup(str(cgroup_dir)))
+
+        assert result['stderr'] == OOM_KILLED_MESSAGE
+        assert result['usage'] == {'peak_rss_bytes': 134217728, 'stdout_bytes': 0}
+
+
+class TestSandboxesInCgroups:
+    """Test that each kind of sandbox joins its cgroup instead of some rlimits."""
+
+    def test_one_shot_joins_cgroup(self, cgroup_root):
+        """Test that a one-shot interpreter moves itself into its cgroup."""
+        cgroup = SandboxCgroups(str(cgroup_root)).create()
+
+        with start_one_shot(RLIMITS_CODE, limits=LIMITS, cgroup=cgroup,
+                            stdout=subprocess.PIPE, env=sandbox_env()) as process:
+            stdout, _ = process.communicate(timeout=10)
+
+        assert stdout.decode() == '-1 7\n'
+        assert _procs(cgroup_root) == [process.pid]
+
+    def test_one_shot_keeps_rlimits_without_cgroup(self):
+        """Test the rlimit fallback."""
+        with start_one_shot(RLIMITS_CODE, limits=LIMITS, stdout=subprocess.PIPE,
+                            env=sandbox_env()) as process:
+            stdout, _ = process.communicate(timeout=10)
+
+        assert stdout.decode() == f'{128 * 1024 * 1024} 7\n'
+
+    def test_streaming_run_joins_cgroup(self, cgroup_root):
+        """Test that a streaming run gets a cgroup of its own."""
+        run = StreamingRun(RLIMITS_CODE, timeout=5,
+                           cgroups=SandboxCgroups(str(cgroup_root)))
+
+        chunks = list(run)
+
+        assert chunks == [('stdout', '-1 7\n')]
+        assert len(_procs(cgroup_root)) == 1
+
+    def test_pool_worker_joins_cgroup(self, cgroup_root):
+        """Test that each pooled worker runs in a cgroup of its own."""
+        pool = SandboxPool(size=1, max_timeout=5, cgroups=SandboxCgroups(str(cgroup_root)))
+        try:
+            result = pool.run('import resource\nprint(resource.getrlimit(resource.RLIMIT_AS)[0])',
+                              '', 5)
+        finally:
+            pool.close()
+
+        assert result['stdout'] == '-1\n'
+        assert len(_procs(cgroup_root)) == 1
+
+    def test_forked_run_joins_cgroup(self, cgroup_root):
+        """Test that each forked run moves into a cgroup of its own."""
+        fork_server = ForkServer(max_timeout=5, cgroups=SandboxCgroups(str(cgroup_root)))
+        try:
+            results = [
+                fork_server.run('import os\nprint(os.getpid())', '', 5) for _ in range(2)
+            ]
+        finally:
+            fork_server.close()
+
+        pids = sorted(int(result['stdout']) for result in results)
+        assert sorted(_procs(cgroup_root)) == pids
+
+    def test_server_one_shot_run_uses_cgroups(self, cgroup_root, monkeypatch):
+        """Test that the server's one-shot runs get a cgroup when configured."""
+        monkeypatch.setattr(server, 'sandbox_cgroups', SandboxCgroups(str(cgroup_root)))
+
+        result = server._run_in_subprocess(RLIMITS_CODE, '', 5)
+
+        assert result['returncode'] == 0
+        assert result['stdout'] == '-1 7\n'
+        assert len(_procs(cgroup_root)) == 1
+
+
+@pytest.mark.skipif(not os.environ.get('BHODI_TEST_CGROUP_ROOT'),
+                    reason='needs a delegated cgroup v2 directory in BHODI_TEST_CGROUP_ROOT')
+class TestKernelCgroups:
+    """Test the limits as enforced by the kernel."""
+
+    @pytest.fixture
+    def sandbox_cgroups(self):
+        sandbox_cgroups = SandboxCgroups.open(os.environ['BHODI_TEST_CGROUP_ROOT'],
+                                              memory_limit_mb=64)
+        if sandbox_cgroups is None:
+            pytest.skip('BHODI_TEST_CGROUP_ROOT is not a usable cgroup v2 directory')
+        return sandbox_cgroups
+
+    def test_memory_max_stops_run(self, sandbox_cgroups):
+        """Test that exceeding memory.max is reported as a MemoryError."""
+        run = StreamingRun('data = bytearray(256 * 1024 * 1024)\ndata[::4096] = b"x" * 65536',
+                           timeout=10, cgroups=sandbox_cgroups)
+
+        chunks = list(run)
+
+        assert run.returncode == -9
+        assert ('stderr', OOM_KILLED_MESSAGE) in chunks
+
+    def test_usage_read_from_cgroup(self, sandbox_cgroups):
+        """Test that peak memory covers what the run allocated."""
+        run = StreamingRun('data = bytearray(32 * 1024 * 1024)', timeout=10,
+                           cgroups=sandbox_cgroups)
+
+        list(run)
+
+        assert run.returncode == 0
+        assert run.usage['peak_rss_bytes'] >= 32 * 1024 * 1024
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
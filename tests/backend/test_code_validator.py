@@ -0,0 +1,118 @@
+"""
+Code validation tests for the Bhodi Learning Platform backend.
+
+Tests the AST security checks and the verdict cache.
+"""
+import pytest
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from code_validator import CodeValidator, check_code
+
+
+class TestCheckCode:
+    """Test the security checks on a single submission."""
+
+    @pytest.mark.parametrize('code', [
+        'import subprocess',
+        'from urllib.request import urlopen',
+        'import http.client',
+        'exec("print(1)")',
+        'f = eval',
+        '__import__("os")',
+        'import os\nos.system("ls")',
+        'import os as o\no.popen("ls")',
+        'from os import remove',
+        'import os\ngetattr(os, "unlink")("x")',
+        'open("notes.txt", "w")',
+        'open("notes.txt", mode="a")',
+        '().__class__.__bases__[0].__subclasses__()',
+        # Built-ins reached through the builtins module or getattr()
+        'import builtins; builtins.__import__("subprocess").run(["echo", "PWNED"])',
+        'import builtins\nbuiltins.exec("print(1)")',
+        'import builtins\nbuiltins.eval("1 + 1")',
+        'import builtins\ngetattr(builtins, "exec")("print(1)")',
+        'import sys\nsys.modules["builtins"].exec("print(1)")',
+        'getattr(__spec__, "__import__")',
+        'from builtins import open',
+        # Writes through an open() that is not the bare built-in
+        'import io\nio.open("/tmp/x", "w")',
+        'from io import open',
+        'import codecs\ncodecs.open("/tmp/x", mode="w")',
+        'import os\nos.open("/tmp/x", os.O_WRONLY | os.O_CREAT)',
+        # Star imports bind the forbidden os functions as bare names
+        'from os import *\nsystem("echo PWNED")',
+    ])
+    def test_rejects_forbidden_code(self, code):
+        """Test that forbidden imports, calls and attributes are rejected."""
+        verdict = check_code(code)
+
+        assert verdict['valid'] is False
+        assert 'not allowed' in verdict['message']
+
+    @pytest.mark.parametrize('code', [
+        'print("visit http://example.com for requests")',
+        'requests = ["tea", "cake"]\nrequests.remove("tea")',
+        'open("notes.txt").read()',
+        'import re\npattern = re.compile(r"\\d+")',
+        'import re as regex\nregex.compile("quit").search("quit now")',
+        'choice = input("Quit? ")\nif choice == "quit":\n    print("Nope")',
+    ])
+    def test_allows_harmless_code(self, code):
+        """Test that names and strings that only look dangerous are allowed."""
+        verdict = check_code(code)
+
+        assert verdict['valid'] is True
+        assert verdict['bytecode'] is not None
+
+    def test_syntax_error_is_left_to_the_sandbox(self):
+        """Test that unparsable code passes so the run reports the error."""
+        verdict = check_code('print("hello"')
+
+        assert verdict['valid'] is True
+        assert verdict['bytecode'] is None
+
+    @pytest.mark.parametrize('code, deterministic', [
+        ('import math\nprint(math.sqrt(16))', True),
+        ('choice = input()\nprint(choice.upper())', True),
+        ('import random\nprint(random.randint(1, 6))', False),
+        ('from datetime import datetime\nprint(datetime.now())', False),
+        ('print(id(1))', False),
+        ('print({"a", "b"})', False),
+    ])
+    def test_determinism(self, code, deterministic):
+        """Test that programs using randomness, clocks or hashes are flagged."""
+        assert check_code(code)['deterministic'] is deterministic
+
+
+class TestCodeValidator:
+    """Test the verdict cache."""
+
+    def test_repeated_source_is_served_from_cache(self):
+        """Test that the same source is only parsed once."""
+        validator = CodeValidator()
+        first = validator.validate('print(1)')
+        second = validator.validate('print(1)')
+
+        assert first is second
+        assert validator.hits == 1
+        assert validator.misses == 1
+
+    def test_least_recent_verdict_is_evicted(self):
+        """Test that the cache never grows past max_entries."""
+        validator = CodeValidator(max_entries=2)
+        validator.validate('print(1)')
+        validator.validate('print(2)')
+        validator.validate('print(1)')
+        validator.validate('print(3)')
+
+        assert len(validator) == 2
+        validator.validate('print(1)')
+        assert validator.hits == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -6,11 +6,13 @@ Tests the educational error handling and parsing functionality.
 import pytest
 import sys
 import os
+import time
 
 # Add the backend to the Python path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
 
 from server import _parse_python_error
+from error_parser import parse_error_messages
 
 
 class TestErrorParsing:
@@ -221,6 +223,78 @@ NameError: name 'undefined_var' is not defined
             result = _parse_python_error(f'SyntaxError: test\n{error_text}')
             assert result['line'] == expected_line
 
+    def test_message_mentioning_other_error(self):
+        """Test that only the exception class decides the type."""
+        error_output = '''
+Traceback (most recent call last):
+  File "main.py", line 1, in <module>
+    check(value)
+TypeError: check() expected a ValueError subclass
+'''
+        result = _parse_python_error(error_output)
+
+        assert result['type'] == 'type_error'
+        assert result['exception'] == 'TypeError'
+
+    def test_column_and_code(self):
+        """Test that the caret under the failing line gives its column."""
+        error_output = '''
+Traceback (most recent call last):
+  File "main.py", line 3, in <module>
+    total = count + "1"
+            ~~~~~~^~~~~
+TypeError: unsupported operand type(s) for +: 'int' and 'str'
+'''
+        result = _parse_python_error(error_output)
+
+        assert result['line'] == 3
+        assert result['code'] == 'total = count + "1"'
+        assert result['column'] == 9
+
+    def test_innermost_student_frame(self):
+        """Test that library frames below the student's code are skipped."""
+        error_output = '''
+Traceback (most recent call last):
+  File "main.py", line 2, in <module>
+    json.loads("{")
+  File "/usr/lib/python3.11/json/__init__.py", line 346, in loads
+    return _default_decoder.decode(s)
+           ^^^^^^^^^^^^^^^^^^^^^^^^^^
+json.decoder.JSONDecodeError: Expecting property name: line 1 column 2 (char 1)
+'''
+        result = _parse_python_error(error_output)
+
+        assert result['exception'] == 'JSONDecodeError'
+        assert result['line'] == 2
+        assert result['code'] == 'json.loads("{")'
+        assert result['column'] is None
+
+    def test_lesson_messages(self):
+        """Test that a lesson's error_messages.json replaces the defaults."""
+        overrides = parse_error_messages(
+            '{"NameError": {"suggestion": "Did you spell choice the same both times?"}}')
+        result = _parse_python_error("NameError: name 'choise' is not defined", overrides)
+
+        assert result['suggestion'] == 'Did you spell choice the same both times?'
+        assert 'choise' in result['friendly_message']
+
+        with pytest.raises(ValueError):
+            parse_error_messages('{"NameError": {"type": "syntax_error"}}')
+
+    def test_large_stderr(self):
+        """Test that the cost doesn't grow with output before the traceback."""
+        noise = 'warning: something happened\n' * 200000
+        error_output = noise + '''Traceback (most recent call last):
+  File "main.py", line 1, in <module>
+    print(undefined)
+NameError: name 'undefined' is not defined
+'''
+        start = time.perf_counter()
+        for _ in range(100):
+            result = _parse_python_error(error_output)
+        assert time.perf_counter() - start < 0.5
+        assert result['type'] == 'name_error'
+
 
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
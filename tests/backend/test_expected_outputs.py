@@ -0,0 +1,121 @@
+"""
+Precomputed expected output tests for the Bhodi Learning Platform backend.
+
+Tests the deploy-time artifacts and serving checks without running solutions.
+"""
+import pytest
+import json
+import sys
+import os
+from unittest import mock
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+import build_expected_outputs
+from server import app
+from expected_outputs import ARTIFACT_FILE, ExpectedOutputs, build_artifact
+from lesson_catalog import LessonCatalog
+from rate_limiter import RateLimiter
+from flask_testing import TestCase
+
+
+def _make_lesson(base, files):
+    """Create lesson_01_test with the given files and load it."""
+    directory = base / 'lesson_01_test'
+    directory.mkdir(exist_ok=True)
+    for filename, content in files.items():
+        (directory / filename).write_text(content, encoding='utf-8')
+    return LessonCatalog(str(base)).load().get('01')
+
+
+class TestExpectedOutputs:
+    """Test building and reading the artifact."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a built artifact gives back each output by inputs."""
+        lesson = _make_lesson(tmp_path, {
+            'solution.py': 'print(input())',
+            'test_cases.json': '{"cases": [{"inputs": ["a"]}, {"inputs": ["b"]}]}',
+        })
+        artifact = ExpectedOutputs.parse(build_artifact(lesson, ['a\n', 'b\n']))
+
+        assert artifact.lookup('print(input())', ['b']) == 'b\n'
+        assert artifact.is_current(lesson)
+
+    def test_stale_after_solution_edit(self, tmp_path):
+        """Test that outputs are not served for a changed solution."""
+        lesson = _make_lesson(tmp_path, {'solution.py': 'print(1)'})
+        artifact = ExpectedOutputs.parse(build_artifact(lesson, ['1\n']))
+
+        assert artifact.lookup('print(2)', []) is None
+
+    def test_corrupt_output_is_rejected(self, tmp_path):
+        """Test that an output not matching its hash fails to parse."""
+        lesson = _make_lesson(tmp_path, {'solution.py': 'print(1)'})
+        data = json.loads(build_artifact(lesson, ['1\n']))
+        data['outputs'][0]['output'] = '2\n'
+
+        with pytest.raises(ValueError):
+            ExpectedOutputs.parse(json.dumps(data))
+
+    def test_build_cli_writes_and_checks(self, tmp_path):
+        """Test that the CLI writes artifacts the catalog then accepts."""
+        _make_lesson(tmp_path, {'solution.py': 'print("built")'})
+
+        assert build_expected_outputs.main(['--lessons', str(tmp_path), '--check']) == 1
+        assert build_expected_outputs.main(['--lessons', str(tmp_path)]) == 0
+        assert build_expected_outputs.main(['--lessons', str(tmp_path), '--check']) == 0
+
+        lesson = LessonCatalog(str(tmp_path)).load().get('01')
+        assert lesson.expected_outputs.lookup('print("built")', []) == 'built\n'
+        assert (tmp_path / 'lesson_01_test' / ARTIFACT_FILE).exists()
+
+
+class PrecomputedCheckTestCase(TestCase):
+    """Test that checks use the shipped artifacts."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        server.solution_cache.invalidate()
+        self.original_rate_limiter = server.rate_limiter
+        server.rate_limiter = RateLimiter()
+
+    def tearDown(self):
+        server.rate_limiter = self.original_rate_limiter
+
+    def _check(self):
+        return self.client.post('/lesson/01/check',
+                                data=json.dumps({'code': 'print("hi")'}),
+                                content_type='application/json')
+
+    def test_solution_is_never_executed(self):
+        """Test that only the student's code runs when an artifact exists."""
+        with mock.patch.object(server, '_execute_code_safely',
+                               wraps=server._execute_code_safely) as execute:
+            response = self._check()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(execute.call_count, 1)
+        self.assertIn('TRY NOT TO QUIT', json.loads(response.data)['expected_output'])
+
+    def test_missing_artifact_with_execution_disabled(self):
+        """Test that production refuses to run a solution with no artifact."""
+        app.config['SOLUTION_EXECUTION_ENABLED'] = False
+        try:
+            with mock.patch.object(server, '_get_precomputed_result', return_value=None):
+                response = self._check()
+        finally:
+            app.config['SOLUTION_EXECUTION_ENABLED'] = True
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(json.loads(response.data)['error_type'], 'solution_error')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
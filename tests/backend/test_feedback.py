@@ -0,0 +1,152 @@
+"""
+Answer feedback tests for the Bhodi Learning Platform backend.
+
+Tests the line diff of wrong outputs and the feedback built from it.
+"""
+import pytest
+import json
+import sys
+import os
+import time
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from feedback import FeedbackCache, MAX_REPORTED_LINES, describe_diff, diff_outputs
+from rate_limiter import RateLimiter
+from flask_testing import TestCase
+
+
+class TestDiffOutputs:
+    """Test the line diff."""
+
+    def test_first_divergent_line(self):
+        """Test that the first differing line is reported with both versions."""
+        diff = diff_outputs('a\nb\nc', 'a\nB\nc')
+
+        assert diff['first_difference'] == {'line': 2, 'expected': 'B', 'student': 'b'}
+        assert diff['missing_lines'] == ['B']
+        assert diff['extra_lines'] == ['b']
+        assert not diff['whitespace_only']
+
+    def test_missing_and_extra_lines(self):
+        """Test that a skipped line is missing and a moved line doesn't shift the rest."""
+        diff = diff_outputs('a\nc\nd', 'a\nb\nc\nd')
+        assert diff['missing_lines'] == ['b']
+        assert diff['extra_count'] == 0
+
+        diff = diff_outputs('a\nb\nc\nd', 'a\nc\nd')
+        assert diff['first_difference'] == {'line': 2, 'expected': 'c', 'student': 'b'}
+        assert diff['extra_lines'] == ['b']
+        assert diff['missing_count'] == 0
+
+    def test_output_stops_early(self):
+        """Test that a truncated output has no student line at the difference."""
+        diff = diff_outputs('a', 'a\nb')
+
+        assert diff['first_difference'] == {'line': 2, 'expected': 'b', 'student': None}
+        feedback_parts, _ = describe_diff(diff)
+        assert 'stops after line 1' in feedback_parts[0]
+
+    def test_whitespace_only(self):
+        """Test that spacing and blank-line differences are recognised."""
+        diff = diff_outputs('Hello  world\n\nBye', 'Hello world\nBye')
+
+        assert diff['whitespace_only']
+        feedback_parts, _ = describe_diff(diff)
+        assert 'spacing' in feedback_parts[0]
+
+    def test_identical(self):
+        """Test that equal outputs have no difference."""
+        diff = diff_outputs('a\nb', 'a\nb')
+
+        assert diff['first_difference'] is None
+        assert describe_diff(diff) == ([], [])
+
+    def test_reported_lines_are_capped(self):
+        """Test that long outputs report counts, not every line."""
+        diff = diff_outputs('', '\n'.join(str(n) for n in range(100)))
+
+        assert diff['missing_count'] == 100
+        assert len(diff['missing_lines']) == MAX_REPORTED_LINES
+
+    def test_linear_at_output_limit(self):
+        """Test that completely different outputs at the size limit diff quickly."""
+        student = '\n'.join(f's{n}' for n in range(5000))
+        expected = '\n'.join(f'e{n}' for n in range(5000))
+
+        start = time.perf_counter()
+        diff = diff_outputs(student, expected)
+        assert time.perf_counter() - start < 0.5
+        assert diff['missing_count'] == diff['extra_count'] == 5000
+
+
+class TestFeedbackCache:
+    """Test the feedback cache."""
+
+    def test_same_outputs_are_diffed_once(self):
+        """Test that a repeated wrong output is a cache hit."""
+        cache = FeedbackCache()
+        first = cache.feedback('01', 'a', 'b')
+        second = cache.feedback('01', 'a', 'b')
+
+        assert first is second
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_keyed_by_lesson(self):
+        """Test that another lesson gets its own entry."""
+        cache = FeedbackCache()
+        cache.feedback('01', 'a', 'b')
+        cache.feedback('02', 'a', 'b')
+
+        assert cache.misses == 2
+
+    def test_least_recent_is_evicted(self):
+        """Test that the cache stays within max_entries."""
+        cache = FeedbackCache(max_entries=2)
+        for output in ('a', 'b', 'c'):
+            cache.feedback('01', output, 'x')
+
+        assert len(cache) == 2
+        cache.feedback('01', 'a', 'x')
+        assert cache.misses == 4
+
+
+class FeedbackEndpointTestCase(TestCase):
+    """Test the feedback of lesson checks."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        self.original_rate_limiter = server.rate_limiter
+        server.rate_limiter = RateLimiter()
+
+    def tearDown(self):
+        server.rate_limiter = self.original_rate_limiter
+
+    def test_wrong_answer_gets_line_diff(self):
+        """Test that a wrong answer's response explains the differing line."""
+        code = ('print("🎮 Welcome to TRY NOT TO QUIT!")\n'
+                'print("Your mission: Find a way to exit this program.")\n'
+                'choice = input()\n'
+                'if choice == "quit":\n'
+                '    print("no")\n')
+        response = self.client.post('/lesson/01/check',
+                                    data=json.dumps({'code': code}),
+                                    content_type='application/json')
+        data = json.loads(response.data)
+
+        self.assertFalse(data['correct'])
+        self.assertEqual(data['diff']['first_difference'],
+                         {'line': 3, 'expected': data['expected_output'].splitlines()[2],
+                          'student': 'no'})
+        self.assertIn("Yours:    'no'", data['feedback'])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,169 @@
+"""
+Background job API tests for the Bhodi Learning Platform backend.
+
+Tests submit/poll, server-sent events and result expiry for code runs.
+"""
+import pytest
+import json
+import sys
+import os
+import threading
+import time
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from jobs import JobStore, JobQueueFull, JOB_DONE
+from flask_testing import TestCase
+
+
+class TestJobStore:
+    """Test the job store on its own."""
+
+    def test_job_runs_in_background(self):
+        """Test that a submitted job finishes with the function's response."""
+        store = JobStore(max_workers=1)
+        job = store.submit('test', lambda value: ({'value': value}, 200), 42)
+
+        assert job.wait(5)
+        assert job.status == JOB_DONE
+        assert job.to_dict()['result'] == {'value': 42}
+        assert job.to_dict()['result_status'] == 200
+        assert store.pending == 0
+        store.shutdown()
+
+    def test_rejects_when_too_many_pending(self):
+        """Test that submit is refused once max_pending jobs are waiting."""
+        store = JobStore(max_workers=1, max_pending=1)
+        release = threading.Event()
+        store.submit('test', lambda: (release.wait(5), 200))
+
+        with pytest.raises(JobQueueFull) as excinfo:
+            store.submit('test', lambda: ({}, 200))
+        release.set()
+        store.shutdown()
+
+        assert excinfo.value.retry_after >= 1
+
+    def test_failing_job_reports_system_error(self):
+        """Test that an exception in a job becomes a 500 response."""
+        store = JobStore(max_workers=1)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        job = store.submit('test', fail)
+        job.wait(5)
+        store.shutdown()
+
+        assert job.http_status == 500
+        assert job.payload['error_type'] == 'system_error'
+
+    def test_results_expire_after_ttl(self):
+        """Test that finished jobs are forgotten after result_ttl."""
+        store = JobStore(max_workers=1, result_ttl=0.05)
+        job = store.submit('test', lambda: ({}, 200))
+        job.wait(5)
+        store.shutdown()
+
+        assert store.get(job.job_id) is job
+        time.sleep(0.1)
+        assert store.get(job.job_id) is None
+
+
+class JobEndpointTestCase(TestCase):
+    """Test the /api/jobs endpoints."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def _submit(self, path, payload, client='10.0.8.1'):
+        return self.client.post(path,
+                              data=json.dumps(payload),
+                              content_type='application/json',
+                              headers={'X-Forwarded-For': client})
+
+    def _wait_for(self, job_id):
+        for _ in range(200):
+            data = json.loads(self.client.get(f'/api/jobs/{job_id}').data)
+            if data['job_status'] == JOB_DONE:
+                return data
+            time.sleep(0.05)
+        self.fail(f'Job {job_id} did not finish')
+
+    def test_submit_and_poll_run_code(self):
+        """Test that a run is accepted at once and its result can be polled."""
+        response = self._submit('/api/jobs/run-code', {'code': 'print("from a job")'})
+
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data)
+        self.assertEqual(data['poll_url'], f"/api/jobs/{data['job_id']}")
+
+        result = self._wait_for(data['job_id'])
+        self.assertEqual(result['result_status'], 200)
+        self.assertIn('from a job', result['result']['output'])
+
+    def test_submit_check_job(self):
+        """Test that a lesson check runs as a job with the usual feedback."""
+        response = self._submit('/api/jobs/lesson/01/check', {'code': 'print("hi")'},
+                                client='10.0.8.2')
+        self.assertEqual(response.status_code, 202)
+
+        result = self._wait_for(json.loads(response.data)['job_id'])
+        self.assertEqual(result['result_status'], 200)
+        self.assertIn('correct', result['result'])
+
+    def test_invalid_submissions_are_not_queued(self):
+        """Test that bad input and unknown lessons are answered directly."""
+        response = self._submit('/api/jobs/lesson/99/check', {'code': 'print(1)'},
+                                client='10.0.8.3')
+        self.assertEqual(response.status_code, 404)
+
+        response = self._submit('/api/jobs/lesson/01/check', {}, client='10.0.8.3')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_job_returns_404(self):
+        """Test polling a job id that was never issued."""
+        response = self.client.get('/api/jobs/does-not-exist')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.data)['error_type'], 'job_not_found')
+
+    def test_event_stream_ends_with_result(self):
+        """Test that the SSE stream delivers the finished result."""
+        response = self._submit('/api/jobs/run-code', {'code': 'print(6 * 7)'},
+                                client='10.0.8.4')
+        job_id = json.loads(response.data)['job_id']
+
+        response = self.client.get(f'/api/jobs/{job_id}/events')
+        body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertTrue(body.startswith('event: status\n'))
+        result_line = body.split('event: result\ndata: ')[1].split('\n')[0]
+        self.assertIn('42', json.loads(result_line)['result']['output'])
+
+    def test_full_job_queue_returns_503(self):
+        """Test that submissions over JOB_MAX_PENDING are shed."""
+        original = server.job_store
+        server.job_store = JobStore(max_workers=1, max_pending=1)
+        release = threading.Event()
+        server.job_store.submit('test', lambda: (release.wait(5), 200))
+        try:
+            response = self._submit('/api/jobs/run-code', {'code': 'print(1)'},
+                                    client='10.0.8.5')
+        finally:
+            release.set()
+            server.job_store.shutdown()
+            server.job_store = original
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,117 @@
+"""
+Lesson catalog tests for the Bhodi Learning Platform backend.
+
+Tests the in-memory lesson index and its hot reloading.
+"""
+import pytest
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from lesson_catalog import LessonCatalog
+
+
+def _make_lesson(base, name, files):
+    """Create a lesson directory with the given files."""
+    directory = base / name
+    directory.mkdir()
+    for filename, content in files.items():
+        (directory / filename).write_text(content, encoding='utf-8')
+    return directory
+
+
+def _touch_later(path):
+    """Move a file's mtime forward so the change is always detectable."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+class TestLessonCatalog:
+    """Test lesson lookup and file contents."""
+
+    def test_lookup_by_padded_and_unpadded_id(self, tmp_path):
+        """Test that '1' and '01' find the same lesson."""
+        _make_lesson(tmp_path, 'lesson_01_first', {'problem_statement.md': '# One'})
+        catalog = LessonCatalog(str(tmp_path)).load()
+
+        assert catalog.get('1') is catalog.get('01')
+        assert catalog.get('01').problem_statement == '# One'
+        assert catalog.get('02') is None
+
+    def test_test_cases_are_parsed(self, tmp_path):
+        """Test that test_cases.json is read, and a broken one is ignored."""
+        _make_lesson(tmp_path, 'lesson_01_first', {
+            'test_cases.json': '{"cases": [{"inputs": ["quit"]}, '
+                               '{"name": "stays", "inputs": ["play"], "expected_output": "ok"}]}',
+        })
+        _make_lesson(tmp_path, 'lesson_02_second', {'test_cases.json': '{"cases": "quit"}'})
+        catalog = LessonCatalog(str(tmp_path)).load()
+
+        assert catalog.get('01').test_cases == [
+            {'name': 'case 1', 'inputs': ['quit'], 'expected_output': None},
+            {'name': 'stays', 'inputs': ['play'], 'expected_output': 'ok'},
+        ]
+        assert catalog.get('02').test_cases is None
+
+    def test_check_solution_prefers_solution_check(self, tmp_path):
+        """Test that solution_check.py is used for checking when present."""
+        _make_lesson(tmp_path, 'lesson_01_first', {
+            'solution.py': 'print("full")',
+            'solution_check.py': 'print("check")',
+        })
+        _make_lesson(tmp_path, 'lesson_02_second', {'solution.py': 'print("only")'})
+        catalog = LessonCatalog(str(tmp_path)).load()
+
+        assert catalog.get('01').check_solution == 'print("check")'
+        assert catalog.get('01').solution == 'print("full")'
+        assert catalog.get('02').check_solution == 'print("only")'
+        assert catalog.get('02').check_solution_path.endswith('solution.py')
+
+    def test_ignores_non_lesson_entries(self, tmp_path):
+        """Test that stray files and directories are not indexed."""
+        _make_lesson(tmp_path, 'lesson_01_first', {})
+        (tmp_path / 'lesson_02_notes.md').write_text('not a directory')
+        (tmp_path / 'drafts').mkdir()
+        catalog = LessonCatalog(str(tmp_path)).load()
+
+        assert catalog.lesson_ids() == ['01']
+
+    def test_missing_base_directory(self, tmp_path):
+        """Test that a missing lessons directory gives an empty catalog."""
+        catalog = LessonCatalog(str(tmp_path / 'missing')).load()
+        assert len(catalog) == 0
+
+    def test_reload_picks_up_edits_and_new_lessons(self, tmp_path):
+        """Test that load() re-reads only changed lessons."""
+        first = _make_lesson(tmp_path, 'lesson_01_first', {'starter_code.py': 'v1'})
+        _make_lesson(tmp_path, 'lesson_02_second', {'starter_code.py': 'same'})
+        catalog = LessonCatalog(str(tmp_path)).load()
+        unchanged = catalog.get('02')
+
+        (first / 'starter_code.py').write_text('v2')
+        _touch_later(first / 'starter_code.py')
+        _make_lesson(tmp_path, 'lesson_03_third', {'starter_code.py': 'new'})
+        catalog.load()
+
+        assert catalog.get('01').starter_code == 'v2'
+        assert catalog.get('02') is unchanged
+        assert catalog.get('03').starter_code == 'new'
+
+    def test_refresh_interval_polls_on_lookup(self, tmp_path):
+        """Test hot reloading through get() when polling is enabled."""
+        first = _make_lesson(tmp_path, 'lesson_01_first', {'starter_code.py': 'v1'})
+        polling = LessonCatalog(str(tmp_path), refresh_interval=0.001).load()
+        static = LessonCatalog(str(tmp_path)).load()
+
+        (first / 'starter_code.py').write_text('v2')
+        _touch_later(first / 'starter_code.py')
+        polling._last_refresh = 0.0
+
+        assert polling.get('01').starter_code == 'v2'
+        assert static.get('01').starter_code == 'v1'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
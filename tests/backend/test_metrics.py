@@ -0,0 +1,162 @@
+"""
+Metrics tests for the Bhodi Learning Platform backend.
+
+Tests the Prometheus registry, its exporter and the server instrumentation.
+"""
+import pytest
+import json
+import sys
+import os
+import threading
+import urllib.request
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from server import app
+from metrics import REGISTRY, MetricsRegistry, start_metrics_server
+from flask_testing import TestCase
+
+
+class TestMetricsRegistry:
+    """Test metric recording and rendering."""
+
+    def test_counter_with_labels(self):
+        """Test that counters render one sample per label set."""
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', 'Test counter', labelnames=('kind',))
+        counter.inc(kind='a')
+        counter.inc(kind='a')
+        counter.inc(3, kind='b')
+
+        output = registry.render()
+
+        assert '# TYPE test_total counter' in output
+        assert 'test_total{kind="a"} 2.0' in output
+        assert 'test_total{kind="b"} 3.0' in output
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram bucket, sum and count samples."""
+        registry = MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        output = registry.render()
+
+        assert 'test_seconds_bucket{le="0.1"} 1.0' in output
+        assert 'test_seconds_bucket{le="1.0"} 2.0' in output
+        assert 'test_seconds_bucket{le="+Inf"} 3.0' in output
+        assert 'test_seconds_sum 5.55' in output
+        assert 'test_seconds_count 3.0' in output
+
+    def test_values_from_finished_threads_are_kept(self):
+        """Test that per-thread shards are merged, including finished threads."""
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', 'Test counter')
+
+        threads = [threading.Thread(target=lambda: [counter.inc() for _ in range(100)])
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc()
+
+        assert 'test_total 801.0' in registry.render()
+        # Folding finished shards must not double count
+        assert 'test_total 801.0' in registry.render()
+
+    def test_callback_metrics(self):
+        """Test gauges read at scrape time."""
+        registry = MetricsRegistry()
+        registry.gauge_callback('test_depth', 'Queue depth', lambda: 4)
+        registry.counter_callback('test_cache_total', 'Cache lookups',
+                                  lambda: {('hit',): 3, ('miss',): 1},
+                                  labelnames=('result',))
+
+        output = registry.render()
+
+        assert 'test_depth 4.0' in output
+        assert 'test_cache_total{result="hit"} 3.0' in output
+        assert '# TYPE test_cache_total counter' in output
+
+    def test_label_values_are_escaped(self):
+        """Test escaping of quotes and backslashes in label values."""
+        registry = MetricsRegistry()
+        counter = registry.counter('test_total', 'Test counter', labelnames=('path',))
+        counter.inc(path='a"b\\c')
+
+        assert 'test_total{path="a\\"b\\\\c"} 1.0' in registry.render()
+
+    def test_metrics_server(self):
+        """Test the standalone /metrics HTTP server."""
+        registry = MetricsRegistry()
+        registry.gauge_callback('test_up', 'Up', lambda: 1)
+        httpd = start_metrics_server(registry, 0, host='127.0.0.1')
+        try:
+            port = httpd.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+                body = response.read().decode('utf-8')
+                content_type = response.headers['Content-Type']
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        assert 'test_up 1.0' in body
+        assert content_type.startswith('text/plain; version=0.0.4')
+
+
+class ServerMetricsTestCase(TestCase):
+    """Test that the API records its metrics."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def test_request_latency_recorded_per_route(self):
+        """Test that requests are labelled with their route template."""
+        self.client.get('/lesson/01')
+
+        output = REGISTRY.render()
+        assert 'bhodi_http_request_duration_seconds_count{route="/lesson/<lesson_id>",method="GET",status="200"}' in output
+
+    def test_execution_outcomes_recorded(self):
+        """Test that security rejections and sandbox timings are counted."""
+        self.client.post('/api/run-code',
+                         data=json.dumps({'code': 'eval("1")'}),
+                         content_type='application/json',
+                         headers={'X-Forwarded-For': '10.6.0.1'})
+        self.client.post('/api/run-code',
+                         data=json.dumps({'code': 'print(1)'}),
+                         content_type='application/json',
+                         headers={'X-Forwarded-For': '10.6.0.1'})
+
+        output = REGISTRY.render()
+        assert 'bhodi_executions_total{outcome="security_rejected"}' in output
+        assert 'bhodi_executions_total{outcome="success"}' in output
+        assert 'bhodi_sandbox_execution_seconds_count' in output
+        assert 'bhodi_cache_requests_total{cache="solution",result="hit"}' in output
+
+    def test_resource_usage_recorded(self):
+        """Test that a run's resources are returned and recorded."""
+        response = self.client.post('/api/run-code',
+                                    data=json.dumps({'code': 'print("resources")'}),
+                                    content_type='application/json',
+                                    headers={'X-Forwarded-For': '10.6.0.2'})
+        resources = json.loads(response.data)['resources']
+
+        assert resources['wall_seconds'] > 0
+        assert resources['peak_rss_bytes'] > 0
+        assert resources['stdout_bytes'] == len('resources\n')
+
+        output = REGISTRY.render()
+        assert 'bhodi_sandbox_cpu_seconds_count{mode=' in output
+        assert 'bhodi_sandbox_peak_rss_bytes_count{mode=' in output
+        assert 'bhodi_sandbox_output_bytes_total{stream="stdout"}' in output
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
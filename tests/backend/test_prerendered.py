@@ -0,0 +1,89 @@
+"""
+Pre-rendered lesson response tests for the Bhodi Learning Platform backend.
+
+Tests ETag revalidation and compressed variants of /lesson/<id>.
+"""
+import pytest
+import gzip
+import json
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from server import app
+from prerendered import PrerenderedResponse
+from flask_testing import TestCase
+
+
+class PrerenderedLessonTestCase(TestCase):
+    """Test caching headers on lesson responses."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def test_lesson_has_strong_etag_and_cache_control(self):
+        """Test that lesson responses carry validators."""
+        response = self.client.get('/lesson/01')
+        self.assertEqual(response.status_code, 200)
+
+        etag, weak = response.get_etag()
+        self.assertTrue(etag)
+        self.assertFalse(weak)
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_if_none_match_returns_304(self):
+        """Test revalidation with a matching ETag."""
+        first = self.client.get('/lesson/01')
+        etag = first.headers['ETag']
+
+        second = self.client.get('/lesson/01', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+        self.assertEqual(second.headers['ETag'], etag)
+
+        stale = self.client.get('/lesson/01', headers={'If-None-Match': '"stale"'})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_gzip_variant_matches_identity(self):
+        """Test that the gzip body decodes to the same payload."""
+        plain = self.client.get('/lesson/01')
+        compressed = self.client.get('/lesson/01', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertNotEqual(compressed.headers['ETag'], plain.headers['ETag'])
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+
+    def test_unpadded_lesson_id_is_echoed(self):
+        """Test that /lesson/1 still reports the id it was asked for."""
+        response = self.client.get('/lesson/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['lesson_id'], '1')
+
+
+class TestPrerenderedResponse:
+    """Test payload rendering on its own."""
+
+    def test_etag_changes_with_content(self):
+        """Test that different payloads get different validators."""
+        first = PrerenderedResponse({'starter_code': 'print(1)'})
+        second = PrerenderedResponse({'starter_code': 'print(2)'})
+        same = PrerenderedResponse({'starter_code': 'print(1)'})
+
+        assert first.etag != second.etag
+        assert first.etag == same.etag
+
+    def test_body_is_compact_utf8_json(self):
+        """Test that non-ASCII content is kept as UTF-8 rather than escaped."""
+        rendered = PrerenderedResponse({'message': '🎮 hi'})
+
+        assert json.loads(rendered.body) == {'message': '🎮 hi'}
+        assert '🎮'.encode('utf-8') in rendered.body
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+"""
+Rate limiter tests for the Bhodi Learning Platform backend.
+
+Tests the sliding-window counters and their memory bounds.
+"""
+import pytest
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from rate_limiter import InMemoryBackend, RateLimiter
+
+
+class TestInMemoryBackend:
+    """Test the sliding-window counter backend."""
+
+    def test_allows_up_to_limit_then_blocks(self):
+        """Test that the limit applies within one window."""
+        backend = InMemoryBackend()
+        key = ('1.2.3.4', 'run-code')
+
+        results = [backend.hit(key, 3, 60, 600.0 + i)[0] for i in range(4)]
+
+        assert results == [True, True, True, False]
+
+    def test_endpoints_counted_separately(self):
+        """Test that each endpoint has its own counter."""
+        backend = InMemoryBackend()
+        for _ in range(3):
+            backend.hit(('1.2.3.4', 'run-code'), 3, 60, 600.0)
+
+        assert backend.hit(('1.2.3.4', 'run-code'), 3, 60, 601.0)[0] is False
+        assert backend.hit(('1.2.3.4', 'lesson-check'), 3, 60, 601.0)[0] is True
+
+    def test_previous_window_is_interpolated(self):
+        """Test that requests from the previous window decay gradually."""
+        backend = InMemoryBackend()
+        key = ('1.2.3.4', 'run-code')
+        for _ in range(10):
+            backend.hit(key, 10, 60, 610.0)
+
+        # 15s into the next window, 75% of the previous 10 requests still count
+        allowed, estimate, retry_after = backend.hit(key, 10, 60, 675.0)
+        assert allowed is True
+        assert estimate == pytest.approx(8.5)
+
+        # 45s in, only 25% count
+        assert backend.hit(key, 10, 60, 705.0)[0] is True
+
+    def test_retry_after_when_blocked(self):
+        """Test that blocked requests get a sensible retry time."""
+        backend = InMemoryBackend()
+        key = ('1.2.3.4', 'run-code')
+        for _ in range(2):
+            backend.hit(key, 2, 60, 600.0)
+
+        allowed, _, retry_after = backend.hit(key, 2, 60, 630.0)
+        assert allowed is False
+        assert retry_after == 30
+
+    def test_max_keys_is_a_hard_cap(self):
+        """Test that the least recently seen client is evicted at the cap."""
+        backend = InMemoryBackend(max_keys=100)
+        for i in range(1000):
+            backend.hit((f'10.0.{i // 256}.{i % 256}', 'run-code'), 5, 60, 600.0)
+
+        assert len(backend) == 100
+
+    def test_sweep_forgets_idle_clients(self):
+        """Test that sweeping drops clients idle for two windows."""
+        backend = InMemoryBackend()
+        backend.hit(('idle', 'run-code'), 5, 60, 600.0)
+        backend.hit(('active', 'run-code'), 5, 60, 700.0)
+
+        backend.sweep(725.0)
+
+        assert len(backend) == 1
+        assert backend.hit(('active', 'run-code'), 5, 60, 725.0)[0] is True
+
+
+class TestRateLimiter:
+    """Test the rate limiter front end."""
+
+    def test_check_result_format(self):
+        """Test the dict returned to the endpoints."""
+        limiter = RateLimiter()
+
+        first = limiter.check('1.2.3.4', 'run-code', max_requests=1)
+        second = limiter.check('1.2.3.4', 'run-code', max_requests=1)
+
+        assert first == {'allowed': True, 'requests_remaining': 0}
+        assert second['allowed'] is False
+        assert 'Rate limit exceeded' in second['message']
+        assert second['retry_after'] >= 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,106 @@
+"""
+Execution result cache tests for the Bhodi Learning Platform backend.
+
+Tests that repeated runs of deterministic programs skip the sandbox.
+"""
+import pytest
+import json
+import sys
+import os
+from unittest import mock
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from result_cache import ExecutionResultCache
+from flask_testing import TestCase
+
+
+class TestExecutionResultCache:
+    """Test the cache on its own."""
+
+    def test_miss_then_hit(self):
+        """Test that a stored response is returned on the next lookup."""
+        cache = ExecutionResultCache()
+        key = cache.make_key('print(1)', [], 5)
+
+        assert cache.get(key) is None
+        cache.put(key, {'status': 'success', 'output': '1\n'})
+
+        assert cache.get(key)['output'] == '1\n'
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_key_depends_on_inputs_and_timeout(self):
+        """Test that the same code with other inputs or limits is a miss."""
+        cache = ExecutionResultCache()
+        key = cache.make_key('print(input())', ['quit'], 5)
+
+        assert key != cache.make_key('print(input())', ['stay'], 5)
+        assert key != cache.make_key('print(input())', ['quit'], 10)
+
+    def test_evicts_by_entries_and_bytes(self):
+        """Test that neither max_entries nor max_bytes is exceeded."""
+        cache = ExecutionResultCache(max_entries=2, max_bytes=100)
+        for i in range(3):
+            cache.put(str(i), {'output': str(i)})
+        assert len(cache) == 2
+        assert cache.get('0') is None
+
+        cache.put('big', {'output': 'x' * 80})
+        assert len(cache) == 1
+        assert cache.bytes <= 100
+
+        cache.put('huge', {'output': 'x' * 200})
+        assert cache.get('huge') is None
+
+
+class ResultCacheEndpointTestCase(TestCase):
+    """Test caching through /api/run-code."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        server.result_cache.clear()
+
+    def _run(self, code, client='10.0.11.1'):
+        return self.client.post('/api/run-code',
+                              data=json.dumps({'code': code}),
+                              content_type='application/json',
+                              headers={'X-Forwarded-For': client})
+
+    def test_repeated_run_skips_sandbox(self):
+        """Test that an unchanged deterministic program runs only once."""
+        first = json.loads(self._run('print(sum(range(10)))').data)
+
+        with mock.patch.object(server, '_run_sandboxed') as run:
+            second = json.loads(self._run('print(sum(range(10)))').data)
+
+        run.assert_not_called()
+        self.assertEqual(second['output'], first['output'])
+        self.assertTrue(second['cached'])
+
+    def test_nondeterministic_program_is_not_cached(self):
+        """Test that programs using random always run again."""
+        code = 'import random\nprint(random.random())'
+        self._run(code, client='10.0.11.2')
+
+        self.assertEqual(len(server.result_cache), 0)
+
+    def test_timeouts_are_not_cached(self):
+        """Test that only finished runs are stored."""
+        with mock.patch.object(server, '_run_sandboxed', return_value={
+                'returncode': None, 'stdout': '', 'stderr': '',
+                'timed_out': True, 'execution_time': 5.0}):
+            self._run('while True: pass', client='10.0.11.3')
+
+        self.assertEqual(len(server.result_cache), 0)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,566 @@
+"""
+Sandbox pool tests for the Bhodi Learning Platform backend.
+
+Tests the warm interpreter pool used to execute student code.
+"""
+import pytest
+import marshal
+import subprocess
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+from runner.safe_runner import (
+    ForkServer, OutputBuffer, SandboxPool, StreamingRun, capture_output, sandbox_env, start_one_shot,
+)
+from runner.safe_runner import _ProcessSnapshot
+
+
+@pytest.fixture
+def pool():
+    """Create a small pool and shut it down after the test."""
+    sandbox_pool = SandboxPool(size=1, max_runs_per_worker=3, max_timeout=5)
+    yield sandbox_pool
+    sandbox_pool.close()
+
+
+class TestSandboxPool:
+    """Test pooled sandbox execution."""
+
+    def test_runs_code_with_simulated_input(self, pool):
+        """Test output capture and input() simulation."""
+        result = pool.run('name = input("Name: ")\nprint(f"Hi {name}")', 'Ada\n', 5)
+
+        assert result['returncode'] == 0
+        assert result['timed_out'] is False
+        assert result['stdout'] == 'Name: Hi Ada\n'
+        assert result['stderr'] == ''
+
+    def test_fresh_namespace_per_run(self, pool):
+        """Test that variables do not leak between runs on the same worker."""
+        pool.run('secret = 42', '', 5)
+        result = pool.run('print(secret)', '', 5)
+
+        assert result['returncode'] == 1
+        assert "NameError: name 'secret' is not defined" in result['stderr']
+
+    def test_traceback_hides_worker_frames(self, pool):
+        """Test that tracebacks only show the student's own code."""
+        result = pool.run('x = 1\ny = x / 0', '', 5)
+
+        assert result['returncode'] == 1
+        assert 'File "main.py", line 2' in result['stderr']
+        assert 'safe_runner' not in result['stderr']
+
+    def test_syntax_error_reports_line(self, pool):
+        """Test that syntax errors look like the interpreter's own."""
+        result = pool.run('print("hello"', '', 5)
+
+        assert result['returncode'] == 1
+        assert 'line 1' in result['stderr']
+        assert 'SyntaxError' in result['stderr']
+
+    def test_sys_exit_sets_returncode(self, pool):
+        """Test that sys.exit() maps to the process return code."""
+        result = pool.run('import sys\nprint("bye")\nsys.exit(3)', '', 5)
+
+        assert result['returncode'] == 3
+        assert result['stdout'] == 'bye\n'
+
+    def test_timeout_recycles_worker(self, pool):
+        """Test that a timed out worker is replaced and the pool keeps working."""
+        result = pool.run('while True: pass', '', 1)
+        assert result['timed_out'] is True
+
+        result = pool.run('print("still alive")', '', 5)
+        assert result['stdout'] == 'still alive\n'
+
+    def test_memory_limit_breach(self, pool):
+        """Test that exceeding RLIMIT_AS fails the run without killing the pool."""
+        result = pool.run('data = bytearray(512 * 1024 * 1024)', '', 5)
+        assert result['returncode'] != 0
+
+        result = pool.run('print("recovered")', '', 5)
+        assert result['stdout'] == 'recovered\n'
+
+    def test_runs_precompiled_bytecode(self, pool):
+        """Test that a marshalled code object runs with a normal traceback."""
+        code = 'print("compiled")\nx = 1 / 0'
+        bytecode = marshal.dumps(compile(code, 'main.py', 'exec'))
+        result = pool.run(code, '', 5, bytecode=bytecode)
+
+        assert result['stdout'] == 'compiled\n'
+        assert 'File "main.py", line 2' in result['stderr']
+        assert 'x = 1 / 0' in result['stderr']
+
+    def test_runs_each_case_in_fresh_namespace(self, pool):
+        """Test that cases share one worker but not their variables."""
+        code = 'print(globals().get("seen", "fresh"))\nseen = input()'
+        result = pool.run(code, '', 5, cases=['a\n', 'b\n', ''])
+
+        assert [case['stdout'] for case in result['cases']] == ['fresh\n'] * 3
+        assert [case['returncode'] for case in result['cases']] == [0, 0, 1]
+        assert 'EOFError' in result['cases'][2]['stderr']
+
+    def test_cases_timeout_covers_all_cases(self, pool):
+        """Test that a hanging case times out the whole request."""
+        result = pool.run('if input() == "hang":\n    while True: pass', '', 1,
+                          cases=['ok\n', 'hang\n'])
+
+        assert result['timed_out'] is True
+        assert result['cases'] == []
+
+    def test_output_limit_stops_run(self, pool):
+        """Test that a run printing past max_output is stopped and truncated."""
+        limited = SandboxPool(size=1, max_timeout=5, max_output=1000)
+        try:
+            result = limited.run('while True: print("x" * 100)', '', 5)
+            after = limited.run('print("still here")', '', 5)
+        finally:
+            limited.close()
+
+        assert result['truncated'] is True
+        assert result['timed_out'] is False
+        assert len(result['stdout']) == 1000
+        # Nine lines and the write that overflowed, which is cut short
+        assert result['usage']['stdout_bytes'] == 9 * 101 + 100
+        assert after['stdout'] == 'still here\n'
+        assert after['truncated'] is False
+
+    def test_output_limit_keeps_error_report(self, pool):
+        """Test that a traceback is still reported after stderr filled up."""
+        limited = SandboxPool(size=1, max_timeout=5, max_output=100)
+        try:
+            result = limited.run('import sys\ntry:\n    while True: sys.stderr.write("e")\n'
+                                 'except BaseException:\n    pass\n1 / 0', '', 5)
+        finally:
+            limited.close()
+
+        assert result['truncated'] is True
+        assert result['returncode'] == 1
+        assert len(result['stderr']) == 100
+
+    def test_worker_recycled_after_max_runs(self, pool):
+        """Test that workers are replaced after max_runs_per_worker runs."""
+        spawns = []
+        pool.spawn_observer = spawns.append
+        for _ in range(4):
+            pool.run('print("again")', '', 5)
+
+        assert len(spawns) == 2
+
+    @pytest.mark.parametrize('code', [
+        'import builtins\nbuiltins.print = lambda *a, **k: None',
+        'import __main__\n'
+        'original = __main__._run_code_object\n'
+        '__main__._run_code_object = lambda code, stdin, limit: original(\n'
+        '    compile("print(\'forged\')", "main.py", "exec"), stdin, limit)',
+        'import json\njson.dumps = lambda *a, **k: "{}"',
+        'import os\nos.write = lambda fd, data: len(data)',
+        'import string\nstring.Formatter.format = lambda *a, **k: "forged"',
+        'import random\nrandom.randint = lambda a, b: 4',
+        'try:\n'
+        '    1 / 0\n'
+        'except ZeroDivisionError as e:\n'
+        '    e.__traceback__.tb_frame.f_back.f_globals["_execute_request"] = None',
+    ])
+    def test_run_cannot_change_next_run(self, pool, code):
+        """Test that what one run changes is gone for the next run on the worker."""
+        pool.run(code, '', 5)
+        result = pool.run(
+            'import json, random, string\n'
+            'print("hi", json.dumps([1]), string.Formatter().format("{}", 2), random.randint(5, 5))',
+            '', 5)
+
+        assert result['returncode'] == 0
+        assert result['stdout'] == 'hi [1] 2 5\n'
+
+    @pytest.mark.parametrize('change, check', [
+        ('import os\nos.environ["LEAK"] = "1"', 'import os\nprint(os.environ.get("LEAK"))'),
+        ('import decimal\ndecimal.getcontext().prec = 3',
+         'from decimal import Decimal\nprint(Decimal(1) / 7)'),
+        ('import os\nos.umask(0)', 'import os\nprint(os.umask(0o22))'),
+        ('import signal\nsignal.alarm(1)', 'import time\ntime.sleep(1.5)\nprint("ok")'),
+        ('import signal\nsignal.signal(signal.SIGINT, signal.SIG_IGN)',
+         'import signal\nprint(signal.getsignal(signal.SIGINT))'),
+        ('import os\nos.chdir("/")', 'import os\nprint(os.getcwd())'),
+        ('import collections\ncollections._sys.modules.pop("json")',
+         'import json\nprint(json.dumps(1))'),
+    ])
+    def test_process_state_does_not_reach_next_run(self, pool, change, check):
+        """Test that process state one run changes is back for the next run."""
+        before = pool.run(check, '', 5)
+        pool.run(change, '', 5)
+        after = pool.run(check, '', 5)
+
+        assert after['returncode'] == 0
+        assert after['stdout'] == before['stdout']
+
+    def test_random_seed_does_not_reach_next_run(self, pool):
+        """Test that a run's random.seed() does not make the next run predictable."""
+        seeded = pool.run('import random\nrandom.seed(1)\nprint(random.random())', '', 5)
+        after = pool.run('import random\nprint(random.random())', '', 5)
+
+        assert after['stdout'] != seeded['stdout']
+
+    def test_worker_kept_unless_shared_state_used(self):
+        """Test that only runs reaching state the runs share retire the worker."""
+        pool = SandboxPool(size=1, max_runs_per_worker=10, max_timeout=5)
+        spawns = []
+        pool.spawn_observer = spawns.append
+        try:
+            pool.run('print("first")', '', 5)
+            pool.run('import random, math\nprint(random.random())\n1 / 0', '', 5)
+            kept = len(spawns)
+            pool.run('import sys\nprint(sys.version)', '', 5)
+            pool.run('import os\nprint(os.getpid())', '', 5)
+            pool.run('from collections import _sys', '', 5)
+            pool.run('print("last")', '', 5)
+        finally:
+            pool.close()
+
+        assert kept == 1
+        assert len(spawns) == 4
+
+    def test_reports_resource_usage(self, pool):
+        """Test that each run reports its CPU time, peak memory and output size."""
+        result = pool.run('data = bytearray(20 * 1024 * 1024)\nprint("héllo")', '', 5)
+        usage = result['usage']
+
+        assert usage['cpu_user_seconds'] + usage['cpu_system_seconds'] > 0
+        assert usage['peak_rss_bytes'] >= 20 * 1024 * 1024
+        assert usage['stdout_bytes'] == len('héllo\n'.encode('utf-8'))
+        assert usage['stderr_bytes'] == 0
+
+    def test_timeout_reports_no_usage(self, pool):
+        """Test that a killed worker reports no usage rather than a guess."""
+        result = pool.run('while True: pass', '', 1)
+
+        assert result['timed_out'] is True
+        assert result['usage'] is None
+
+
+@pytest.fixture
+def fork_server():
+    """Create a fork server preloading random and shut it down after the test."""
+    server = ForkServer(preload=['random'], max_timeout=5, max_output=1000)
+    yield server
+    server.close()
+
+
+class TestProcessSnapshot:
+    """Test the reset of process state between pooled runs."""
+
+    def test_restore_resets_process_state(self, monkeypatch):
+        """Test that handlers, timers, umask, environment and decimal context are reset."""
+        import decimal
+        import signal
+
+        snapshot = _ProcessSnapshot()
+        handler = signal.getsignal(signal.SIGUSR1)
+        umask = os.umask(0)
+        os.umask(umask)
+        monkeypatch.setenv('BHODI_LEAK', '1')
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        signal.alarm(100)
+        os.umask(0)
+        decimal.getcontext().prec = 3
+
+        assert snapshot.restore() is True
+        assert 'BHODI_LEAK' not in os.environ
+        assert signal.getsignal(signal.SIGUSR1) is handler
+        assert signal.alarm(0) == 0
+        assert os.umask(umask) == umask
+        assert decimal.getcontext().prec == 28
+        assert snapshot.restore() is False
+
+
+class TestForkServer:
+    """Test runs forked from a template interpreter."""
+
+    def test_runs_code_with_simulated_input(self, fork_server):
+        """Test output capture and input() simulation."""
+        result = fork_server.run('name = input("Name: ")\nprint(f"Hi {name}")', 'Ada\n', 5)
+
+        assert result['returncode'] == 0
+        assert result['timed_out'] is False
+        assert result['stdout'] == 'Name: Hi Ada\n'
+        assert result['usage']['stdout_bytes'] == len('Name: Hi Ada\n')
+
+    def test_preloaded_modules_are_imported(self, fork_server):
+        """Test that runs start with the preload modules already imported."""
+        result = fork_server.run('import sys\nprint("random" in sys.modules)', '', 5)
+
+        assert result['stdout'] == 'True\n'
+
+    def test_runs_do_not_share_state(self, fork_server):
+        """Test that module changes and random state do not carry over."""
+        first = fork_server.run('import random\nrandom.marker = 1\nprint(random.random())', '', 5)
+        second = fork_server.run('import random\nprint(hasattr(random, "marker"), random.random())', '', 5)
+
+        marker, number = second['stdout'].split()
+        assert marker == 'False'
+        assert number != first['stdout'].strip()
+
+    def test_cases(self, fork_server):
+        """Test that cases run one after another in one fork."""
+        result = fork_server.run('print(input())', '', 5, cases=['a\n', 'b\n'])
+
+        assert [case['stdout'] for case in result['cases']] == ['a\n', 'b\n']
+
+    def test_timeout_kills_run(self, fork_server):
+        """Test that a run past its timeout is killed and the server goes on."""
+        result = fork_server.run('while True: pass', '', 1)
+        after = fork_server.run('print("next")', '', 5)
+
+        assert result['timed_out'] is True
+        assert result['usage'] is None
+        assert after['stdout'] == 'next\n'
+
+    def test_exit_without_response_is_reported(self, fork_server):
+        """Test that a run that dies reports its exit status."""
+        result = fork_server.run('import os\nos._exit(7)', '', 5)
+
+        assert result['returncode'] == 7
+        assert result['timed_out'] is False
+
+    def test_limits_applied_in_child(self, fork_server):
+        """Test that each run is in its own process group under the rlimits."""
+        result = fork_server.run(
+            'import os, resource\n'
+            'print(os.getpgrp() == os.getpid(), resource.getrlimit(resource.RLIMIT_AS)[0])',
+            '', 5,
+        )
+
+        assert result['stdout'] == f'True {128 * 1024 * 1024}\n'
+
+    def test_output_limit(self, fork_server):
+        """Test that a run printing past max_output is stopped."""
+        result = fork_server.run('while True: print("x" * 100)', '', 5)
+
+        assert result['truncated'] is True
+        assert len(result['stdout']) == 1000
+
+
+class TestOutputCapture:
+    """Test fixed-size output capture."""
+
+    def test_buffer_keeps_limit_and_flags_overflow(self):
+        """Test that bytes past the limit are dropped and mark truncation."""
+        buffer = OutputBuffer(4)
+
+        assert buffer.write(b'abcd') is True
+        assert buffer.truncated is False
+        assert buffer.write(b'ef') is False
+        assert buffer.truncated is True
+        assert buffer.text() == 'abcd'
+        assert buffer.size == 4
+        assert buffer.written == 6
+
+    def test_buffer_drops_character_cut_at_limit(self):
+        """Test that a multi-byte character split by the limit is left out."""
+        buffer = OutputBuffer(2)
+        buffer.write('aé'.encode('utf-8'))
+
+        assert buffer.text() == 'a'
+
+    def _start(self, code):
+        return subprocess.Popen(
+            [sys.executable, '-u', '-c', code],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=sandbox_env(),
+            preexec_fn=os.setpgrp,
+        )
+
+    def test_capture_reads_both_streams(self):
+        """Test that a well-behaved process's output is captured whole."""
+        process = self._start('import sys\nprint(input())\nprint("err", file=sys.stderr)')
+        output = capture_output(process, 'hello\n', timeout=5, max_output=100)
+
+        assert output['stdout'] == 'hello\n'
+        assert output['stderr'] == 'err\n'
+        assert output['truncated'] is False
+        assert output['timed_out'] is False
+        assert process.returncode == 0
+
+    def test_capture_kills_process_at_limit(self):
+        """Test that a runaway print loop is killed once the buffer is full."""
+        process = self._start('while True: print("x" * 100)')
+        output = capture_output(process, '', timeout=5, max_output=1000)
+
+        assert output['stdout'] == ('x' * 100 + '\n') * 9 + 'x' * 91
+        # The byte past the limit that gave the overflow away counts too
+        assert output['stdout_bytes'] == 1001
+        assert output['truncated'] is True
+        assert output['timed_out'] is False
+        assert process.returncode != 0
+
+    def test_capture_timeout(self):
+        """Test that a silent, endless process times out and is killed."""
+        process = self._start('while True: pass')
+        output = capture_output(process, '', timeout=1, max_output=100)
+
+        assert output['timed_out'] is True
+        assert process.returncode is not None
+
+    def test_capture_unread_input_cannot_block(self):
+        """Test that input the program never reads does not outlast the timeout."""
+        process = self._start('while True: pass')
+        output = capture_output(process, 'x' * 1000000, timeout=1, max_output=100)
+
+        assert output['timed_out'] is True
+        assert process.returncode is not None
+
+    def test_capture_feeds_input_larger_than_a_pipe_buffer(self):
+        """Test that input bigger than the pipe buffer is delivered whole."""
+        process = self._start('import sys\nprint(len(sys.stdin.read()))')
+        output = capture_output(process, 'x' * 1000000, timeout=5, max_output=100)
+
+        assert output['stdout'] == '1000000\n'
+        assert output['timed_out'] is False
+
+
+class TestOneShot:
+    """Test one-shot interpreters fed their code over a pipe."""
+
+    def _run(self, code, stdin_text=''):
+        process = start_one_shot(code, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, env=sandbox_env())
+        stdout, stderr = process.communicate(stdin_text.encode('utf-8'), timeout=5)
+        return process.returncode, stdout.decode('utf-8'), stderr.decode('utf-8')
+
+    def test_runs_code_as_main_with_stdin_free(self):
+        """Test that the code runs as __main__ and input() reads stdin."""
+        returncode, stdout, _ = self._run('print(__name__, input())', 'Ada\n')
+
+        assert returncode == 0
+        assert stdout == '__main__ Ada\n'
+
+    def test_code_larger_than_a_pipe_buffer(self):
+        """Test that code bigger than the pipe buffer is delivered whole."""
+        code = 'print("done")\n' + '#' * 200000
+
+        assert self._run(code)[:2] == (0, 'done\n')
+
+    def test_traceback_names_student_file(self):
+        """Test that tracebacks show main.py and not the loader."""
+        returncode, _, stderr = self._run('def f():\n    return 1 / 0\nf()')
+
+        assert returncode == 1
+        assert 'File "main.py", line 2, in f' in stderr
+        assert 'return 1 / 0' in stderr
+        assert '<string>' not in stderr
+
+    def test_exit_code_is_kept(self):
+        """Test that sys.exit() sets the process exit status."""
+        assert self._run('import sys\nsys.exit(3)')[0] == 3
+
+    def test_limits_and_process_group_applied(self):
+        """Test that the child runs under the limits, in its own process group."""
+        process = start_one_shot(
+            'import os, resource\n'
+            'print(resource.getrlimit(resource.RLIMIT_AS)[0], resource.getrlimit(resource.RLIMIT_CPU)[0])\n'
+            'print(os.getpgrp() == os.getpid())',
+            limits={'memory_limit_mb': 64, 'cpu_hard_limit': 7},
+            stdout=subprocess.PIPE, env=sandbox_env(),
+        )
+        stdout, _ = process.communicate(timeout=5)
+
+        assert stdout.decode('utf-8') == f'{64 * 1024 * 1024} 7\nTrue\n'
+
+    def test_writes_no_files(self, monkeypatch):
+        """Test that delivering code does not create temporary files."""
+        def fail(*args, **kwargs):
+            raise AssertionError('temporary file created')
+
+        monkeypatch.setattr('tempfile.NamedTemporaryFile', fail)
+        monkeypatch.setattr('tempfile.mkstemp', fail)
+
+        assert self._run('print(1)')[:2] == (0, '1\n')
+
+
+class TestStreamingRun:
+    """Test one-shot runs whose output is read while they execute."""
+
+    def test_streams_output_with_simulated_input(self):
+        """Test that output arrives in chunks and the run reports its exit."""
+        run = StreamingRun('print("Hi", input())\nprint("bye")', 'Ada\n', timeout=5)
+        chunks = list(run)
+
+        assert ''.join(text for stream, text in chunks) == 'Hi Ada\nbye\n'
+        assert all(stream == 'stdout' for stream, _ in chunks)
+        assert run.returncode == 0
+        assert run.timed_out is False
+        assert run.time_to_first_byte is not None
+        assert run.time_to_first_byte <= run.execution_time
+
+    def test_reports_resource_usage(self):
+        """Test that the run's rusage and output bytes are read when it exits."""
+        run = StreamingRun('import sys\nprint("out")\nprint("err", file=sys.stderr)', '', timeout=5)
+        list(run)
+
+        assert run.usage['peak_rss_bytes'] > 0
+        assert run.usage['cpu_user_seconds'] >= 0
+        assert run.usage['stdout_bytes'] == 4
+        assert run.usage['stderr_bytes'] == 4
+
+    def test_first_chunk_arrives_before_exit(self):
+        """Test that output is forwarded while the program is still running."""
+        run = StreamingRun('import time\nprint("early")\ntime.sleep(1)', '', timeout=5)
+        stream, text = next(iter(run))
+
+        assert (stream, text) == ('stdout', 'early\n')
+        assert run.time_to_first_byte < 1
+
+    def test_stderr_is_streamed(self):
+        """Test that tracebacks come through the stderr stream."""
+        run = StreamingRun('x = 1 / 0', '', timeout=5)
+        stderr = ''.join(text for stream, text in run if stream == 'stderr')
+
+        assert 'ZeroDivisionError' in stderr
+        assert run.returncode == 1
+
+    def test_output_cap_kills_process(self):
+        """Test that the run is stopped once it prints more than max_output."""
+        run = StreamingRun('while True: print("x" * 100)', '', timeout=5, max_output=1000)
+        output = ''.join(text for _, text in run)
+
+        assert len(output) == 1000
+        assert run.truncated is True
+        assert run.returncode != 0
+        assert run.execution_time < 5
+        assert run.usage['stdout_bytes'] > 1000
+
+    def test_unread_input_cannot_block_output(self):
+        """Test that output is read while input the program ignores is pending."""
+        run = StreamingRun('while True: print("x" * 100)', 'x' * 1000000,
+                           timeout=5, max_output=1000)
+        output = ''.join(text for _, text in run)
+
+        assert len(output) == 1000
+        assert run.truncated is True
+        assert run.execution_time < 5
+
+    def test_unread_input_cannot_outlast_timeout(self):
+        """Test that a program ignoring its input still times out."""
+        run = StreamingRun('import time\ntime.sleep(10)', 'x' * 1000000, timeout=1)
+
+        assert list(run) == []
+        assert run.timed_out is True
+
+    def test_timeout(self):
+        """Test that a silent, endless program times out."""
+        run = StreamingRun('while True: pass', '', timeout=1)
+
+        assert list(run) == []
+        assert run.timed_out is True
+        assert run.returncode is None
+        assert run.time_to_first_byte is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -7,11 +7,14 @@ import pytest
 import json
 import sys
 import os
+from unittest import mock
 
 # Add the backend to the Python path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
 
+import server
 from server import app, _parse_python_error
+from rate_limiter import RateLimiter
 from flask_testing import TestCase
 
 
@@ -87,16 +90,17 @@ class SecurityTestCase(TestCase):
     
     def test_rate_limiting(self):
         """Test that rate limiting works properly."""
-        # Make multiple requests rapidly
+        # Make multiple requests rapidly, counted from zero whatever ran before
         responses = []
-        for i in range(12):  # Should exceed rate limit
-            response = self.client.post('/api/run-code',
-                                      data=json.dumps({
-                                          'code': f'print({i})',
-                                          'user_inputs': []
-                                      }),
-                                      content_type='application/json')
-            responses.append(response)
+        with mock.patch.object(server, 'rate_limiter', RateLimiter()):
+            for i in range(25):  # Should exceed the run-code limit of 20
+                response = self.client.post('/api/run-code',
+                                          data=json.dumps({
+                                              'code': f'print({i})',
+                                              'user_inputs': []
+                                          }),
+                                          content_type='application/json')
+                responses.append(response)
         
         # Some requests should be rate limited (429 status)
         rate_limited = [r for r in responses if r.status_code == 429]
@@ -0,0 +1,97 @@
+"""
+Solution output cache tests for the Bhodi Learning Platform backend.
+
+Tests that lesson solutions are executed once and reused across checks.
+"""
+import pytest
+import json
+import sys
+import os
+from unittest import mock
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from solution_cache import SolutionOutputCache
+from rate_limiter import RateLimiter
+from flask_testing import TestCase
+
+
+class TestSolutionOutputCache:
+    """Test the cache on its own."""
+
+    def test_miss_then_hit(self):
+        """Test that a stored result is returned on the next lookup."""
+        cache = SolutionOutputCache()
+        key = cache.make_key('01', 'print(1)', [])
+
+        assert cache.get(key) is None
+        cache.put(key, {'status': 'success', 'output': '1\n'})
+
+        assert cache.get(key)['output'] == '1\n'
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_key_depends_on_source_and_inputs(self):
+        """Test that different sources or inputs never share an entry."""
+        cache = SolutionOutputCache()
+        cache.put(cache.make_key('01', 'print(1)', ['quit']), {'output': 'a'})
+
+        assert cache.get(cache.make_key('01', 'print(2)', ['quit'])) is None
+        assert cache.get(cache.make_key('01', 'print(1)', ['stay'])) is None
+        assert cache.get(cache.make_key('02', 'print(1)', ['quit'])) is None
+
+    def test_mtime_change_invalidates_lesson(self, tmp_path):
+        """Test that editing a solution file drops that lesson's entries."""
+        solution = tmp_path / 'solution.py'
+        solution.write_text('print(1)')
+        cache = SolutionOutputCache()
+        key = cache.make_key('01', 'print(1)', [])
+        cache.put(key, {'output': '1\n'}, str(solution))
+
+        assert cache.get(key, str(solution)) is not None
+
+        stat = solution.stat()
+        os.utime(solution, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert cache.get(key, str(solution)) is None
+        assert len(cache) == 0
+
+
+class SolutionCacheEndpointTestCase(TestCase):
+    """Test that /lesson/<id>/check reuses the expected output."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def setUp(self):
+        server.solution_cache.invalidate()
+        # A limiter of its own, so the shared counts other tests rely on stay
+        self.original_rate_limiter = server.rate_limiter
+        server.rate_limiter = RateLimiter()
+
+    def tearDown(self):
+        server.rate_limiter = self.original_rate_limiter
+
+    def test_solution_executed_once_across_checks(self):
+        """Test that repeated checks only run the solution once."""
+        real_execute = server._execute_code_safely
+        # Without a precomputed expected output the solution has to run
+        with mock.patch.object(server, '_get_precomputed_result', return_value=None), \
+                mock.patch.object(server, '_execute_code_safely', side_effect=real_execute) as execute:
+            for _ in range(3):
+                response = self.client.post('/lesson/01/check',
+                                          data=json.dumps({'code': 'print("hi")'}),
+                                          content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+
+        # One solution run plus three student runs
+        self.assertEqual(execute.call_count, 4)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,113 @@
+"""
+Streaming run tests for the Bhodi Learning Platform backend.
+
+Tests the /api/run-code/stream server-sent events endpoint.
+"""
+import pytest
+import json
+import sys
+import os
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from admission import AdmissionController
+from flask_testing import TestCase
+
+
+def parse_events(body):
+    """Split an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class StreamingRunTestCase(TestCase):
+    """Test the streaming run endpoint."""
+
+    def create_app(self):
+        """Create Flask app for testing."""
+        app.config['TESTING'] = True
+        return app
+
+    def _stream(self, payload, client='10.0.9.1'):
+        return self.client.post('/api/run-code/stream',
+                              data=json.dumps(payload),
+                              content_type='application/json',
+                              headers={'X-Forwarded-For': client})
+
+    def test_streams_output_then_result(self):
+        """Test that output events come before a final result event."""
+        response = self._stream({'code': 'print("one")\nprint("two")'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = parse_events(response.get_data(as_text=True))
+
+        output = ''.join(data['text'] for event, data in events if event == 'stdout')
+        self.assertEqual(output, 'one\ntwo\n')
+        event, result = events[-1]
+        self.assertEqual(event, 'result')
+        self.assertEqual(result['status'], 'success')
+        self.assertTrue(result['time_to_first_byte'].endswith('s'))
+        self.assertNotIn('output', result)
+
+    def test_error_result_is_parsed(self):
+        """Test that a failing program gets the usual error explanation."""
+        response = self._stream({'code': 'print(undefined_name)'}, client='10.0.9.2')
+        event, result = parse_events(response.get_data(as_text=True))[-1]
+
+        self.assertEqual(result['error_type'], 'name_error')
+        self.assertIn('undefined_name', result['error_output'])
+
+    def test_output_limit_stops_program(self):
+        """Test that a runaway print loop is killed at MAX_OUTPUT_LENGTH."""
+        original = app.config['MAX_OUTPUT_LENGTH']
+        app.config['MAX_OUTPUT_LENGTH'] = 500
+        try:
+            response = self._stream({'code': 'while True: print("spam")'},
+                                    client='10.0.9.3')
+            events = parse_events(response.get_data(as_text=True))
+        finally:
+            app.config['MAX_OUTPUT_LENGTH'] = original
+
+        output = ''.join(data['text'] for event, data in events if event == 'stdout')
+        self.assertEqual(len(output), 500)
+        self.assertEqual(events[-1][1]['error_type'], 'output_limit_error')
+
+    def test_invalid_code_is_rejected_before_streaming(self):
+        """Test that validation errors are plain JSON responses."""
+        response = self._stream({'code': 'import subprocess'}, client='10.0.9.4')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error_type'], 'security_error')
+
+    def test_long_input_is_rejected_before_streaming(self):
+        """Test that user_inputs beyond MAX_INPUT_LENGTH are plain JSON errors."""
+        line = 'x' * app.config['MAX_INPUT_LENGTH']
+        response = self._stream({'code': 'print(input())', 'user_inputs': [line]},
+                                client='10.0.9.6')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error_type'], 'input_error')
+
+    def test_busy_server_returns_503(self):
+        """Test that a run with no free execution slot is shed."""
+        original = server.admission_controller
+        server.admission_controller = AdmissionController(max_concurrent=1, max_queue=0)
+        try:
+            with server.admission_controller.admit():
+                response = self._stream({'code': 'print(1)'}, client='10.0.9.5')
+        finally:
+            server.admission_controller = original
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
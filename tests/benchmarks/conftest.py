@@ -0,0 +1,192 @@
+"""
+Benchmark fixture for the Bhodi Learning Platform backend.
+
+A small offline stand-in for pytest-benchmark: the `benchmark` fixture
+times a callable over several rounds and the results can be saved as a
+baseline and compared against one.
+
+    python -m pytest tests/benchmarks --benchmark-enable
+    python -m pytest tests/benchmarks --benchmark-enable --benchmark-save=baseline
+    python -m pytest tests/benchmarks --benchmark-enable --benchmark-compare=baseline
+
+With --benchmark-compare the run fails when a benchmark's median is more
+than --benchmark-threshold (default 0.25, i.e. 25%) slower than in the
+baseline. Without --benchmark-enable the benchmarks are skipped, so the
+regular test run stays fast.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import pytest
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# Rounds are repeated until this much time was spent, within the limits below
+MIN_TIME = 0.5
+MIN_ROUNDS = 5
+MAX_ROUNDS = 1000
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark-enable', action='store_true', default=False,
+                    help='Run the benchmarks in tests/benchmarks')
+    group.addoption('--benchmark-save', metavar='NAME', default=None,
+                    help='Save results to tests/benchmarks/baselines/NAME.json')
+    group.addoption('--benchmark-compare', metavar='NAME', default=None,
+                    help='Fail on regressions against a saved baseline')
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help='Allowed slowdown of the median against the baseline')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark-enable', default=False):
+        return
+    skip = pytest.mark.skip(reason='benchmarks run with --benchmark-enable')
+    for item in items:
+        if 'benchmark' in getattr(item, 'fixturenames', ()):
+            item.add_marker(skip)
+
+
+class BenchmarkFixture:
+    """Times a callable; call it like pytest-benchmark's fixture."""
+
+    def __init__(self, name):
+        self.name = name
+        self.extra_info = {}
+        self.stats = None
+
+    def __call__(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) for at least MIN_TIME, return its result."""
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < MAX_ROUNDS and (
+            len(timings) < MIN_ROUNDS or time.perf_counter() - started < MIN_TIME
+        ):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+        self._record(timings)
+        return result
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=1,
+                 iterations=1):
+        """
+        Run target a fixed number of times, with untimed setup before each round.
+
+        target is called with args and kwargs, or with the (args, kwargs)
+        that setup returns.
+        """
+        timings = []
+        for _ in range(rounds):
+            call_args, call_kwargs = args, kwargs or {}
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    call_args, call_kwargs = prepared
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*call_args, **call_kwargs)
+            timings.append((time.perf_counter() - start) / iterations)
+        self._record(timings)
+        return result
+
+    def _record(self, timings):
+        self.stats = {
+            'min': min(timings),
+            'max': max(timings),
+            'mean': statistics.fmean(timings),
+            'median': statistics.median(timings),
+            'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            'rounds': len(timings),
+        }
+        _results[self.name] = dict(self.stats, extra_info=self.extra_info)
+
+
+@pytest.fixture
+def benchmark(request):
+    """Benchmark the test's hot path."""
+    return BenchmarkFixture(request.node.name)
+
+
+def _baseline_path(name):
+    return os.path.join(BASELINE_DIR, f'{name}.json')
+
+
+def _format_seconds(seconds):
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds:.3f}s'
+
+
+def _compare(config, name):
+    """Lines describing each change against baseline name, and the regressions."""
+    with open(_baseline_path(name), encoding='utf-8') as f:
+        baseline = json.load(f)['benchmarks']
+    threshold = config.getoption('--benchmark-threshold', default=0.25)
+    lines = []
+    regressions = []
+    for test_name, stats in sorted(_results.items()):
+        if test_name not in baseline:
+            continue
+        change = stats['median'] / baseline[test_name]['median'] - 1
+        lines.append(f'{test_name:<45} {change:+.1%} vs {name}')
+        if change > threshold:
+            regressions.append(test_name)
+    if regressions:
+        lines.append(f"Regressions over {threshold:.0%}: {', '.join(regressions)}")
+    return lines, regressions
+
+
+def _save(name):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(_baseline_path(name), 'w', encoding='utf-8') as f:
+        json.dump({
+            'machine': {
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'benchmarks': _results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return f'Saved baseline {_baseline_path(name)}'
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    config._benchmark_report = []
+    if not _results:
+        return
+    compare = config.getoption('--benchmark-compare', default=None)
+    if compare:
+        lines, regressions = _compare(config, compare)
+        config._benchmark_report.extend(lines)
+        if regressions:
+            session.exitstatus = 1
+    save = config.getoption('--benchmark-save', default=None)
+    if save:
+        config._benchmark_report.append(_save(save))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+    terminalreporter.section('benchmarks')
+    for name, stats in sorted(_results.items()):
+        extra = ' '.join(f'{key}={value}' for key, value in stats['extra_info'].items())
+        terminalreporter.write_line(
+            f"{name:<45} median {_format_seconds(stats['median']):>10}"
+            f"  min {_format_seconds(stats['min']):>10}"
+            f"  rounds {stats['rounds']:>4}  {extra}".rstrip()
+        )
+    for line in getattr(config, '_benchmark_report', ()):
+        terminalreporter.write_line(line)
@@ -0,0 +1,211 @@
+"""
+Benchmarks of the execution and grading hot paths.
+
+Run with --benchmark-enable; see conftest.py for saving and comparing
+baselines.
+"""
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the backend to the Python path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/backend'))
+
+import server
+from server import app
+from code_validator import CodeValidator
+from rate_limiter import RateLimiter
+from runner.safe_runner import ForkServer, sandbox_env, start_one_shot
+
+LESSON_01_ANSWER = '''print("🎮 Welcome to TRY NOT TO QUIT!")
+print("Your mission: Find a way to exit this program.")
+choice = input("What do you want to do? ")
+if choice == "quit":
+    print("❌ ERROR: Quit function temporarily disabled for maintenance")
+    print("Please try again later... or don't. 😏")
+print("🔄 Game continues whether you like it or not!")
+'''
+
+CHECK_CLIENTS = 8
+CHECKS_PER_ROUND = 32
+
+RUN_CODE = 'print(sum(range(1000)))'
+
+
+def _close_sandbox_pool():
+    if server._sandbox_pool is not None:
+        server._sandbox_pool.close()
+        server._sandbox_pool = None
+
+
+def _uncached_run():
+    """Setup for a run that must not be answered from the result cache."""
+    server.result_cache.clear()
+    return (RUN_CODE,), {}
+
+
+def test_execute_cold(benchmark):
+    """execute_python_code with the sandbox pool started by the run."""
+    def setup():
+        _close_sandbox_pool()
+        return _uncached_run()
+
+    result = benchmark.pedantic(server.execute_python_code, setup=setup, rounds=5)
+    assert result['output'] == '499500\n'
+
+
+def test_execute_warm(benchmark):
+    """execute_python_code on an already started sandbox pool."""
+    server._get_sandbox_pool()
+
+    result = benchmark.pedantic(server.execute_python_code, setup=_uncached_run,
+                                rounds=50)
+    assert result['output'] == '499500\n'
+
+
+def test_execute_cached(benchmark):
+    """execute_python_code answered from the result cache."""
+    server.execute_python_code(RUN_CODE)
+
+    result = benchmark(server.execute_python_code, RUN_CODE)
+    assert result['cached']
+
+
+def test_spawn_one_shot(benchmark):
+    """start_one_shot's own latency: the call until the child is started."""
+    limits = {
+        'memory_limit_mb': app.config['SANDBOX_MEMORY_LIMIT_MB'],
+        'cpu_hard_limit': app.config['EXECUTION_TIMEOUT'] + 2,
+    }
+    started = []
+
+    def reap():
+        while started:
+            started.pop().communicate()
+
+    def spawn():
+        started.append(start_one_shot(
+            'pass', limits=limits, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, env=sandbox_env(),
+        ))
+
+    try:
+        benchmark.pedantic(spawn, setup=reap, rounds=30)
+    finally:
+        reap()
+
+
+PRELOADED_RUN_CODE = 'import random, string\nprint(random.choice(string.ascii_letters))'
+
+
+def test_run_one_shot(benchmark):
+    """A cold interpreter launch per run, importing random and string."""
+    result = benchmark.pedantic(server._run_in_subprocess,
+                                args=(PRELOADED_RUN_CODE, '', 5), rounds=10)
+    assert result['returncode'] == 0
+
+
+def test_run_forkserver(benchmark):
+    """A run forked from a template with random and string preloaded."""
+    fork_server = ForkServer(preload=app.config['SANDBOX_PRELOAD_MODULES'],
+                             max_timeout=5)
+    try:
+        fork_server.run('pass', '', 5)
+        result = benchmark.pedantic(fork_server.run,
+                                    args=(PRELOADED_RUN_CODE, '', 5), rounds=50)
+    finally:
+        fork_server.close()
+    assert result['returncode'] == 0
+
+
+def _max_length_code():
+    """100 lines (the line limit) filling MAX_CODE_LENGTH."""
+    width = app.config['MAX_CODE_LENGTH'] // 100 - 1
+    lines = ['total = 0'] + [
+        f'total = total + len({"x" * (width - 40)!r}) * {n}'.ljust(width - 2) + '#'
+        for n in range(99)
+    ]
+    return '\n'.join(lines)
+
+
+def test_validate_max_length(benchmark):
+    """_validate_and_sanitize_code on a maximum length submission, uncached."""
+    code = _max_length_code()
+    original = server.code_validator
+
+    def setup():
+        server.code_validator = CodeValidator()
+        return (code,), {}
+
+    try:
+        result = benchmark.pedantic(server._validate_and_sanitize_code,
+                                    setup=setup, rounds=30)
+    finally:
+        server.code_validator = original
+    assert result['valid']
+
+
+def test_validate_max_length_cached(benchmark):
+    """_validate_and_sanitize_code on a maximum length submission seen before."""
+    code = _max_length_code()
+    server._validate_and_sanitize_code(code)
+
+    result = benchmark(server._validate_and_sanitize_code, code)
+    assert result['valid']
+
+
+def test_parse_deep_traceback(benchmark):
+    """_parse_python_error on a 1000-frame traceback."""
+    frames = ''.join(
+        f'  File "main.py", line {n}, in level_{n}\n    level_{n + 1}()\n'
+        for n in range(1, 1001)
+    )
+    error_output = ('Traceback (most recent call last):\n' + frames
+                    + 'RecursionError: maximum recursion depth exceeded\n')
+
+    result = benchmark(server._parse_python_error, error_output)
+    assert result['line'] == 1000
+
+
+def test_rate_limit_many_clients(benchmark, monkeypatch):
+    """_check_rate_limit for 5000 distinct clients per round."""
+    monkeypatch.setattr(server, 'rate_limiter', RateLimiter())
+    clients = [f'10.{n // 65536}.{n // 256 % 256}.{n % 256}' for n in range(5000)]
+
+    def check_all():
+        for client in clients:
+            server._check_rate_limit(client, 'benchmark', max_requests=10**6)
+
+    benchmark(check_all)
+    benchmark.extra_info['clients'] = len(clients)
+
+
+def test_check_throughput(benchmark, monkeypatch):
+    """Concurrent /lesson/01/check requests, each with a new submission."""
+    app.config['TESTING'] = True
+    monkeypatch.setattr(server, 'rate_limiter', RateLimiter())
+    server._get_sandbox_pool()
+    counter = iter(range(10**9))
+
+    def check(n):
+        with app.test_client() as client:
+            response = client.post(
+                '/lesson/01/check',
+                data=json.dumps({'code': f'{LESSON_01_ANSWER}# submission {n}'}),
+                content_type='application/json',
+                headers={'X-Forwarded-For': f'10.200.{n // 256 % 256}.{n % 256}'},
+            )
+            return response.status_code
+
+    def run_round():
+        with ThreadPoolExecutor(max_workers=CHECK_CLIENTS) as executor:
+            return list(executor.map(check, [next(counter) for _ in range(CHECKS_PER_ROUND)]))
+
+    statuses = benchmark.pedantic(run_round, setup=server.rate_limiter.reset, rounds=5)
+
+    benchmark.extra_info['checks_per_second'] = round(
+        CHECKS_PER_ROUND / benchmark.stats['median'], 1)
+    benchmark.extra_info['non_200'] = sum(status != 200 for status in statuses)
+    assert statuses.count(200) > 0
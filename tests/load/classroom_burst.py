@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Classroom burst load test for the Bhodi Learning Platform backend.
+
+Starts the backend under gunicorn with the production configuration and
+replays student sessions against it: fetch the lesson, run the code a
+few times with some thinking in between, then check the answer. Students
+arrive as a Poisson process at --rate per second until --students have
+started, each from their own client address so per-client rate limits
+apply as they would in a classroom.
+
+Reports p50/p95/p99 latency per endpoint, error, 429 and 503 rates, the
+peak number of sandboxed runs (from the backend's /metrics) and the peak
+RSS of the whole server process tree, sandbox workers included.
+
+Usage:
+    python tests/load/classroom_burst.py --students 30 --rate 1
+    python tests/load/classroom_burst.py --students 100 --rate 5 --threads 8
+    python tests/load/classroom_burst.py --url http://localhost:8000 --no-server
+
+Peak RSS and sandbox concurrency are only measured for a server started
+by this script. With several gunicorn workers, /metrics only covers the
+worker that bound the metrics port.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, 'src', 'backend')
+
+# A student's attempt at lesson 01, edited a little before every run
+STUDENT_CODE = '''print("🎮 Welcome to TRY NOT TO QUIT!")
+print("Your mission: Find a way to exit this program.")
+choice = input("What do you want to do? ")
+if choice == "quit":
+    print("❌ ERROR: Quit function temporarily disabled for maintenance")
+    print("Please try again later... or don't. 😏")
+print("🔄 Game continues whether you like it or not!")
+'''
+
+REQUEST_TIMEOUT = 30
+SAMPLE_INTERVAL = 0.2
+
+_GAUGE_LINE = re.compile(r'^(bhodi_\w+)\{state="(\w+)"\} ([0-9.e+]+)$', re.MULTILINE)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latency and status of every request, by endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            self.requests.setdefault(endpoint, []).append((seconds, status))
+
+    def summary(self):
+        endpoints = {}
+        everything = []
+        for endpoint, samples in sorted(self.requests.items()):
+            endpoints[endpoint] = self._summarize(samples)
+            everything.extend(samples)
+        endpoints['all'] = self._summarize(everything)
+        return endpoints
+
+    @staticmethod
+    def _summarize(samples):
+        latencies = sorted(seconds for seconds, _ in samples)
+        statuses = [status for _, status in samples]
+        count = len(samples) or 1
+        errors = sum(status == 'error' or (isinstance(status, int) and status >= 500
+                                           and status != 503) for status in statuses)
+        return {
+            'requests': len(samples),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+            'error_rate': round(errors / count, 4),
+            'rate_limited_rate': round(statuses.count(429) / count, 4),
+            'busy_rate': round(statuses.count(503) / count, 4),
+        }
+
+
+def _process_tree(root_pid):
+    """Pids of root_pid and all its descendants, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', encoding='utf-8') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields after it are fixed
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [root_pid]
+    for pid in tree:
+        tree.extend(children.get(pid, ()))
+    return tree
+
+
+def _rss_bytes(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class ResourceSampler(threading.Thread):
+    """Polls the server's RSS and /metrics, keeping the peaks"""
+
+    def __init__(self, server_pid, metrics_url):
+        super().__init__(daemon=True)
+        self.server_pid = server_pid
+        self.metrics_url = metrics_url
+        self.peak_rss = 0
+        self.peak_running = 0
+        self.peak_waiting = 0
+        self.peak_busy_workers = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            if self.server_pid and os.path.isdir('/proc'):
+                self.peak_rss = max(self.peak_rss, _rss_bytes(_process_tree(self.server_pid)))
+            if self.metrics_url:
+                self._sample_metrics()
+
+    def _sample_metrics(self):
+        try:
+            text = requests.get(self.metrics_url, timeout=2).text
+        except requests.RequestException:
+            return
+        for name, state, value in _GAUGE_LINE.findall(text):
+            value = int(float(value))
+            if name == 'bhodi_execution_admission' and state == 'running':
+                self.peak_running = max(self.peak_running, value)
+            elif name == 'bhodi_execution_admission' and state == 'waiting':
+                self.peak_waiting = max(self.peak_waiting, value)
+            elif name == 'bhodi_sandbox_workers' and state == 'busy':
+                self.peak_busy_workers = max(self.peak_busy_workers, value)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def start_server(args):
+    """Start gunicorn on args.port and wait until /health answers"""
+    env = dict(os.environ)
+    env.setdefault('FLASK_ENV', 'production')
+    env['METRICS_PORT'] = str(args.metrics_port)
+    env['LOG_LEVEL'] = env.get('LOG_LEVEL', 'WARNING')
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--chdir', BACKEND_DIR,
+        '--bind', f'127.0.0.1:{args.port}',
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--timeout', '60',
+        '--log-level', 'warning',
+        'server:app',
+    ]
+    process = subprocess.Popen(command, env=env, start_new_session=True)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with code {process.returncode}')
+        try:
+            if requests.get(f'{args.url}/health', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError('gunicorn did not become healthy within 30 seconds')
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def student_session(number, args, recorder):
+    """One student: read the lesson, run their code a few times, check it"""
+    session = requests.Session()
+    session.headers['X-Forwarded-For'] = f'10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}'
+    rng = random.Random(args.seed + number)
+
+    def call(endpoint, method, path, payload=None):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, f'{args.url}{path}', json=payload,
+                                       timeout=REQUEST_TIMEOUT)
+            status = response.status_code
+        except requests.RequestException:
+            status = 'error'
+        recorder.record(endpoint, time.perf_counter() - start, status)
+
+    call('lesson', 'GET', f'/lesson/{args.lesson}')
+    for attempt in range(args.runs):
+        time.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+        code = f'{STUDENT_CODE}# student {number}, attempt {attempt}\n'
+        call('run-code', 'POST', '/api/run-code', {'code': code})
+    time.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+    call('check', 'POST', f'/lesson/{args.lesson}/check', {'code': STUDENT_CODE})
+
+
+def run_load(args, recorder):
+    """Start args.students sessions at Poisson arrival times, wait for all"""
+    rng = random.Random(args.seed)
+    with ThreadPoolExecutor(max_workers=args.students) as executor:
+        futures = []
+        for number in range(args.students):
+            futures.append(executor.submit(student_session, number, args, recorder))
+            if number < args.students - 1:
+                time.sleep(rng.expovariate(args.rate))
+        for future in futures:
+            future.result()
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<10} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'errors':>7} {'429':>7} {'503':>7}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<10} {stats['requests']:>8} {stats['p50_ms'] or '-':>8}"
+              f" {stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8}"
+              f" {stats['error_rate']:>7.1%} {stats['rate_limited_rate']:>7.1%}"
+              f" {stats['busy_rate']:>7.1%}")
+    server = report.get('server')
+    if server:
+        print(f"\npeak sandboxed runs: {server['peak_running']} running,"
+              f" {server['peak_waiting']} waiting ({server['peak_busy_workers']} busy pool workers)")
+        print(f"peak RSS: {server['peak_rss_mb']} MB of {report['memory_limit_mb']} MB")
+    print(f"duration: {report['duration_seconds']}s for {report['students']} students")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate a classroom of students')
+    parser.add_argument('--students', type=int, default=30, help='Sessions to run')
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Mean student arrivals per second')
+    parser.add_argument('--runs', type=int, default=3, help='Code runs per student')
+    parser.add_argument('--think', type=float, default=2.0,
+                        help='Mean seconds a student thinks between requests')
+    parser.add_argument('--lesson', default='01', help='Lesson the students work on')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    parser.add_argument('--url', default=None,
+                        help='Server to load (default: start one on --port)')
+    parser.add_argument('--no-server', action='store_true',
+                        help='Do not start gunicorn; load --url as is')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--metrics-port', type=int, default=9765)
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker')
+    parser.add_argument('--memory-limit-mb', type=int, default=512,
+                        help='Machine memory the peak RSS is compared with')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report as JSON')
+    args = parser.parse_args(argv)
+    if args.no_server and not args.url:
+        parser.error('--no-server needs --url')
+    args.url = (args.url or f'http://127.0.0.1:{args.port}').rstrip('/')
+
+    process = None if args.no_server else start_server(args)
+    sampler = ResourceSampler(
+        process.pid if process else None,
+        f'http://127.0.0.1:{args.metrics_port}/metrics' if process else None,
+    )
+    sampler.start()
+    recorder = Recorder()
+    started = time.monotonic()
+    try:
+        run_load(args, recorder)
+    finally:
+        duration = time.monotonic() - started
+        sampler.stop()
+        if process:
+            stop_server(process)
+
+    report = {
+        'students': args.students,
+        'rate': args.rate,
+        'duration_seconds': round(duration, 1),
+        'memory_limit_mb': args.memory_limit_mb,
+        'endpoints': recorder.summary(),
+    }
+    if process:
+        report['server'] = {
+            'workers': args.workers,
+            'threads': args.threads,
+            'peak_rss_mb': round(sampler.peak_rss / 2**20, 1),
+            'peak_running': sampler.peak_running,
+            'peak_waiting': sampler.peak_waiting,
+            'peak_busy_workers': sampler.peak_busy_workers,
+        }
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    overall = report['endpoints']['all']
+    over_memory = process and sampler.peak_rss > args.memory_limit_mb * 2**20
+    return 1 if overall['error_rate'] or over_memory else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())